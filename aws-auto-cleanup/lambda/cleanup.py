@@ -1,21 +1,290 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
 import boto3
-from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+# TerminateInstances is sent at most this many IDs per call
+BATCH_SIZE = 1000
+MAX_REGION_WORKERS = 8
+
+# Stop starting new work when the invocation has less than this left
+SAFETY_MARGIN_MS = 30000
+
+# SAFETY CHECK: only resources explicitly tagged AutoDelete=true
+AUTO_DELETE_FILTER = {"Name": "tag:AutoDelete", "Values": ["true"]}
+
+RESOURCE_TYPES = ["ec2", "ebs", "snapshot", "eip"]
+
+
+def is_dry_run(event):
+    if isinstance(event, dict) and "dry_run" in event:
+        return bool(event["dry_run"])
+    return os.environ.get("DRY_RUN", "false").lower() == "true"
+
+
+def get_regions():
+    """Regions from CLEANUP_REGIONS (comma separated), else every enabled region."""
+    configured = os.environ.get("CLEANUP_REGIONS", "")
+    regions = [r.strip() for r in configured.split(",") if r.strip()]
+    if regions:
+        return regions
+    ec2 = boto3.client("ec2")
+    return [r["RegionName"] for r in ec2.describe_regions()["Regions"]]
+
+
+def get_resource_types():
+    configured = os.environ.get("RESOURCE_TYPES", "")
+    types = [t.strip() for t in configured.split(",") if t.strip()]
+    return [t for t in RESOURCE_TYPES if t in types] if types else list(RESOURCE_TYPES)
+
+
+# -------------------------------
+# Finders: yield batches of deletable IDs, filtered server-side
+# -------------------------------
+def find_instances(ec2):
+    paginator = ec2.get_paginator("describe_instances")
+    filters = [AUTO_DELETE_FILTER, {"Name": "instance-state-name", "Values": ["stopped"]}]
+    for page in paginator.paginate(Filters=filters, PaginationConfig={"PageSize": 1000}):
+        yield [
+            instance["InstanceId"]
+            for reservation in page["Reservations"]
+            for instance in reservation["Instances"]
+        ]
+
+
+def find_volumes(ec2):
+    # Unattached volumes, same status filter the inventory uses
+    paginator = ec2.get_paginator("describe_volumes")
+    filters = [AUTO_DELETE_FILTER, {"Name": "status", "Values": ["available"]}]
+    for page in paginator.paginate(Filters=filters, PaginationConfig={"PageSize": 500}):
+        yield [vol["VolumeId"] for vol in page["Volumes"]]
+
+
+def find_snapshots(ec2):
+    max_age = int(os.environ.get("SNAPSHOT_MAX_AGE_DAYS", "30"))
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age)
+    paginator = ec2.get_paginator("describe_snapshots")
+    pages = paginator.paginate(
+        OwnerIds=["self"], Filters=[AUTO_DELETE_FILTER], PaginationConfig={"PageSize": 1000}
+    )
+    for page in pages:
+        yield [snap["SnapshotId"] for snap in page["Snapshots"] if snap["StartTime"] < cutoff]
+
+
+def find_idle_addresses(ec2):
+    addresses = ec2.describe_addresses(Filters=[AUTO_DELETE_FILTER])["Addresses"]
+    yield [a["AllocationId"] for a in addresses if "AssociationId" not in a and "AllocationId" in a]
+
+
+# -------------------------------
+# Deleters: one call per batch where the API allows it. Each checks the
+# time left before every call and returns (IDs it did not get to,
+# {ID: error} for the IDs AWS refused), carrying on past refusals.
+# -------------------------------
+def terminate_instances(ec2, ids, context=None):
+    failed = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        if out_of_time(context):
+            return ids[start:], failed
+        batch = ids[start:start + BATCH_SIZE]
+        try:
+            ec2.terminate_instances(InstanceIds=batch)
+        except ClientError as e:
+            # One protected or missing instance fails the whole call, so
+            # retry the batch one ID at a time and skip the ones refused
+            print(f"Batch terminate failed ({e}); retrying {len(batch)} instances one at a time")
+            left, refused = delete_each(lambda instance_id: ec2.terminate_instances(InstanceIds=[instance_id]), batch, context)
+            failed.update(refused)
+            if left:
+                return left + ids[start + BATCH_SIZE:], failed
+    return [], failed
+
+
+def delete_each(call, ids, context):
+    """call(id) for each ID until time runs short, skipping the ones AWS refuses."""
+    failed = {}
+    for i, resource_id in enumerate(ids):
+        if out_of_time(context):
+            return ids[i:], failed
+        try:
+            call(resource_id)
+        except ClientError as e:
+            print(f"Could not delete {resource_id}: {e}")
+            failed[resource_id] = str(e)
+    return [], failed
+
+
+def delete_volumes(ec2, ids, context=None):
+    return delete_each(lambda volume_id: ec2.delete_volume(VolumeId=volume_id), ids, context)
+
+
+def delete_snapshots(ec2, ids, context=None):
+    return delete_each(lambda snapshot_id: ec2.delete_snapshot(SnapshotId=snapshot_id), ids, context)
+
+
+def release_addresses(ec2, ids, context=None):
+    return delete_each(lambda allocation_id: ec2.release_address(AllocationId=allocation_id), ids, context)
+
+
+HANDLERS = {
+    "ec2": (find_instances, terminate_instances),
+    "ebs": (find_volumes, delete_volumes),
+    "snapshot": (find_snapshots, delete_snapshots),
+    "eip": (find_idle_addresses, release_addresses),
+}
+
+
+# -------------------------------
+# Checkpointing
+# -------------------------------
+def load_checkpoint(event, dry_run):
+    """
+    Continuation for this mode from the event, else (real runs only) from
+    the SSM parameter, else None. A checkpoint never changes the mode the
+    caller asked for: one left by the other mode is ignored.
+    """
+    if isinstance(event, dict) and event.get("continuation"):
+        checkpoint = event["continuation"]
+    else:
+        parameter = os.environ.get("CHECKPOINT_PARAMETER")
+        # Dry runs never save a checkpoint, so they have none to resume
+        if not parameter or dry_run:
+            return None
+        ssm = boto3.client("ssm")
+        try:
+            value = ssm.get_parameter(Name=parameter)["Parameter"]["Value"]
+        except ssm.exceptions.ParameterNotFound:
+            return None
+        checkpoint = json.loads(value)
+    if not checkpoint.get("pending") or checkpoint.get("dry_run", False) != dry_run:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, dry_run):
+    """Store (or clear) the real runs' checkpoint; dry runs leave it alone."""
+    parameter = os.environ.get("CHECKPOINT_PARAMETER")
+    if parameter and not dry_run:
+        value = json.dumps(checkpoint or {})
+        boto3.client("ssm").put_parameter(Name=parameter, Value=value, Type="String", Overwrite=True)
+
+
+def continue_async(context, checkpoint):
+    """Re-invoke this function with the continuation when CONTINUE_ASYNC=true."""
+    if os.environ.get("CONTINUE_ASYNC", "false").lower() != "true":
+        return
+    boto3.client("lambda").invoke(
+        FunctionName=context.function_name,
+        InvocationType="Event",
+        # The mode travels with the continuation, not from DRY_RUN
+        Payload=json.dumps({"dry_run": checkpoint["dry_run"], "continuation": checkpoint}).encode(),
+    )
+
+
+# -------------------------------
+# Engine
+# -------------------------------
+def out_of_time(context):
+    return context is not None and context.get_remaining_time_in_millis() < SAFETY_MARGIN_MS
+
+
+def cleanup_unit(ec2, region, resource_type, dry_run, context):
+    """
+    Clean one (region, resource type). Returns (ids, failed, finished),
+    failed mapping each ID AWS refused to delete to its error. Deleted
+    resources drop out of the server-side filters, so an interrupted unit
+    (including one cut short halfway through a page) is simply listed
+    again on the next invocation and its leftover IDs found again.
+    """
+    find, delete = HANDLERS[resource_type]
+    handled = []
+    failed = {}
+
+    for ids in find(ec2):
+        if out_of_time(context):
+            return handled, failed, False
+        if not ids:
+            continue
+        if dry_run:
+            print(f"[dry-run] Would delete {len(ids)} {resource_type} in {region}: {ids}")
+            handled.extend(ids)
+            continue
+        print(f"Deleting {len(ids)} {resource_type} in {region}: {ids}")
+        left, refused = delete(ec2, ids, context)
+        failed.update(refused)
+        attempted = ids[:len(ids) - len(left)]
+        handled.extend(i for i in attempted if i not in refused)
+        if left:
+            print(f"Out of time with {len(left)} {resource_type} left in {region}")
+            return handled, failed, False
+
+    return handled, failed, True
 
-ec2 = boto3.resource("ec2")
 
 def lambda_handler(event, context):
-    deleted = []
+    dry_run = is_dry_run(event)
+    checkpoint = load_checkpoint(event, dry_run)
+    if checkpoint:
+        units = [tuple(unit) for unit in checkpoint["pending"]]
+        print(f"Resuming cleanup with {len(units)} pending units")
+    else:
+        units = [(region, t) for region in get_regions() for t in get_resource_types()]
+
+    # The default boto3 session is not thread-safe, so every client is
+    # built here before the workers start; clients themselves can be shared
+    clients = {region: boto3.client("ec2", region_name=region) for region in sorted({r for r, _ in units})}
+
+    handled = {t: [] for t in RESOURCE_TYPES}
+    failed = {}
+    pending = []
+    errors = {}
+    lock = threading.Lock()
+
+    def run(unit):
+        region, resource_type = unit
+        if out_of_time(context):
+            with lock:
+                pending.append(unit)
+            return
+        try:
+            ids, refused, finished = cleanup_unit(clients[region], region, resource_type, dry_run, context)
+        except Exception as e:
+            print(f"{resource_type} cleanup failed in {region}: {e}")
+            with lock:
+                errors[f"{region}/{resource_type}"] = str(e)
+            return
+        with lock:
+            handled[resource_type].extend(ids)
+            if refused:
+                failed[f"{region}/{resource_type}"] = refused
+            if not finished:
+                pending.append(unit)
 
-    for instance in ec2.instances.all():
-        tags = {t['Key']: t['Value'] for t in instance.tags or []}
+    with ThreadPoolExecutor(max_workers=MAX_REGION_WORKERS) as pool:
+        list(pool.map(run, units))
 
-        # SAFETY CHECK
-        if tags.get("AutoDelete") == "true" and instance.state["Name"] == "stopped":
-            print(f"Deleting EC2: {instance.id}")
-            instance.terminate()
-            deleted.append(instance.id)
+    continuation = None
+    if pending:
+        continuation = {"dry_run": dry_run, "pending": sorted(pending)}
+        print(f"Out of time; {len(pending)} units left for the next invocation")
+    save_checkpoint(continuation, dry_run)
+    if continuation and context is not None:
+        continue_async(context, continuation)
 
-    return {
-        "status": "success",
-        "deleted_ec2_instances": deleted
+    key = "would_delete" if dry_run else "deleted"
+    result = {
+        "status": "partial" if errors or failed else ("incomplete" if pending else "success"),
+        "dry_run": dry_run,
+        key: {t: sorted(ids) for t, ids in handled.items()},
+        "deleted_ec2_instances": [] if dry_run else sorted(handled["ec2"]),
+        "continuation": continuation,
     }
+    if failed:
+        result["failed"] = failed
+    if errors:
+        result["errors"] = errors
+    return result
@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+import cleanup
+
+
+def refused(code, operation):
+    return ClientError({"Error": {"Code": code, "Message": f"{code} (stub)"}}, operation)
+
+
+class StubEC2:
+    """Deletes everything except the IDs in refuse, which fail the way EC2 does."""
+
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)
+        self.deleted = []
+
+    def delete_snapshot(self, SnapshotId):
+        if SnapshotId in self.refuse:
+            raise refused("InvalidSnapshot.InUse", "DeleteSnapshot")
+        self.deleted.append(SnapshotId)
+
+    def terminate_instances(self, InstanceIds):
+        if self.refuse.intersection(InstanceIds):
+            raise refused("OperationNotPermitted", "TerminateInstances")
+        self.deleted.extend(InstanceIds)
+
+
+class DeleteEachTest(unittest.TestCase):
+    def test_refused_first_id_does_not_stop_the_rest(self):
+        ec2 = StubEC2(refuse={"snap-1"})
+        left, failed = cleanup.delete_snapshots(ec2, ["snap-1", "snap-2", "snap-3"])
+        self.assertEqual(left, [])
+        self.assertEqual(list(failed), ["snap-1"])
+        self.assertEqual(ec2.deleted, ["snap-2", "snap-3"])
+
+    def test_unit_reports_refused_ids_and_finishes(self):
+        ec2 = StubEC2(refuse={"snap-1"})
+        find = lambda _ec2: iter([["snap-1", "snap-2", "snap-3"]])
+        with mock.patch.dict(cleanup.HANDLERS, {"snapshot": (find, cleanup.delete_snapshots)}):
+            ids, failed, finished = cleanup.cleanup_unit(ec2, "us-east-1", "snapshot", False, None)
+        self.assertTrue(finished)
+        self.assertEqual(ids, ["snap-2", "snap-3"])
+        self.assertIn("InvalidSnapshot.InUse", failed["snap-1"])
+
+
+class TerminateInstancesTest(unittest.TestCase):
+    def test_protected_instance_does_not_fail_the_batch(self):
+        ec2 = StubEC2(refuse={"i-2"})
+        left, failed = cleanup.terminate_instances(ec2, ["i-1", "i-2", "i-3"])
+        self.assertEqual(left, [])
+        self.assertEqual(list(failed), ["i-2"])
+        self.assertEqual(ec2.deleted, ["i-1", "i-3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
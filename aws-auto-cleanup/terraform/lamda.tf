@@ -1,3 +1,11 @@
+# Zipped from the source on every plan, so the deployed code never lags
+# behind cleanup.py
+data "archive_file" "cleanup" {
+  type        = "zip"
+  source_file = "${path.module}/../lambda/cleanup.py"
+  output_path = "${path.module}/../lambda/cleanup.zip"
+}
+
 resource "aws_lambda_function" "cleanup" {
   function_name = "aws-auto-cleanup"
   role          = aws_iam_role.lambda_cleanup_role.arn
@@ -5,6 +13,17 @@ resource "aws_lambda_function" "cleanup" {
   runtime       = "python3.11"
   timeout       = 300
 
-  filename         = "../lambda/cleanup.zip"
-  source_code_hash = filebase64sha256("../lambda/cleanup.zip")
+  filename         = data.archive_file.cleanup.output_path
+  source_code_hash = data.archive_file.cleanup.output_base64sha256
+
+  environment {
+    variables = {
+      DRY_RUN               = "false"
+      CLEANUP_REGIONS       = ""
+      RESOURCE_TYPES        = "ec2,ebs,snapshot,eip"
+      SNAPSHOT_MAX_AGE_DAYS = "30"
+      CHECKPOINT_PARAMETER  = "/aws-auto-cleanup/checkpoint"
+      CONTINUE_ASYNC        = "true"
+    }
+  }
 }
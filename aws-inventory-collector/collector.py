@@ -1,17 +1,15 @@
 # collector.py
 import pandas as pd
-import boto3
 from services.ec2 import fetch_ec2_instances
 from services.s3 import fetch_s3_buckets
 from excel_writer import write_to_excel
 from utils import logger
+import region_catalog
 
 def get_all_regions():
+    """Enabled regions from the cached catalog (see region_catalog.py)."""
     try:
-        ec2 = boto3.client("ec2")
-        response = ec2.describe_regions(AllRegions=False)
-        regions = [r["RegionName"] for r in response["Regions"]]
-        return regions
+        return region_catalog.enabled_regions(region_catalog.load(), "ec2")
     except Exception as e:
         logger.error(f"Error fetching regions: {e}")
         return []
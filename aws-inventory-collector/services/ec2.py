@@ -1,35 +1,40 @@
 # services/ec2.py
 import pandas as pd
-from utils import logger, get_session #remove_tz
+from utils import logger, get_client, iter_items #remove_tz
 from botocore.exceptions import ClientError
 
-def fetch_ec2_instances(region):
-    try:
-        session = get_session()
-        ec2 = session.client("ec2", region_name=region)
+# describe_instances accepts at most 1000 results per page
+PAGE_SIZE = 1000
 
-        logger.info(f"Collecting EC2 instances from region: {region}")
+def iter_ec2_instances(ec2, region, filters=None):
+    """Yield one row per instance as each describe_instances page arrives."""
+    kwargs = {"PaginationConfig": {"PageSize": PAGE_SIZE}}
+    if filters:
+        kwargs["Filters"] = filters
 
-        response = ec2.describe_instances()
-        data = []
+    for reservation in iter_items(ec2, "describe_instances", "Reservations", **kwargs):
+        for instance in reservation.get("Instances", []):
+            launch_time = instance.get("LaunchTime")
+            if launch_time:
+                launch_time = launch_time.strftime("%Y-%m-%d %H:%M:%S")
+            yield {
+                "Region": region,
+                "InstanceId": instance.get("InstanceId"),
+                "InstanceType": instance.get("InstanceType"),
+                "State": instance.get("State", {}).get("Name"),
+                "PrivateIP": instance.get("PrivateIpAddress"),
+                "PublicIP": instance.get("PublicIpAddress"),
+                #"LaunchTime": remove_tz(instance.get("LaunchTime"))
+                "LaunchTime": launch_time
+            }
 
-        for reservation in response.get("Reservations", []):
-            for instance in reservation.get("Instances", []):
-                launch_time = instance.get("LaunchTime")
-                if launch_time:
-                    launch_time = launch_time.strftime("%Y-%m-%d %H:%M:%S")
-                data.append({
-                    "Region": region,
-                    "InstanceId": instance.get("InstanceId"),
-                    "InstanceType": instance.get("InstanceType"),
-                    "State": instance.get("State", {}).get("Name"),
-                    "PrivateIP": instance.get("PrivateIpAddress"),
-                    "PublicIP": instance.get("PublicIpAddress"),
-                    #"LaunchTime": remove_tz(instance.get("LaunchTime"))
-                    "LaunchTime": launch_time
-                })
+def fetch_ec2_instances(region, filters=None):
+    try:
+        ec2 = get_client("ec2", region)
+
+        logger.info(f"Collecting EC2 instances from region: {region}")
 
-        return pd.DataFrame(data)
+        return pd.DataFrame(iter_ec2_instances(ec2, region, filters))
 
     except ClientError as e:
         logger.error(f"EC2 ClientError in {region}: {e}")
@@ -1,28 +1,33 @@
 # services/s3.py
 import pandas as pd
-from utils import logger, get_session, remove_tz
+from utils import logger, get_client, remove_tz, iter_items
 from botocore.exceptions import ClientError
 
+def iter_s3_buckets(s3):
+    """Yield one row per bucket, paging through list_buckets when supported."""
+    if s3.can_paginate("list_buckets"):
+        buckets = iter_items(s3, "list_buckets", "Buckets")
+    else:
+        buckets = s3.list_buckets().get("Buckets", [])
+
+    for bucket in buckets:
+        created = bucket["CreationDate"]
+
+        # Fix: convert datetime to string
+        created_str = created.strftime("%Y-%m-%d %H:%M:%S")
+
+        yield {
+            "BucketName": bucket["Name"],
+            "CreationDate": created_str
+        }
+
 def fetch_s3_buckets():
     try:
-        session = get_session()
-        s3 = session.client("s3")
+        s3 = get_client("s3")
 
         logger.info("Collecting S3 buckets...")
 
-        response = s3.list_buckets()
-        data = []
-        for bucket in response.get("Buckets", []):
-            created = bucket["CreationDate"]
-
-            # Fix: convert datetime to string
-            created_str = created.strftime("%Y-%m-%d %H:%M:%S")
-
-            data.append({
-                "BucketName": bucket["Name"],
-                "CreationDate": created_str
-        })
-        return pd.DataFrame(data)
+        return pd.DataFrame(iter_s3_buckets(s3))
 
     except ClientError as e:
         logger.error(f"S3 ClientError: {e}")
@@ -1,7 +1,15 @@
 # utils.py
 import logging
+import random
+import threading
+import time
 from datetime import datetime
 
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+
 def setup_logger():
     logger = logging.getLogger("aws-inventory")
     logger.setLevel(logging.INFO)
@@ -29,9 +37,73 @@ def setup_logger():
 # Initialize logger
 logger = setup_logger()
 
-def get_session():
-    import boto3
-    return boto3.session.Session()
+# Keep-alive connections kept open per client
+MAX_POOL_CONNECTIONS = 16
+CLIENT_CONFIG = Config(max_pool_connections=MAX_POOL_CONNECTIONS)
+
+_registry_lock = threading.RLock()
+_sessions = {}
+_clients = {}
+
+def _credentials_key(credentials):
+    if not credentials:
+        return None
+    return (credentials.get("aws_access_key_id"), credentials.get("aws_session_token"))
+
+def get_session(credentials=None):
+    """
+    Return the shared boto3 session for a set of credentials.
+    credentials=None uses the default credential chain.
+    """
+    key = _credentials_key(credentials)
+    with _registry_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = boto3.session.Session(**(credentials or {}))
+            _sessions[key] = session
+        return session
+
+def get_client(service, region=None, credentials=None):
+    """
+    Return the process-wide client for (service, region, credentials),
+    creating it on first use. boto3 clients are thread-safe once built;
+    creation itself is serialized because sessions are not.
+    """
+    key = (service, region, _credentials_key(credentials))
+    with _registry_lock:
+        client = _clients.get(key)
+        if client is None:
+            session = get_session(credentials)
+            client = session.client(service, region_name=region, config=CLIENT_CONFIG)
+            _clients[key] = client
+        return client
+
+def reset_clients():
+    """Drop every cached session and client."""
+    with _registry_lock:
+        _clients.clear()
+        _sessions.clear()
+
+# Throttling and transient errors are retried with jittered exponential backoff
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5
+RETRYABLE_CODES = {
+    "Throttling", "ThrottlingException", "RequestLimitExceeded", "RequestThrottled",
+    "TooManyRequestsException", "InternalError", "InternalFailure", "ServiceUnavailable", "RequestTimeout",
+}
+
+def api_call(client, operation, **kwargs):
+    """One API call, retried on throttling, transient errors and dropped connections."""
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return getattr(client, operation)(**kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in RETRYABLE_CODES or attempt == RETRY_ATTEMPTS - 1:
+                raise
+        except (BotoConnectionError, HTTPClientError):
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+        time.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
 
 def remove_tz(dt):
     """
@@ -42,3 +114,18 @@ def remove_tz(dt):
     if dt.tzinfo is not None:
         return dt.replace(tzinfo=None)
     return dt
+
+def iter_pages(client, operation, **kwargs):
+    """
+    Yield response pages one at a time from a boto3 paginator, so callers
+    only ever hold a single page of raw results in memory.
+    """
+    paginator = client.get_paginator(operation)
+    for page in paginator.paginate(**kwargs):
+        yield page
+
+def iter_items(client, operation, result_key, **kwargs):
+    """Yield the items under result_key from every page of an operation."""
+    for page in iter_pages(client, operation, **kwargs):
+        for item in page.get(result_key, []):
+            yield item
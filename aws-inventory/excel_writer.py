@@ -1,10 +1,22 @@
-import pandas as pd
+from itertools import chain
+
+from openpyxl import Workbook
+
+from records import write_sheet
 
 def save_to_excel(data_dict, filename="AWS_Inventory_collector.xlsx"):
-    with pd.ExcelWriter(filename, engine="openpyxl") as writer:
-        for service_name, records in data_dict.items():
-            df = pd.DataFrame(records)
-            # Excel sheet names must be <= 31 chars
-            sheet_name = service_name[:31]
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    """
+    One sheet per service from record lists or generators. Rows are
+    streamed into a write-only workbook, with no DataFrame in between.
+    """
+    wb = Workbook(write_only=True)
+    for service_name, records in data_dict.items():
+        # Excel sheet names must be <= 31 chars
+        ws = wb.create_sheet(service_name[:31])
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            continue
+        write_sheet(ws, chain([first], records), type(first))
+    wb.save(filename)
     print("Excel report generated:", filename)
@@ -1,24 +1,23 @@
-import boto3
 from botocore.exceptions import ClientError
 from openpyxl import Workbook
 
+from records import EC2Instance, Bucket, LambdaFunction, write_sheet
+from utils import client, get_regions
+
 def get_all_regions():
-    try:
-        ec2 = boto3.client("ec2")
-        response = ec2.describe_regions(AllRegions=True)
-        return [r["RegionName"] for r in response["Regions"]]
-    except ClientError as e:
-        print("Error fetching regions:", e)
-        return []
-    except Exception as e:
-        print("Unexpected error fetching regions:", e)
-        return []
+    # Enabled regions only, from the cached catalog in utils
+    return get_regions()
 
 def get_ec2_instances(region):
     try:
-        ec2 = boto3.client("ec2", region_name=region)
+        ec2 = client("ec2", region)
+        instances = []
         try:
-            response = ec2.describe_instances()
+            paginator = ec2.get_paginator("describe_instances")
+            for page in paginator.paginate(PaginationConfig={"PageSize": 1000}):
+                for reservation in page.get("Reservations", []):
+                    for instance in reservation.get("Instances", []):
+                        instances.append(EC2Instance.from_api(region, instance))
         except ClientError as e:
             code = e.response.get("Error", {}).get("Code")
             if code in ["AuthFailure", "UnrecognizedClientException", "UnauthorizedOperation"]:
@@ -30,18 +29,6 @@ def get_ec2_instances(region):
             print(f"Unexpected EC2 error in {region}:", e)
             return []
 
-        instances = []
-        for reservation in response.get("Reservations", []):
-            for instance in reservation.get("Instances", []):
-                instances.append({
-                    "Region": region,
-                    "InstanceId": instance.get("InstanceId"),
-                    "InstanceType": instance.get("InstanceType"),
-                    "State": instance.get("State", {}).get("Name"),
-                    "PrivateIP": instance.get("PrivateIpAddress"),
-                    "PublicIP": instance.get("PublicIpAddress"),
-                    "AZ": instance.get("Placement", {}).get("AvailabilityZone"),
-                })
         return instances
     except Exception as e:
         print(f"Failed to fetch EC2 instances in {region}:", e)
@@ -49,7 +36,7 @@ def get_ec2_instances(region):
 
 def get_s3_buckets():
     try:
-        s3 = boto3.client("s3")
+        s3 = client("s3")
         try:
             response = s3.list_buckets()
         except ClientError as e:
@@ -61,10 +48,7 @@ def get_s3_buckets():
 
         buckets = []
         for bucket in response.get("Buckets", []):
-            buckets.append({
-                "BucketName": bucket.get("Name"),
-                "CreationDate": str(bucket.get("CreationDate")),
-            })
+            buckets.append(Bucket.from_api(bucket))
         return buckets
     except Exception as e:
         print("Failed to fetch S3 buckets:", e)
@@ -72,9 +56,13 @@ def get_s3_buckets():
 
 def get_lambda_functions(region):
     try:
-        lam = boto3.client("lambda", region_name=region)
+        lam = client("lambda", region)
+        functions = []
         try:
-            response = lam.list_functions()
+            paginator = lam.get_paginator("list_functions")
+            for page in paginator.paginate(PaginationConfig={"PageSize": 50}):
+                for fn in page.get("Functions", []):
+                    functions.append(LambdaFunction.from_api(region, fn))
         except ClientError as e:
             code = e.response.get("Error", {}).get("Code")
             if code in ["AuthFailure", "UnrecognizedClientException", "UnauthorizedOperation"]:
@@ -86,15 +74,6 @@ def get_lambda_functions(region):
             print(f"Unexpected Lambda error in {region}:", e)
             return []
 
-        functions = []
-        for fn in response.get("Functions", []):
-            functions.append({
-                "Region": region,
-                "FunctionName": fn.get("FunctionName"),
-                "Runtime": fn.get("Runtime"),
-                "Memory": fn.get("MemorySize"),
-                "Timeout": fn.get("Timeout"),
-            })
         return functions
     except Exception as e:
         print(f"Failed to fetch Lambda functions in {region}:", e)
@@ -108,27 +87,21 @@ def write_to_excel(ec2_data, s3_data, lambda_data):
         try:
             ws1 = wb.active
             ws1.title = "EC2"
-            ws1.append(["Region", "InstanceId", "InstanceType", "State", "PrivateIP", "PublicIP", "AZ"])
-            for row in ec2_data:
-                ws1.append(list(row.values()))
+            write_sheet(ws1, ec2_data, EC2Instance)
         except Exception as e:
             print("Error writing EC2 data to Excel:", e)
 
         # S3 Sheet
         try:
             ws2 = wb.create_sheet("S3")
-            ws2.append(["BucketName", "CreationDate"])
-            for row in s3_data:
-                ws2.append(list(row.values()))
+            write_sheet(ws2, s3_data, Bucket)
         except Exception as e:
             print("Error writing S3 data to Excel:", e)
 
         # Lambda Sheet
         try:
             ws3 = wb.create_sheet("Lambda")
-            ws3.append(["Region", "FunctionName", "Runtime", "Memory", "Timeout"])
-            for row in lambda_data:
-                ws3.append(list(row.values()))
+            write_sheet(ws3, lambda_data, LambdaFunction)
         except Exception as e:
             print("Error writing Lambda data to Excel:", e)
 
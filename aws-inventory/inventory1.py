@@ -1,17 +1,21 @@
-import boto3
 from botocore.exceptions import ClientError
 from openpyxl import Workbook
 
+from records import EC2Instance, Bucket, LambdaFunction, IAMUser, write_sheet
+from utils import api_call, client, get_regions
+
 # -------------------------------
 # 1️ Helper Functions
 # -------------------------------
-def safe_aws_call(func, *args, **kwargs):
+def safe_aws_call(client, operation, **kwargs):
     """
-    Calls an AWS API function safely with try/except.
+    Calls an AWS API operation through utils.api_call, which retries
+    throttling and transient errors with jittered exponential backoff.
     Returns None on AuthFailure / UnrecognizedClientException / UnauthorizedOperation
+    and on any other error once the retries are spent.
     """
     try:
-        return func(*args, **kwargs)
+        return api_call(client, operation, **kwargs)
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code")
         if code in ["AuthFailure", "UnrecognizedClientException", "UnauthorizedOperation"]:
@@ -23,14 +27,8 @@ def safe_aws_call(func, *args, **kwargs):
         return None
 
 def get_all_regions():
-    try:
-        ec2 = boto3.client("ec2")
-        response = safe_aws_call(ec2.describe_regions)
-        if response:
-            return [r["RegionName"] for r in response["Regions"]]
-    except Exception as e:
-        print("Error fetching regions:", e)
-    return []
+    # Enabled regions only, from the cached catalog in utils
+    return get_regions()
 
 # -------------------------------
 # 2️ Resource Fetching Functions
@@ -38,23 +36,14 @@ def get_all_regions():
 def get_ec2_instances(region):
     instances = []
     try:
-        ec2 = boto3.client("ec2", region_name=region)
-        response = safe_aws_call(ec2.describe_instances)
+        ec2 = client("ec2", region)
+        response = safe_aws_call(ec2, "describe_instances")
         if not response:
             return instances
 
         for res in response.get("Reservations", []):
             for inst in res.get("Instances", []):
-                instances.append({
-                    "Region": region,
-                    "InstanceId": inst.get("InstanceId"),
-                    "InstanceType": inst.get("InstanceType"),
-                    "State": inst.get("State", {}).get("Name"),
-                    "PrivateIP": inst.get("PrivateIpAddress"),
-                    "PublicIP": inst.get("PublicIpAddress"),
-                    "AZ": inst.get("Placement", {}).get("AvailabilityZone"),
-                    "Tags": str(inst.get("Tags")),
-                })
+                instances.append(EC2Instance.from_api(region, inst))
     except Exception as e:
         print(f"Error fetching EC2 in {region}:", e)
     return instances
@@ -62,16 +51,13 @@ def get_ec2_instances(region):
 def get_s3_buckets():
     buckets = []
     try:
-        s3 = boto3.client("s3")
-        response = safe_aws_call(s3.list_buckets)
+        s3 = client("s3")
+        response = safe_aws_call(s3, "list_buckets")
         if not response:
             return buckets
 
         for b in response.get("Buckets", []):
-            buckets.append({
-                "BucketName": b.get("Name"),
-                "CreationDate": str(b.get("CreationDate")),
-            })
+            buckets.append(Bucket.from_api(b))
     except Exception as e:
         print("Error fetching S3:", e)
     return buckets
@@ -79,20 +65,13 @@ def get_s3_buckets():
 def get_lambda_functions(region):
     functions = []
     try:
-        lam = boto3.client("lambda", region_name=region)
-        response = safe_aws_call(lambda: lam.list_functions())
+        lam = client("lambda", region)
+        response = safe_aws_call(lam, "list_functions")
         if not response:
             return functions
 
         for fn in response.get("Functions", []):
-            functions.append({
-                "Region": region,
-                "FunctionName": fn.get("FunctionName"),
-                "Runtime": fn.get("Runtime"),
-                "Memory": fn.get("MemorySize"),
-                "Timeout": fn.get("Timeout"),
-                "LastModified": fn.get("LastModified"),
-            })
+            functions.append(LambdaFunction.from_api(region, fn))
     except Exception as e:
         print(f"Error fetching Lambda in {region}:", e)
     return functions
@@ -100,8 +79,8 @@ def get_lambda_functions(region):
 def get_rds_instances(region):
     rds_instances = []
     try:
-        rds = boto3.client("rds", region_name=region)
-        response = safe_aws_call(rds.describe_db_instances)
+        rds = client("rds", region)
+        response = safe_aws_call(rds, "describe_db_instances")
         if not response:
             return rds_instances
 
@@ -124,18 +103,13 @@ def get_rds_instances(region):
 def get_iam_users():
     users = []
     try:
-        iam = boto3.client("iam")
-        response = safe_aws_call(iam.list_users)
+        iam = client("iam")
+        response = safe_aws_call(iam, "list_users")
         if not response:
             return users
 
         for user in response.get("Users", []):
-            users.append({
-                "UserName": user.get("UserName"),
-                "UserId": user.get("UserId"),
-                "Arn": user.get("Arn"),
-                "CreateDate": str(user.get("CreateDate")),
-            })
+            users.append(IAMUser.from_api(user))
     except Exception as e:
         print("Error fetching IAM users:", e)
     return users
@@ -156,11 +130,8 @@ def write_to_excel(all_data, filename="aws_inventory2.xlsx"):
             if not data:
                 continue
 
-            # Write header
-            ws.append(list(data[0].keys()))
-            # Write rows
-            for row in data:
-                ws.append(list(row.values()))
+            # Header from the record type, then one row per record
+            write_sheet(ws, data, type(data[0]))
 
         wb.save(filename)
         print(f"Export completed: {filename}")
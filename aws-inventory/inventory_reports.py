@@ -1,33 +1,22 @@
-import boto3
 from botocore.exceptions import ClientError
 from openpyxl import Workbook
 
+from records import EC2Instance, Bucket, LambdaFunction, write_sheet
+from utils import client, get_regions
+
 def get_all_regions():
-    try:
-        ec2 = boto3.client("ec2")
-        response = ec2.describe_regions(AllRegions=True)
-        return [r["RegionName"] for r in response["Regions"]]
-    except ClientError as e:
-        print("Error fetching regions:", e)
-        return []
+    # Enabled regions only, from the cached catalog in utils
+    return get_regions()
 
 def get_ec2_instances(region):
     try:
-        ec2 = boto3.client("ec2", region_name=region)
+        ec2 = client("ec2", region)
         response = ec2.describe_instances()
 
         instances = []
         for reservation in response.get("Reservations", []):
             for instance in reservation.get("Instances", []):
-                instances.append({
-                    "Region": region,
-                    "InstanceId": instance.get("InstanceId"),
-                    "InstanceType": instance.get("InstanceType"),
-                    "State": instance.get("State", {}).get("Name"),
-                    "PrivateIP": instance.get("PrivateIpAddress"),
-                    "PublicIP": instance.get("PublicIpAddress"),
-                    "AZ": instance.get("Placement", {}).get("AvailabilityZone"),
-                })
+                instances.append(EC2Instance.from_api(region, instance))
         return instances
     except ClientError as e:
         print(f"Error fetching EC2 in {region}:", e)
@@ -35,15 +24,12 @@ def get_ec2_instances(region):
 
 def get_s3_buckets():
     try:
-        s3 = boto3.client("s3")
+        s3 = client("s3")
         response = s3.list_buckets()
 
         buckets = []
         for bucket in response.get("Buckets", []):
-            buckets.append({
-                "BucketName": bucket.get("Name"),
-                "CreationDate": str(bucket.get("CreationDate")),
-            })
+            buckets.append(Bucket.from_api(bucket))
         return buckets
     except ClientError as e:
         print("Error fetching S3 buckets:", e)
@@ -51,19 +37,13 @@ def get_s3_buckets():
 
 def get_lambda_functions(region):
     try:
-        lam = boto3.client("lambda", region_name=region)
+        lam = client("lambda", region)
         functions = []
 
         paginator = lam.get_paginator("list_functions")
         for page in paginator.paginate():
             for fn in page.get("Functions", []):
-                functions.append({
-                    "Region": region,
-                    "FunctionName": fn.get("FunctionName"),
-                    "Runtime": fn.get("Runtime"),
-                    "Memory": fn.get("MemorySize"),
-                    "Timeout": fn.get("Timeout"),
-                })
+                functions.append(LambdaFunction.from_api(region, fn))
         return functions
     except ClientError as e:
         print(f"Error fetching Lambda in {region}:", e)
@@ -75,19 +55,13 @@ def write_to_excel(ec2_data, s3_data, lambda_data):
 
         ws1 = wb.active
         ws1.title = "EC2"
-        ws1.append(["Region", "InstanceId", "InstanceType", "State", "PrivateIP", "PublicIP", "AZ"])
-        for row in ec2_data:
-            ws1.append(list(row.values()))
+        write_sheet(ws1, ec2_data, EC2Instance)
 
         ws2 = wb.create_sheet("S3")
-        ws2.append(["BucketName", "CreationDate"])
-        for row in s3_data:
-            ws2.append(list(row.values()))
+        write_sheet(ws2, s3_data, Bucket)
 
         ws3 = wb.create_sheet("Lambda")
-        ws3.append(["Region", "FunctionName", "Runtime", "Memory", "Timeout"])
-        for row in lambda_data:
-            ws3.append(list(row.values()))
+        write_sheet(ws3, lambda_data, LambdaFunction)
 
         wb.save("aws_inventory.xlsx")
         print("Export completed: aws_inventory.xlsx")
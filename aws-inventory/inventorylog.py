@@ -1,8 +1,10 @@
-import boto3
 import logging
 from botocore.exceptions import ClientError
 from openpyxl import Workbook
 
+from records import EC2Instance, Bucket, LambdaFunction, write_sheet
+from utils import client, get_regions
+
 # -----------------------------------
 # LOGGING CONFIGURATION
 # -----------------------------------
@@ -24,19 +26,11 @@ logging.info("AWS Inventory Script Started")
 # GET ALL REGIONS
 # -----------------------------------
 def get_all_regions():
-    try:
-        logging.info("Fetching all AWS regions")
-        ec2 = boto3.client("ec2")
-        response = ec2.describe_regions(AllRegions=True)
-        regions = [r["RegionName"] for r in response["Regions"]]
-        logging.info(f"Regions fetched: {regions}")
-        return regions
-    except ClientError as e:
-        logging.error(f"Error fetching regions: {e}")
-        return []
-    except Exception as e:
-        logging.error(f"Unexpected error fetching regions: {e}")
-        return []
+    # Enabled regions only, from the cached catalog in utils
+    logging.info("Fetching enabled AWS regions")
+    regions = get_regions()
+    logging.info(f"Regions fetched: {regions}")
+    return regions
 
 
 # -----------------------------------
@@ -45,7 +39,7 @@ def get_all_regions():
 def get_ec2_instances(region):
     logging.info(f"Fetching EC2 instances in region: {region}")
     try:
-        ec2 = boto3.client("ec2", region_name=region)
+        ec2 = client("ec2", region)
 
         try:
             response = ec2.describe_instances()
@@ -64,15 +58,7 @@ def get_ec2_instances(region):
         instances = []
         for reservation in response.get("Reservations", []):
             for instance in reservation.get("Instances", []):
-                instances.append({
-                    "Region": region,
-                    "InstanceId": instance.get("InstanceId"),
-                    "InstanceType": instance.get("InstanceType"),
-                    "State": instance.get("State", {}).get("Name"),
-                    "PrivateIP": instance.get("PrivateIpAddress"),
-                    "PublicIP": instance.get("PublicIpAddress"),
-                    "AZ": instance.get("Placement", {}).get("AvailabilityZone"),
-                })
+                instances.append(EC2Instance.from_api(region, instance))
 
         logging.info(f"EC2 instances found in {region}: {len(instances)}")
         return instances
@@ -88,7 +74,7 @@ def get_ec2_instances(region):
 def get_s3_buckets():
     logging.info("Fetching S3 buckets")
     try:
-        s3 = boto3.client("s3")
+        s3 = client("s3")
 
         try:
             response = s3.list_buckets()
@@ -101,10 +87,7 @@ def get_s3_buckets():
 
         buckets = []
         for bucket in response.get("Buckets", []):
-            buckets.append({
-                "BucketName": bucket.get("Name"),
-                "CreationDate": str(bucket.get("CreationDate")),
-            })
+            buckets.append(Bucket.from_api(bucket))
 
         logging.info(f"S3 buckets found: {len(buckets)}")
         return buckets
@@ -120,7 +103,7 @@ def get_s3_buckets():
 def get_lambda_functions(region):
     logging.info(f"Fetching Lambda functions in region: {region}")
     try:
-        lam = boto3.client("lambda", region_name=region)
+        lam = client("lambda", region)
 
         try:
             response = lam.list_functions()
@@ -138,13 +121,7 @@ def get_lambda_functions(region):
 
         functions = []
         for fn in response.get("Functions", []):
-            functions.append({
-                "Region": region,
-                "FunctionName": fn.get("FunctionName"),
-                "Runtime": fn.get("Runtime"),
-                "Memory": fn.get("MemorySize"),
-                "Timeout": fn.get("Timeout"),
-            })
+            functions.append(LambdaFunction.from_api(region, fn))
 
         logging.info(f"Lambda functions found in {region}: {len(functions)}")
         return functions
@@ -166,27 +143,21 @@ def write_to_excel(ec2_data, s3_data, lambda_data):
         try:
             ws1 = wb.active
             ws1.title = "EC2"
-            ws1.append(["Region", "InstanceId", "InstanceType", "State", "PrivateIP", "PublicIP", "AZ"])
-            for row in ec2_data:
-                ws1.append(list(row.values()))
+            write_sheet(ws1, ec2_data, EC2Instance)
         except Exception as e:
             logging.error(f"Error writing EC2 sheet: {e}")
 
         # S3 Sheet
         try:
             ws2 = wb.create_sheet("S3")
-            ws2.append(["BucketName", "CreationDate"])
-            for row in s3_data:
-                ws2.append(list(row.values()))
+            write_sheet(ws2, s3_data, Bucket)
         except Exception as e:
             logging.error(f"Error writing S3 sheet: {e}")
 
         # Lambda sheet
         try:
             ws3 = wb.create_sheet("Lambda")
-            ws3.append(["Region", "FunctionName", "Runtime", "Memory", "Timeout"])
-            for row in lambda_data:
-                ws3.append(list(row.values()))
+            write_sheet(ws3, lambda_data, LambdaFunction)
         except Exception as e:
             logging.error(f"Error writing Lambda sheet: {e}")
 
@@ -0,0 +1,130 @@
+# records.py
+"""
+Compact, typed rows for the inventory scripts.
+
+Each resource is a __slots__ object rather than a dict, so a row costs a
+fixed handful of pointers instead of a hash table with its own copy of
+every key. Values repeated across thousands of rows (region, state,
+instance type, runtime, tag keys) are interned, so every row points at
+the same string. Writers take the records as they are: HEADERS is the
+sheet header and as_row() the values in that order.
+"""
+import sys
+from datetime import datetime, timezone
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _cell(value):
+    # openpyxl rejects tz-aware datetimes; boto3 returns UTC, so drop the zone
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _tags(tags):
+    """Tag list from the API as a tuple of (key, value), keys interned."""
+    return tuple((sys.intern(t["Key"]), t.get("Value")) for t in tags or ())
+
+
+class Record:
+    """
+    Base for the resource records. Subclasses list their attributes in
+    __slots__, the matching column names in HEADERS and the attributes to
+    intern in INTERNED.
+    """
+
+    __slots__ = ()
+    HEADERS = ()
+    INTERNED = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            value = values.pop(name, None)
+            if name in self.INTERNED:
+                value = _intern(value)
+            setattr(self, name, value)
+        if values:
+            raise TypeError(f"{type(self).__name__} has no field(s) {sorted(values)}")
+
+    def as_row(self):
+        """Values in HEADERS order, ready for a worksheet."""
+        return [_cell(getattr(self, name)) for name in self.__slots__]
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class EC2Instance(Record):
+    __slots__ = ("region", "instance_id", "instance_type", "state", "private_ip",
+                 "public_ip", "az", "launch_time", "tags")
+    HEADERS = ("Region", "InstanceId", "InstanceType", "State", "PrivateIP",
+               "PublicIP", "AZ", "LaunchTime", "Tags")
+    INTERNED = ("region", "instance_type", "state", "az")
+
+    @classmethod
+    def from_api(cls, region, instance):
+        return cls(
+            region=region,
+            instance_id=instance.get("InstanceId"),
+            instance_type=instance.get("InstanceType"),
+            state=instance.get("State", {}).get("Name"),
+            private_ip=instance.get("PrivateIpAddress"),
+            public_ip=instance.get("PublicIpAddress"),
+            az=instance.get("Placement", {}).get("AvailabilityZone"),
+            launch_time=instance.get("LaunchTime"),
+            tags=_tags(instance.get("Tags")),
+        )
+
+    def as_row(self):
+        row = super().as_row()
+        row[-1] = ", ".join(f"{key}={value}" for key, value in self.tags)
+        return row
+
+
+class Bucket(Record):
+    __slots__ = ("name", "creation_date")
+    HEADERS = ("BucketName", "CreationDate")
+
+    @classmethod
+    def from_api(cls, bucket):
+        return cls(name=bucket.get("Name"), creation_date=bucket.get("CreationDate"))
+
+
+class LambdaFunction(Record):
+    __slots__ = ("region", "name", "runtime", "memory", "timeout", "last_modified")
+    HEADERS = ("Region", "FunctionName", "Runtime", "Memory", "Timeout", "LastModified")
+    INTERNED = ("region", "runtime")
+
+    @classmethod
+    def from_api(cls, region, fn):
+        return cls(
+            region=region,
+            name=fn.get("FunctionName"),
+            runtime=fn.get("Runtime"),
+            memory=fn.get("MemorySize"),
+            timeout=fn.get("Timeout"),
+            last_modified=fn.get("LastModified"),
+        )
+
+
+class IAMUser(Record):
+    __slots__ = ("name", "user_id", "arn", "create_date")
+    HEADERS = ("UserName", "UserId", "Arn", "CreateDate")
+
+    @classmethod
+    def from_api(cls, user):
+        return cls(
+            name=user.get("UserName"),
+            user_id=user.get("UserId"),
+            arn=user.get("Arn"),
+            create_date=user.get("CreateDate"),
+        )
+
+
+def write_sheet(ws, records, record_type):
+    """Header plus one row per record; records can be any iterable."""
+    ws.append(list(record_type.HEADERS))
+    for record in records:
+        ws.append(record.as_row())
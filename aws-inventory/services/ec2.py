@@ -1,23 +1,18 @@
-from utils import client
+from records import EC2Instance
+from utils import client, paginate
 
 def collect_ec2(region):
-    data = []
+    """Yield EC2Instance records for a region page by page (1000 instances per call)."""
     try:
         ec2 = client("ec2", region)
         if ec2 is None:
-            return data
-        resp = ec2.describe_instances()
-        for reservation in resp.get("Reservations", []):
+            return
+        reservations = paginate(
+            ec2, "describe_instances", "Reservations",
+            PaginationConfig={"PageSize": 1000}
+        )
+        for reservation in reservations:
             for i in reservation.get("Instances", []):
-                data.append({
-                    "Region": region,
-                    "InstanceId": i.get("InstanceId"),
-                    "InstanceType": i.get("InstanceType"),
-                    "State": i.get("State", {}).get("Name"),
-                    "PrivateIP": i.get("PrivateIpAddress"),
-                    "PublicIP": i.get("PublicIpAddress"),
-                    "LaunchTime": i.get("LaunchTime")
-                })
+                yield EC2Instance.from_api(region, i)
     except Exception as e:
         print(f"EC2 error in {region}: {e}")
-    return data
@@ -1,21 +1,20 @@
-from utils import client
+from records import Bucket
+from utils import client, paginate
 
 def collect_s3():
-    data = []
-
+    """Yield Bucket records, paging through list_buckets when supported."""
     try:
         s3 = client("s3")
         if s3 is None:
-            return data
+            return
+
+        if s3.can_paginate("list_buckets"):
+            buckets = paginate(s3, "list_buckets", "Buckets")
+        else:
+            buckets = s3.list_buckets().get("Buckets", [])
 
-        response = s3.list_buckets()
-        for b in response.get("Buckets", []):
-            data.append({
-                "BucketName": b.get("Name"),
-                "CreationDate": b.get("CreationDate")
-            })
+        for b in buckets:
+            yield Bucket.from_api(b)
 
     except Exception as error:
         print("S3 error:", error)
-
-    return data
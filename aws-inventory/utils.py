@@ -1,17 +1,117 @@
+import json
+import os
+import random
+import threading
+import time
+
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+
+# One client per (service, region), each with a larger keep-alive pool
+_client_config = Config(max_pool_connections=16)
+_client_lock = threading.Lock()
+_clients = {}
+
+# Region catalog: opt-in status and service coverage, refreshed once a day
+REGION_CACHE = "regions_cache.json"
+REGION_CACHE_TTL = 24 * 3600
+TRACKED_SERVICES = ("ec2", "lambda", "rds", "s3")
+ENABLED_STATUSES = {"opt-in-not-required", "opted-in"}
+
+# Throttling and transient errors are retried with jittered exponential backoff
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5
+RETRYABLE_CODES = {
+    "Throttling", "ThrottlingException", "RequestLimitExceeded", "RequestThrottled",
+    "TooManyRequestsException", "InternalError", "InternalFailure", "ServiceUnavailable", "RequestTimeout",
+}
 
-def get_regions():
+def api_call(client, operation, **kwargs):
+    """One API call, retried on throttling, transient errors and dropped connections."""
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return getattr(client, operation)(**kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in RETRYABLE_CODES or attempt == RETRY_ATTEMPTS - 1:
+                raise
+        except (BotoConnectionError, HTTPClientError):
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+        time.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+
+def _load_region_cache():
+    if not os.path.exists(REGION_CACHE):
+        return None
     try:
-        ec2 = boto3.client("ec2")
-        resp = ec2.describe_regions(AllRegions=True)
-        return [r["RegionName"] for r in resp.get("Regions", [])]
+        with open(REGION_CACHE) as f:
+            catalog = json.load(f)
+    except (OSError, ValueError) as e:
+        print("Ignoring region cache:", e)
+        return None
+    if time.time() - catalog.get("created", 0) > REGION_CACHE_TTL:
+        return None
+    return catalog
+
+def _build_region_catalog():
+    ec2 = client("ec2")
+    resp = api_call(ec2, "describe_regions", AllRegions=True)
+    session = boto3.session.Session()
+    available = {}
+    for partition in session.get_available_partitions():
+        for service in TRACKED_SERVICES:
+            for region in session.get_available_regions(service, partition):
+                available.setdefault(region, []).append(service)
+
+    regions = {}
+    for r in resp.get("Regions", []):
+        status = r.get("OptInStatus", "opt-in-not-required")
+        regions[r["RegionName"]] = {
+            "opt_in_status": status,
+            "enabled": status in ENABLED_STATUSES,
+            "services": available.get(r["RegionName"], []),
+        }
+    catalog = {"created": time.time(), "regions": regions}
+    # Written aside and renamed, so a crash never leaves a truncated cache
+    tmp = f"{REGION_CACHE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp, REGION_CACHE)
+    return catalog
+
+def get_regions(service=None, refresh=False):
+    """
+    Enabled regions (optionally only those where service has an endpoint).
+    Opt-in regions that are not enabled are dropped: every call there
+    fails with AuthFailure. The catalog is cached in REGION_CACHE.
+    """
+    try:
+        catalog = None if refresh else _load_region_cache()
+        if catalog is None:
+            catalog = _build_region_catalog()
     except Exception as e:
         print("Error discovering regions:", e)
         return []
+    return sorted(
+        name for name, r in catalog["regions"].items()
+        if r["enabled"] and (service not in TRACKED_SERVICES or service in r["services"])
+    )
 
 def client(service, region=None):
+    key = (service, region)
     try:
-        return boto3.client(service, region_name=region)
+        with _client_lock:
+            if key not in _clients:
+                _clients[key] = boto3.client(service, region_name=region, config=_client_config)
+            return _clients[key]
     except Exception as e:
         print(f"Error creating client {service} {region}: {e}")
         return None
+
+def paginate(client, operation, result_key, **kwargs):
+    """Yield items from every page of an operation as each page arrives."""
+    paginator = client.get_paginator(operation)
+    for page in paginator.paginate(**kwargs):
+        for item in page.get(result_key, []):
+            yield item
@@ -0,0 +1,396 @@
+# async_backend.py
+"""
+asyncio collection backend built on aiobotocore (pip install aiobotocore).
+
+The thread pool tops out at a few dozen calls in flight; here every page
+request is a coroutine, so thousands can be outstanding from one process.
+Rows are built by the same functions the threaded fetchers use, so the
+DataFrames are identical.
+"""
+import asyncio
+import contextlib
+
+import metrics
+import organization
+import ratelimit
+import region_catalog
+import registry
+from normalize import FrameBuilder, to_frame
+from registry import RunOptions
+from utils import logger, page_request, next_page_tokens
+from services import costs, ebs, ec2, lambda_service, s3, tags
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # aiobotocore is only needed for --backend async
+    AioConfig = None
+    get_session = None
+
+# Requests in flight across every service and region
+MAX_IN_FLIGHT = 512
+# Keep-alive connections per client (one client per service and region)
+MAX_POOL_CONNECTIONS = 64
+
+
+def available():
+    return get_session is not None
+
+
+class AsyncBackend:
+    """Owns the aiobotocore clients and the global in-flight limit for one run."""
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, credentials=None):
+        self.session = get_session()
+        # Same keys utils.get_client takes: aws_access_key_id, ...
+        self.credentials = credentials or {}
+        metrics.instrument(self.session)
+        self.config = AioConfig(
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            retries={"mode": "standard", "max_attempts": 1}
+        )
+        self.limit = asyncio.Semaphore(max_in_flight)
+        self._stack = contextlib.AsyncExitStack()
+        self._clients = {}
+        self._clients_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._stack.aclose()
+
+    async def client(self, service, region=None):
+        key = (service, region)
+        async with self._clients_lock:
+            if key not in self._clients:
+                self._clients[key] = await self._stack.enter_async_context(
+                    self.session.create_client(
+                        service, region_name=region, config=self.config, **self.credentials
+                    )
+                )
+            return self._clients[key]
+
+    async def call(self, client, operation, **kwargs):
+        """One API call through the shared rate limiter and in-flight limit."""
+        service = client.meta.service_model.service_name
+        method = getattr(client, operation)
+
+        async def limited(**request):
+            # Only the request itself holds a slot, not rate-limit waits or backoff
+            async with self.limit:
+                return await method(**request)
+
+        return await ratelimit.call_async(limited, service, client.meta.region_name, **kwargs)
+
+    async def iter_pages(self, client, operation, **kwargs):
+        config, kwargs = page_request(client, operation, kwargs)
+        previous = None
+        while True:
+            page = await self.call(client, operation, **kwargs)
+            metrics.add("pages")
+            yield page
+
+            tokens = next_page_tokens(config, page, previous)
+            if tokens is None:
+                return
+            previous = tokens
+            kwargs.update(tokens)
+
+    async def iter_items(self, client, operation, result_key, **kwargs):
+        async for page in self.iter_pages(client, operation, **kwargs):
+            for item in page.get(result_key, []):
+                yield item
+
+# -------------------------------
+# Fetchers: same rows and DataFrames as services/*
+# -------------------------------
+async def get_region_catalog(credentials=None, account=None, ttl=region_catalog.TTL_SECONDS):
+    # Usually served from disk; a refresh is one sync call, run off the loop
+    try:
+        return await asyncio.to_thread(region_catalog.load, credentials, account, ttl=ttl)
+    except Exception as e:
+        logger.error(f"Error fetching regions: {e}")
+        return {"regions": {}}
+
+async def get_all_regions(credentials=None, account=None, ttl=region_catalog.TTL_SECONDS):
+    return region_catalog.enabled_regions(await get_region_catalog(credentials, account, ttl))
+
+async def fetch_ec2_instances(backend, region, filters=None):
+    try:
+        logger.info(f"Collecting EC2 instances from region: {region}")
+        client = await backend.client("ec2", region)
+        builder = FrameBuilder(ec2.FIELDS, Region=region)
+        async for page in backend.iter_pages(client, "describe_instances", **ec2.request_kwargs(filters)):
+            builder.extend(ec2.page_instances(page))
+        return builder.frame()
+    except Exception as e:
+        logger.error(f"EC2 Error in {region}: {e}")
+        return None
+
+async def fetch_unused_volumes(backend, region):
+    try:
+        logger.info(f"Fetching unused EBS volumes in {region}")
+        client = await backend.client("ec2", region)
+        builder = FrameBuilder(ebs.FIELDS, Region=region)
+        async for page in backend.iter_pages(client, "describe_volumes", **ebs.REQUEST_KWARGS):
+            builder.extend(page.get("Volumes", []))
+        df = builder.frame()
+        logger.info(f"Found {len(df)} unused volumes in {region}")
+        return df
+    except Exception as e:
+        logger.error(f"Error fetching EBS volumes in {region}: {e}")
+        return None
+
+async def tags_by_arn(backend, region, resource_type):
+    """services.tags.tags_by_arn: {ARN: tags}, or None when the Tagging API fails."""
+    try:
+        client = await backend.client("resourcegroupstaggingapi", region)
+        items = backend.iter_items(
+            client, "get_resources", "ResourceTagMappingList", **tags.request_kwargs(resource_type)
+        )
+        return {r["ResourceARN"]: tags.tag_dict(r.get("Tags")) async for r in items}
+    except Exception as e:
+        logger.warning(f"Tagging API failed for {resource_type} in {region}, using per-resource calls: {e}")
+        return None
+
+async def fetch_lambdas(backend, region, known=None):
+    logger.info(f"Fetching Lambda functions in {region}")
+    known = known or {}
+
+    async def tags_for(client, fn):
+        try:
+            response = await backend.call(client, "list_tags", Resource=fn["FunctionArn"])
+            return response.get("Tags", {})
+        except Exception as e:
+            tags.fallback_warning(fn["FunctionName"], e)
+            return {}
+
+    try:
+        client = await backend.client("lambda", region)
+        # The bulk tag listing runs while the functions are being listed
+        bulk_task = asyncio.ensure_future(tags_by_arn(backend, region, tags.LAMBDA_FUNCTION))
+        builder = FrameBuilder(lambda_service.FIELDS, Region=region)
+        functions = backend.iter_pages(
+            client, "list_functions", PaginationConfig={"PageSize": lambda_service.PAGE_SIZE}
+        )
+        async for page in functions:
+            page_functions = page.get("Functions", [])
+            bulk = await bulk_task
+            if bulk is not None:
+                for fn in page_functions:
+                    fn["Tags"] = bulk.get(fn["FunctionArn"], {})
+            else:
+                for fn in page_functions:
+                    fn["Tags"] = lambda_service.known_tags(fn, known)
+                # Tags for the whole page are fetched concurrently
+                missing = [fn for fn in page_functions if fn["Tags"] is None]
+                fetched = await asyncio.gather(*(tags_for(client, fn) for fn in missing))
+                for fn, fn_tags in zip(missing, fetched):
+                    fn["Tags"] = fn_tags
+            builder.extend(page_functions)
+        await bulk_task
+        df = builder.frame()
+        logger.info(f"Found {len(df)} Lambda functions in {region}")
+        return df
+    except Exception as e:
+        logger.error(f"Error fetching Lambda functions: {e}")
+        return None
+
+async def s3_bucket_config(backend, bucket):
+    name = bucket["Name"]
+    region = bucket.get("BucketRegion")
+    if not region:
+        client = await backend.client("s3")
+        region = s3.location_region(await backend.call(client, "get_bucket_location", Bucket=name))
+    client = await backend.client("s3", region)
+
+    async def config(operation):
+        try:
+            return await backend.call(client, operation, Bucket=name)
+        except Exception as e:
+            return s3.config_error(e, operation, name)
+
+    details = s3.config_details(*await asyncio.gather(
+        config("get_bucket_encryption"), config("get_bucket_versioning"), config("get_public_access_block")
+    ))
+    details["Region"] = region
+    return details
+
+async def s3_storage_metrics(backend, details):
+    async def region_metrics(region, queries, targets):
+        try:
+            client = await backend.client("cloudwatch", region)
+            for i in range(0, len(queries), s3.MAX_METRIC_QUERIES):
+                request = s3.metric_request(queries[i:i + s3.MAX_METRIC_QUERIES])
+                async for page in backend.iter_pages(client, "get_metric_data", **request):
+                    s3.apply_metric_results(details, targets, page.get("MetricDataResults", []))
+        except Exception as e:
+            logger.error(f"S3 storage metrics failed in {region}: {e}")
+            s3.metrics_failed(details, targets)
+
+    await asyncio.gather(*(
+        region_metrics(region, queries, targets)
+        for region, (queries, targets) in s3.metric_queries(details).items()
+    ))
+
+async def s3_bucket_details(backend, buckets, account=None, ttl=s3.DETAILS_TTL):
+    account = account or await asyncio.to_thread(organization.caller_account, backend.credentials or None)
+    cache = s3.DetailsCache(account, ttl)
+    stale = cache.stale(buckets)
+    logger.info(f"S3 details: {len(buckets) - len(stale)} buckets cached, {len(stale)} to fetch")
+    if stale:
+        async def fetch(bucket):
+            try:
+                return await s3_bucket_config(backend, bucket)
+            except Exception as e:
+                logger.warning(f"S3 details failed for {bucket['Name']}: {e}")
+                return None
+
+        configs = await asyncio.gather(*(fetch(b) for b in stale))
+        fresh = {b["Name"]: d for b, d in zip(stale, configs) if d is not None}
+        await s3_storage_metrics(backend, fresh)
+        cache.update(fresh, buckets)
+    cache.apply(buckets)
+
+async def s3_bucket_tags(backend, buckets, regions):
+    listings = await asyncio.gather(*(tags_by_arn(backend, region, tags.S3_BUCKET) for region in regions))
+    if s3.bulk_tags(buckets, listings):
+        return
+    client = await backend.client("s3")
+
+    async def get_tags(bucket):
+        try:
+            return s3.bucket_tagging(await backend.call(client, "get_bucket_tagging", Bucket=bucket["Name"]))
+        except Exception as e:
+            if not s3.no_tags(e):
+                tags.fallback_warning(bucket["Name"], e)
+            return {}
+
+    for bucket, bucket_tags in zip(buckets, await asyncio.gather(*(get_tags(b) for b in buckets))):
+        bucket["Tags"] = bucket_tags
+
+async def fetch_s3_buckets(backend, details_ttl=None, account=None, tag_regions=None):
+    try:
+        logger.info("Collecting S3 buckets...")
+        client = await backend.client("s3")
+        if client.can_paginate("list_buckets"):
+            buckets = [bucket async for bucket in backend.iter_items(client, "list_buckets", "Buckets")]
+        else:
+            buckets = (await backend.call(client, "list_buckets")).get("Buckets", [])
+        if details_ttl is not None:
+            await s3_bucket_details(backend, buckets, account, details_ttl)
+        if tag_regions is not None:
+            await s3_bucket_tags(backend, buckets, tag_regions)
+        return to_frame(buckets, s3.bucket_fields(details_ttl is not None, tag_regions is not None))
+    except Exception as e:
+        logger.error(f"S3 Error: {e}")
+        return None
+
+async def fetch_costs(backend, query=None, account=None):
+    try:
+        query = query or costs.CostQuery()
+        logger.info(f"Fetching AWS costs: {query}")
+        # STS is a sync call, so the account ID is looked up off the loop
+        account = account or await asyncio.to_thread(organization.caller_account, backend.credentials or None)
+        cache = costs.CostCache(account)
+        bounds, cached, fetch_start = cache.plan(query)
+
+        fetched = {}
+        if fetch_start is not None:
+            client = await backend.client("ce")
+            kwargs = costs.request_kwargs(query, fetch_start, bounds[-1][1])
+            rows = []
+            while True:
+                response = await backend.call(client, "get_cost_and_usage", **kwargs)
+                metrics.add("pages")
+                rows.extend(costs.cost_rows(response, query))
+                token = costs.next_token(response, kwargs)
+                if token is None:
+                    break
+                kwargs["NextPageToken"] = token
+            fetched = costs.split_periods(rows, bounds, fetch_start)
+            cache.save(query, bounds, fetched)
+
+        logger.info(f"AWS costs fetched successfully ({len(bounds) - len(fetched)} periods from cache).")
+        return costs.build_frame(query, bounds, cached, fetched)
+    except Exception as e:
+        logger.error(f"Error fetching costs: {e}")
+        return None
+
+# -------------------------------
+# Run
+# -------------------------------
+async def _run_task(service, region, coro):
+    with metrics.stage("fetch", service, region):
+        result = await coro
+        if result is None:
+            metrics.add("errors")
+        else:
+            metrics.add("rows", len(result))
+    return result
+
+async def fetch_pages(backend, spec, region=None):
+    """registry.fetch_pages: every item under spec.result_key."""
+    try:
+        logger.info(f"Fetching {spec.sheet} in {region or registry.GLOBAL}")
+        client = await backend.client(spec.client, region)
+        builder = FrameBuilder(spec.fields, Region=region)
+        async for page in backend.iter_pages(client, spec.operation, **spec.request_kwargs):
+            builder.extend(page.get(spec.result_key, []))
+        df = builder.frame()
+        logger.info(f"Found {len(df)} {spec.sheet} in {region or registry.GLOBAL}")
+        return df
+    except Exception as e:
+        logger.error(f"Error fetching {spec.sheet} in {region or registry.GLOBAL}: {e}")
+        return None
+
+# Native coroutines for the services that need more than fetch_pages
+ASYNC_FETCHERS = {
+    "ec2": lambda backend, options, region: fetch_ec2_instances(backend, region),
+    "ebs": lambda backend, options, region: fetch_unused_volumes(backend, region),
+    "lambda": lambda backend, options, region: fetch_lambdas(backend, region, options.lambda_known.get(region)),
+    "s3": lambda backend, options, region: fetch_s3_buckets(
+        backend, options.s3_details_ttl, options.account, options.regions
+    ),
+    "costs": lambda backend, options, region: fetch_costs(backend, options.cost_query, options.account),
+}
+
+def service_job(backend, spec, options, region):
+    if spec.name in ASYNC_FETCHERS:
+        return ASYNC_FETCHERS[spec.name](backend, options, region)
+    if spec.fetch is None:
+        return fetch_pages(backend, spec, region)
+    # A custom boto3 fetcher with no async twin runs on a worker thread
+    return asyncio.to_thread(spec.run, options, region)
+
+async def collect(options=None, max_in_flight=MAX_IN_FLIGHT, region_ttl=region_catalog.TTL_SECONDS):
+    """
+    Fetch every registered service in every region concurrently. Returns
+    (regions, {service: [DataFrame, ...]}, {service: {region, ...}}): the
+    frames in the shape scheduler.run_tasks returns (None for a failed
+    fetch) and the regions each service was listed in completely.
+    """
+    options = options or RunOptions()
+    async with AsyncBackend(max_in_flight, options.credentials) as backend:
+        with metrics.stage("regions", "ec2"):
+            catalog = await get_region_catalog(options.credentials, options.account, region_ttl)
+        options.regions = region_catalog.enabled_regions(catalog)
+        logger.info(f"Regions found: {options.regions}")
+
+        jobs = [
+            (spec.name, region, service_job(backend, spec, options, region))
+            for spec in registry.load()
+            for region in registry.task_regions(spec, catalog)
+        ]
+        frames = await asyncio.gather(*(_run_task(*job) for job in jobs))
+
+    results, fetched = {}, {}
+    for (service, region, _), df in zip(jobs, frames):
+        results.setdefault(service, []).append(df)
+        if df is not None:
+            fetched.setdefault(service, set()).add(region)
+    return options.regions, results, fetched
+
+def run(options=None, max_in_flight=MAX_IN_FLIGHT, region_ttl=region_catalog.TTL_SECONDS):
+    return asyncio.run(collect(options, max_in_flight, region_ttl))
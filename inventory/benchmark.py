@@ -0,0 +1,395 @@
+# benchmark.py
+"""
+Offline benchmark for the inventory pipeline and the cleanup Lambda.
+
+Every AWS call is answered by a synthetic account through botocore's
+before-call hook (the same mechanism botocore's Stubber uses), so real
+request building and client code run but nothing leaves the machine.
+
+    python benchmark.py --sizes 1000 10000 100000 --regions 16
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+# utils opens aws_inventory.log in the working directory on import
+ORIGINAL_CWD = os.getcwd()
+WORKDIR = tempfile.mkdtemp(prefix="inventory-bench-")
+HERE = os.path.dirname(os.path.abspath(__file__))
+os.chdir(WORKDIR)
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", "aws-auto-cleanup", "lambda"))
+for var, value in (("AWS_ACCESS_KEY_ID", "bench"), ("AWS_SECRET_ACCESS_KEY", "bench"),
+                   ("AWS_DEFAULT_REGION", "us-east-1")):
+    os.environ.setdefault(var, value)
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+import collector
+import ratelimit
+import utils
+from excel_writer import write_to_excel
+from parquet_writer import write_to_parquet
+from services.costs import fetch_costs
+from services.ebs import fetch_unused_volumes
+from services.ec2 import fetch_ec2_instances
+from services.lambda_service import fetch_lambdas
+from services.s3 import fetch_s3_buckets
+import registry
+
+# Share of the seeded resources per type
+MIX = {"ec2": 0.5, "ebs": 0.25, "lambda": 0.18, "s3": 0.05, "rds": 0.02}
+# Every Nth instance/volume is stopped/unattached and tagged AutoDelete=true
+CLEANUP_EVERY = 10
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class SyntheticAccount:
+    """Answers AWS API calls from index arithmetic; nothing is pre-built."""
+
+    def __init__(self, resources, regions):
+        self.regions = regions
+        self.counts = {kind: max(1, int(resources * share)) for kind, share in MIX.items()}
+        self.calls = Counter()
+
+    def per_region(self, kind, region):
+        total = self.counts[kind]
+        n = len(self.regions)
+        index = self.regions.index(region) if region in self.regions else 0
+        return total // n + (1 if index < total % n else 0)
+
+    @staticmethod
+    def page(indices, params, size_key, token_key, default_size):
+        start = int(params.get(token_key) or 0)
+        size = params.get(size_key) or default_size
+        chunk = indices[start:start + size]
+        token = str(start + size) if start + size < len(indices) else None
+        return chunk, token
+
+    @staticmethod
+    def filtered(count, params):
+        # Every CLEANUP_EVERY-th resource is tagged AutoDelete (and stopped);
+        # every other filter (e.g. status=available) matches everything
+        names = {f["Name"] for f in params.get("Filters") or ()}
+        if names & {"tag:AutoDelete", "instance-state-name"}:
+            return range(0, count, CLEANUP_EVERY)
+        return range(count)
+
+    def respond(self, service, operation, region, params):
+        self.calls[f"{service}.{operation}"] += 1
+        handler = getattr(self, f"{service}_{operation}".replace("-", "_"), None)
+        return handler(region, params) if handler else {}
+
+    # --- STS -------------------------------------------------------------
+    def sts_GetCallerIdentity(self, region, params):
+        return {"Account": "123456789012", "Arn": "arn:aws:iam::123456789012:user/bench", "UserId": "bench"}
+
+    # --- EC2 -------------------------------------------------------------
+    def ec2_DescribeRegions(self, region, params):
+        return {"Regions": [{"RegionName": r, "OptInStatus": "opt-in-not-required"} for r in self.regions]}
+
+    def ec2_DescribeInstances(self, region, params):
+        count = self.per_region("ec2", region)
+        chunk, token = self.page(self.filtered(count, params), params, "MaxResults", "NextToken", 1000)
+        instances = [{
+            "InstanceId": f"i-{region}-{i:08x}",
+            "InstanceType": "t3.micro" if i % 3 else "m5.large",
+            "State": {"Name": "stopped" if i % CLEANUP_EVERY == 0 else "running"},
+            "PrivateIpAddress": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+            "PublicIpAddress": None if i % 2 else f"54.0.{i >> 8 & 255}.{i & 255}",
+            "LaunchTime": BASE_TIME + timedelta(minutes=i),
+            "Placement": {"AvailabilityZone": f"{region}a"},
+            "Tags": [{"Key": "AutoDelete", "Value": "true"}] if i % CLEANUP_EVERY == 0 else [],
+        } for i in chunk]
+        response = {"Reservations": [{"Instances": instances}]}
+        if token:
+            response["NextToken"] = token
+        return response
+
+    def ec2_DescribeVolumes(self, region, params):
+        count = self.per_region("ebs", region)
+        chunk, token = self.page(self.filtered(count, params), params, "MaxResults", "NextToken", 500)
+        volumes = [{
+            "VolumeId": f"vol-{region}-{i:08x}",
+            "Size": 8 + i % 100,
+            "VolumeType": "gp3",
+            "State": "available",
+            "CreateTime": BASE_TIME + timedelta(minutes=i),
+            "Encrypted": bool(i % 2),
+        } for i in chunk]
+        response = {"Volumes": volumes}
+        if token:
+            response["NextToken"] = token
+        return response
+
+    def ec2_DescribeSnapshots(self, region, params):
+        count = self.per_region("ebs", region)
+        chunk, token = self.page(self.filtered(count, params), params, "MaxResults", "NextToken", 1000)
+        snapshots = [{"SnapshotId": f"snap-{region}-{i:08x}", "StartTime": BASE_TIME} for i in chunk]
+        response = {"Snapshots": snapshots}
+        if token:
+            response["NextToken"] = token
+        return response
+
+    def ec2_DescribeAddresses(self, region, params):
+        return {"Addresses": [{"AllocationId": f"eipalloc-{region}-{i}"} for i in range(3)]}
+
+    # --- RDS -------------------------------------------------------------
+    def rds_DescribeDBInstances(self, region, params):
+        count = self.per_region("rds", region)
+        chunk, token = self.page(range(count), params, "MaxRecords", "Marker", 100)
+        instances = [{
+            "DBInstanceIdentifier": f"db-{region}-{i}",
+            "Engine": "postgres" if i % 2 else "mysql",
+            "DBInstanceStatus": "available",
+            "DBInstanceClass": "db.t3.medium",
+            "MultiAZ": bool(i % 3 == 0),
+            "AllocatedStorage": 20 + i % 100,
+            "Endpoint": {"Address": f"db-{i}.{region}.rds.amazonaws.com", "Port": 5432},
+            "InstanceCreateTime": BASE_TIME + timedelta(minutes=i),
+            "TagList": [{"Key": "team", "Value": "bench"}],
+        } for i in chunk]
+        response = {"DBInstances": instances}
+        if token:
+            response["Marker"] = token
+        return response
+
+    # --- Lambda ----------------------------------------------------------
+    def lambda_ListFunctions(self, region, params):
+        count = self.per_region("lambda", region)
+        chunk, token = self.page(range(count), params, "MaxItems", "Marker", 50)
+        functions = [{
+            "FunctionName": f"fn-{i}",
+            "FunctionArn": f"arn:aws:lambda:{region}:123456789012:function:fn-{i}",
+            "Runtime": "python3.11" if i % 2 else "nodejs20.x",
+            "MemorySize": 128,
+            "Timeout": 30,
+            "LastModified": "2024-01-01T00:00:00.000+0000",
+        } for i in chunk]
+        response = {"Functions": functions}
+        if token:
+            response["NextMarker"] = token
+        return response
+
+    def lambda_ListTags(self, region, params):
+        return {"Tags": {"team": "bench"}}
+
+    # --- Resource Groups Tagging API ---------------------------------------
+    def resourcegroupstaggingapi_GetResources(self, region, params):
+        if params["ResourceTypeFilters"] == ["lambda:function"]:
+            arns = [f"arn:aws:lambda:{region}:123456789012:function:fn-{i}"
+                    for i in range(self.per_region("lambda", region))]
+        else:
+            # Every synthetic bucket lives in the first region
+            s3_count = self.counts["s3"] if region == self.regions[0] else 0
+            arns = [f"arn:aws:s3:::bench-bucket-{i}" for i in range(s3_count)]
+        chunk, token = self.page(arns, params, "ResourcesPerPage", "PaginationToken", 100)
+        response = {"ResourceTagMappingList": [
+            {"ResourceARN": arn, "Tags": [{"Key": "team", "Value": "bench"}]} for arn in chunk
+        ]}
+        if token:
+            response["PaginationToken"] = token
+        return response
+
+    # --- S3 / Cost Explorer ----------------------------------------------
+    def s3_ListBuckets(self, region, params):
+        chunk, token = self.page(range(self.counts["s3"]), params, "MaxBuckets", "ContinuationToken", 10000)
+        response = {"Buckets": [{"Name": f"bench-bucket-{i}", "CreationDate": BASE_TIME} for i in chunk]}
+        if token:
+            response["ContinuationToken"] = token
+        return response
+
+    def s3_GetBucketVersioning(self, region, params):
+        return {"Status": "Enabled"} if int(params["Bucket"].rsplit("-", 1)[1]) % 2 else {}
+
+    def cloudwatch_GetMetricData(self, region, params):
+        return {"MetricDataResults": [
+            {"Id": q["Id"], "Values": [float(1 << 20)], "StatusCode": "Complete"}
+            for q in params["MetricDataQueries"]
+        ]}
+
+    def ce_GetCostAndUsage(self, region, params):
+        period = params.get("TimePeriod", {})
+        groups = [{"Keys": [f"Service {i}"], "Metrics": {"UnblendedCost": {"Amount": str(i * 1.5), "Unit": "USD"}}}
+                  for i in range(50)]
+        return {"ResultsByTime": [{"TimePeriod": period, "Groups": groups}]}
+
+
+def install_stub(session, account):
+    """Route every call made by clients of session to the synthetic account."""
+
+    def capture_params(params, context, **kwargs):
+        context["bench_params"] = params
+
+    def respond(model, context, request_signer, **kwargs):
+        service = model.service_model.service_name
+        params = context.get("bench_params", {})
+        parsed = account.respond(service, model.name, request_signer.region_name, params)
+        return AWSResponse(None, 200, {}, None), parsed
+
+    session.events.register("before-parameter-build.*.*", capture_params)
+    session.events.register("before-call.*.*", respond)
+
+
+# -------------------------------
+# Measurement helpers
+# -------------------------------
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS counter (Linux); harmless elsewhere."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Stage:
+    def __init__(self, account, results, size, name):
+        self.account = account
+        self.results = results
+        self.size = size
+        self.name = name
+        self.rows = 0
+
+    def __enter__(self):
+        reset_peak_rss()
+        self.calls_before = sum(self.account.calls.values())
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.results.append({
+            "resources": self.size,
+            "stage": self.name,
+            "seconds": round(elapsed, 3),
+            "api_calls": sum(self.account.calls.values()) - self.calls_before,
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / elapsed) if elapsed and self.rows else 0,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        })
+        return False
+
+
+class FakeContext:
+    function_name = "aws-auto-cleanup-bench"
+
+    def get_remaining_time_in_millis(self):
+        return 900000
+
+
+def rows_in(report):
+    return sum(len(df) for df in report.values())
+
+
+def run_size(size, regions, stages, results):
+    account = SyntheticAccount(size, regions)
+
+    utils.reset_clients()
+    ratelimit.reset()
+    install_stub(utils.get_session(), account)
+
+    registry.load()
+    report = {}
+    if "fetchers" in stages:
+        fetchers = [
+            ("EC2_Instances", "fetch:ec2", lambda: [fetch_ec2_instances(r) for r in regions]),
+            ("Unused_EBS", "fetch:ebs", lambda: [fetch_unused_volumes(r) for r in regions]),
+            ("Lambda", "fetch:lambda", lambda: [fetch_lambdas(r) for r in regions]),
+            ("S3_Buckets", "fetch:s3", lambda: [fetch_s3_buckets()]),
+            # ttl=0: every bucket's details are fetched, none come from the cache
+            ("S3_Buckets", "fetch:s3+details", lambda: [fetch_s3_buckets(details_ttl=0)]),
+            ("AWS_Costs", "fetch:costs", lambda: [fetch_costs()]),
+            ("RDS_Instances", "fetch:rds", lambda: [registry.fetch_pages(registry.get("rds"), r) for r in regions]),
+        ]
+        for sheet, name, fetch in fetchers:
+            with Stage(account, results, size, name) as stage:
+                frames = fetch()
+                report[sheet] = collector.concat_frames(frames)
+                stage.rows = len(report[sheet])
+
+    if "collector" in stages:
+        with Stage(account, results, size, "collector.main") as stage:
+            stage.rows = rows_in(collector.main(formats=["excel"]))
+
+    if report and "writers" in stages:
+        with Stage(account, results, size, "excel:pandas") as stage:
+            write_to_excel(report, output_file="bench_pandas.xlsx")
+            stage.rows = rows_in(report)
+        with Stage(account, results, size, "excel:streaming") as stage:
+            write_to_excel(report, output_file="bench_streaming.xlsx", streaming=True)
+            stage.rows = rows_in(report)
+        with Stage(account, results, size, "parquet") as stage:
+            write_to_parquet(report, output_dir="bench_parquet")
+            stage.rows = rows_in(report)
+
+    if "cleanup" in stages:
+        import cleanup
+        boto3.setup_default_session()
+        install_stub(boto3.DEFAULT_SESSION, account)
+        os.environ["CLEANUP_REGIONS"] = ",".join(regions)
+        with Stage(account, results, size, "cleanup:dry-run") as stage, \
+                contextlib.redirect_stdout(io.StringIO()):
+            # The handler prints every batch; keep the report readable
+            result = cleanup.lambda_handler({"dry_run": True}, FakeContext())
+            stage.rows = sum(len(ids) for ids in result["would_delete"].values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline inventory/cleanup benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="synthetic account sizes in resources (e.g. 1000 10000 100000 1000000)")
+    parser.add_argument("--regions", type=int, default=16, help="number of regions to spread resources over")
+    parser.add_argument("--stages", nargs="+", default=["fetchers", "collector", "writers", "cleanup"],
+                        choices=["fetchers", "collector", "writers", "cleanup"])
+    parser.add_argument("--keep-rate-limits", action="store_true",
+                        help="keep the production token-bucket rates instead of lifting them")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    utils.logger.setLevel(logging.WARNING)
+    if not args.keep_rate_limits:
+        ratelimit.INITIAL_RATE = ratelimit.MAX_RATE = 1e9
+
+    all_regions = boto3.session.Session().get_available_regions("ec2")
+    regions = all_regions[:args.regions]
+
+    results = []
+    for size in args.sizes:
+        run_size(size, regions, args.stages, results)
+
+    header = f"{'resources':>10} {'stage':<18} {'seconds':>9} {'api_calls':>9} {'rows':>9} {'rows/s':>10} {'peak_rss_mb':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['resources']:>10} {r['stage']:<18} {r['seconds']:>9} {r['api_calls']:>9} "
+              f"{r['rows']:>9} {r['rows_per_sec']:>10} {r['peak_rss_mb']:>11}")
+    print(f"\nOutput files in {WORKDIR}")
+
+    if args.json:
+        with open(os.path.join(ORIGINAL_CWD, args.json), "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
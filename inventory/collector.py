@@ -1,56 +1,267 @@
-import pandas as pd
-import boto3
-from services.ec2 import fetch_ec2_instances
-from services.s3 import fetch_s3_buckets
-from services.ebs import fetch_unused_volumes
-from services.costs import fetch_costs
+import argparse
+from services.s3 import DETAILS_TTL
+from services.costs import CostQuery, DIMENSIONS, TAG_PREFIX, DEFAULT_DAYS
 from excel_writer import write_to_excel
-from utils import logger
+from parquet_writer import write_to_parquet
+from registry import RunOptions
+from scheduler import run_tasks, concat_frames, completed
+from snapshot_store import SnapshotStore, change_summary
+from utils import logger, get_client, api_call, reset_clients
+import async_backend
+import metrics
+import organization
+import ratelimit
+import region_catalog
+import registry
 
-def get_all_regions():
+def load_region_catalog(credentials=None, account=None, ttl=region_catalog.TTL_SECONDS):
     try:
-        ec2 = boto3.client("ec2")
-        response = ec2.describe_regions(AllRegions=False)
-        return [r["RegionName"] for r in response["Regions"]]
+        return region_catalog.load(credentials, account, ttl=ttl)
     except Exception as e:
         logger.error(f"Error fetching regions: {e}")
-        return []
+        return {"regions": {}}
 
-def main():
+def get_all_regions(credentials=None, account=None, ttl=region_catalog.TTL_SECONDS):
+    """Enabled regions only; opt-in regions that are off are never listed."""
+    return region_catalog.enabled_regions(load_region_catalog(credentials, account, ttl))
+
+def known_lambdas(store):
+    """
+    Previous LastModified/Tags per account, region and function, for tag
+    reuse. Single-account snapshots have no Account column (key None).
+    """
+    known = {}
+    for row in store.load("Lambda").values():
+        regions = known.setdefault(row.get("Account"), {})
+        regions.setdefault(row["Region"], {})[row["FunctionName"]] = (row["LastModified"], row["Tags"])
+    return known
+
+def collect_threaded(run, region_ttl=region_catalog.TTL_SECONDS):
+    with metrics.stage("regions", "ec2"):
+        catalog = load_region_catalog(run.credentials, run.account, region_ttl)
+    run.regions = region_catalog.enabled_regions(catalog)
+    logger.info(f"Regions found: {run.regions}")
+
+    # Every registered (service, region) fetch runs at once on a bounded pool
+    tasks = registry.plan_tasks(run, catalog)
+    results = run_tasks(tasks)
+    return results, completed(tasks, results)
+
+def collect(run, backend="threads", region_ttl=region_catalog.TTL_SECONDS):
+    """
+    ({service: [DataFrame, ...]}, {service: {region, ...}}) for one account:
+    the frames (None where a fetch failed) and where each service was
+    listed completely.
+    """
+    if backend == "async":
+        _, results, fetched = async_backend.run(run, region_ttl=region_ttl)
+        return results, fetched
+    return collect_threaded(run, region_ttl)
+
+def listed_partitions(spec, fetched, by_account=False):
+    """
+    (columns, {values, ...}) of the snapshot partitions spec was listed in
+    completely: Account in organization sweeps, where fetched holds
+    (account, region) pairs, and Region for regional services.
+    """
+    columns = (["Account"] if by_account else []) + (["Region"] if spec.scope == registry.REGIONAL else [])
+    partitions = set()
+    for done in fetched.get(spec.name, ()):
+        account, region = done if by_account else (None, done)
+        values = {"Account": account, "Region": region}
+        partitions.add(tuple(values[c] for c in columns))
+    return columns, partitions
+
+def collect_account(account_id, credentials, lambda_known=None, backend="threads",
+                    region_ttl=region_catalog.TTL_SECONDS, options=None):
+    """
+    Process-pool entry point for an organization sweep: one account.
+    lambda_known is that account's {region: {function: ...}}.
+    """
+    # Nothing inherited from the parent process is reused across the fork
+    reset_clients()
+    ratelimit.reset()
+    metrics.reset()
+    logger.info(f"Collecting account {account_id}")
+    run = (options or RunOptions()).for_account(account_id, credentials, lambda_known)
+    results, fetched = collect(run, backend, region_ttl)
+    return results, fetched, metrics.export()
+
+def main(formats=("excel",), incremental=False, snapshot_db="inventory_snapshot.db",
+         metrics_json="aws_inventory_metrics.json", prometheus_file=None, backend="threads",
+         organization_sweep=False, role_name=organization.DEFAULT_ROLE, accounts=None, processes=None,
+         credentials_cache=organization.CREDENTIALS_CACHE, refresh_regions=False, cost_query=None,
+         s3_details_ttl=DETAILS_TTL):
     logger.info("Starting AWS Inventory Collection...")
+    cost_query = cost_query or CostQuery()
+    ratelimit.reset()
+    metrics.reset()
+    services = registry.load()
+    # Last run's timings (before this run overwrites them) order the tasks
+    options = RunOptions(
+        cost_query=cost_query, s3_details_ttl=s3_details_ttl, weights=registry.measured_weights(metrics_json)
+    )
+
+    store = SnapshotStore(snapshot_db) if incremental else None
+    lambda_known = known_lambdas(store) if store else {}
 
-    regions = get_all_regions()
-    logger.info(f"Regions found: {regions}")
+    if backend == "async" and not async_backend.available():
+        logger.error("aiobotocore is not installed; falling back to the threaded backend.")
+        backend = "threads"
 
-    # EC2 Instances
-    all_ec2 = []
-    for region in regions:
-        df = fetch_ec2_instances(region)
-        all_ec2.append(df)
-    ec2_df = pd.concat(all_ec2, ignore_index=True) if all_ec2 else pd.DataFrame()
+    region_ttl = 0 if refresh_regions else region_catalog.TTL_SECONDS
+    if organization_sweep:
+        with metrics.stage("accounts", "organizations"):
+            member_accounts = organization.list_accounts(accounts)
+        results, fetched = organization.sweep(
+            member_accounts, collect_account, role_name=role_name, processes=processes,
+            credentials_cache=credentials_cache, lambda_known=lambda_known, backend=backend,
+            region_ttl=region_ttl, options=options
+        )
+    else:
+        options.lambda_known = lambda_known.get(None, {})
+        results, fetched = collect(options, backend, region_ttl)
 
-    # S3 Buckets
-    s3_df = fetch_s3_buckets()
+    report = {spec.sheet: concat_frames(results.get(spec.name, [])) for spec in services}
+    output_name = "aws_inventory"
 
-    # Unused EBS Volumes
-    all_vols = []
-    for region in regions:
-        df = fetch_unused_volumes(region)
-        all_vols.append(df)
-    ebs_df = pd.concat(all_vols, ignore_index=True) if all_vols else pd.DataFrame()
+    # Incremental runs only write what changed since the last snapshot.
+    # Resources are only reported deleted where their listing succeeded
+    if store:
+        with metrics.stage("diff", "snapshot"):
+            report = {
+                spec.sheet: store.apply(
+                    spec.sheet, report[spec.sheet], spec.keys(options),
+                    *listed_partitions(spec, fetched, organization_sweep)
+                )
+                for spec in services
+            }
+            store.close()
+        report["Changes"] = change_summary(report)
+        output_name = "aws_inventory_delta"
 
-    # Costs
-    cost_df = fetch_costs()
+    rows = sum(len(df) for df in report.values())
 
     # Write to Excel
-    write_to_excel({
-        "EC2_Instances": ec2_df,
-        "S3_Buckets": s3_df,
-        "Unused_EBS": ebs_df,
-        "AWS_Costs": cost_df
-    })
+    if "excel" in formats:
+        output_file = f"{output_name}.xlsx"
+        with metrics.stage("write", "excel"):
+            write_to_excel(report, output_file=output_file, streaming=True)
+            metrics.add("rows", rows)
+            metrics.add("bytes", metrics.path_size(output_file))
+
+    # Columnar copies for analytics, partitioned by region and snapshot date
+    for file_format in ("parquet", "arrow"):
+        if file_format in formats:
+            output_dir = f"{output_name}_{file_format}"
+            with metrics.stage("write", file_format):
+                write_to_parquet(report, output_dir=output_dir, file_format=file_format)
+                metrics.add("rows", rows)
+                metrics.add("bytes", metrics.path_size(output_dir))
+
+    metrics.finish()
+    metrics.log_top()
+    if metrics_json:
+        metrics.write_json(metrics_json)
+    if prometheus_file:
+        metrics.write_prometheus(prometheus_file)
 
     logger.info("Inventory collection completed successfully.")
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect an AWS inventory report.")
+    parser.add_argument(
+        "--format", dest="formats", action="append", choices=["excel", "parquet", "arrow"],
+        help="output format; repeat for several (default: excel)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="diff against the local snapshot and write only the changes"
+    )
+    parser.add_argument(
+        "--snapshot-db", default="inventory_snapshot.db",
+        help="SQLite file holding the previous snapshot (default: inventory_snapshot.db)"
+    )
+    parser.add_argument(
+        "--backend", choices=["threads", "async"], default="threads",
+        help="threads (boto3 on a thread pool) or async (aiobotocore, for very large estates)"
+    )
+    parser.add_argument(
+        "--refresh-regions", action="store_true",
+        help="ignore the cached region catalog (.region_cache/) and ask EC2 again"
+    )
+    parser.add_argument(
+        "--organization", dest="organization_sweep", action="store_true",
+        help="sweep every active account in the AWS Organization (run from the management account)"
+    )
+    parser.add_argument(
+        "--role-name", default=organization.DEFAULT_ROLE,
+        help=f"role to assume in each member account (default: {organization.DEFAULT_ROLE})"
+    )
+    parser.add_argument(
+        "--account", dest="accounts", action="append",
+        help="limit the sweep to this account ID; repeat for several"
+    )
+    parser.add_argument(
+        "--processes", type=int,
+        help="worker processes for the sweep (default: one per account, up to the CPU count)"
+    )
+    parser.add_argument(
+        "--credentials-cache", default=organization.CREDENTIALS_CACHE,
+        help="file reusing assumed-role credentials between runs until they expire "
+             f"(default: {organization.CREDENTIALS_CACHE}); '' disables"
+    )
+    parser.add_argument(
+        "--cost-granularity", choices=["DAILY", "MONTHLY"], default="DAILY",
+        help="Cost Explorer granularity (default: DAILY)"
+    )
+    parser.add_argument(
+        "--cost-group-by", action="append",
+        help=f"group costs by {', '.join(DIMENSIONS)} or {TAG_PREFIX}<key>; repeat for two (default: service)"
+    )
+    parser.add_argument(
+        "--cost-days", type=int, default=DEFAULT_DAYS,
+        help=f"days of costs to report; settled days are cached in .cost_cache/ (default: {DEFAULT_DAYS})"
+    )
+    parser.add_argument(
+        "--s3-details-ttl", type=int, default=DETAILS_TTL,
+        help=f"seconds to reuse cached S3 bucket details (region, size, encryption, ...); 0 refetches (default: {DETAILS_TTL})"
+    )
+    parser.add_argument(
+        "--no-s3-details", dest="s3_details", action="store_false",
+        help="list bucket names and creation dates only"
+    )
+    parser.add_argument(
+        "--metrics-json", default="aws_inventory_metrics.json",
+        help="JSON run summary with per-stage timings and API counts (default: aws_inventory_metrics.json)"
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        help="also write the metrics for node_exporter's textfile collector, e.g. /var/lib/node_exporter/aws_inventory.prom"
+    )
+    args = parser.parse_args()
+    try:
+        args.cost_query = CostQuery(args.cost_granularity, args.cost_group_by or ["service"], days=args.cost_days)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(
+        formats=args.formats or ["excel"],
+        incremental=args.incremental,
+        snapshot_db=args.snapshot_db,
+        metrics_json=args.metrics_json,
+        prometheus_file=args.prometheus_textfile,
+        backend=args.backend,
+        organization_sweep=args.organization_sweep,
+        role_name=args.role_name,
+        accounts=args.accounts,
+        processes=args.processes,
+        credentials_cache=args.credentials_cache,
+        refresh_regions=args.refresh_regions,
+        cost_query=args.cost_query,
+        s3_details_ttl=args.s3_details_ttl if args.s3_details else None
+    )
@@ -1,24 +1,108 @@
 # excel_writer.py (updated)
+from datetime import datetime
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 from utils import logger
+from openpyxl import Workbook
+from openpyxl.formatting.rule import FormulaRule
 from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
+
+RED_FILL = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
+
+def add_missing_tags_rule(worksheet, columns, last_row=None):
+    """
+    Highlight empty Tags cells in red with one sheet-level conditional
+    format instead of styling every cell.
+    """
+    if "Tags" not in columns:
+        return
+    col = get_column_letter(list(columns).index("Tags") + 1)
+    # Without a row count (streaming) the rule covers the whole column
+    cell_range = f"{col}2:{col}{last_row or 1048576}"
+    rule = FormulaRule(formula=[f'OR(LEN({col}2)=0,{col}2="{{}}")'], fill=RED_FILL)
+    worksheet.conditional_formatting.add(cell_range, rule)
+
+def excel_value(value):
+    """Convert one value into something openpyxl can write."""
+    if isinstance(value, dict):
+        return str(value) if value else None
+    if isinstance(value, (list, tuple, set)):
+        return ", ".join(str(v) for v in value) if value else None
+    # Before the datetime check: NaT is a datetime too
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime):
+        # Excel has no timezone support
+        return value.replace(tzinfo=None)
+    if isinstance(value, np.generic):
+        # numpy bools/ints from typed columns; openpyxl wants Python scalars
+        return value.item()
+    return value
+
+def excel_frame(df):
+    """Copy of df with timezone-aware columns converted to naive UTC for Excel."""
+    tz_columns = [c for c in df.columns if isinstance(df[c].dtype, pd.DatetimeTZDtype)]
+    if not tz_columns:
+        return df
+    return df.assign(**{c: df[c].dt.tz_convert("UTC").dt.tz_localize(None) for c in tz_columns})
+
+def iter_sheet_rows(data):
+    """Return (columns, row iterator) for a DataFrame or an iterable of dicts."""
+    if isinstance(data, pd.DataFrame):
+        return list(data.columns), data.itertuples(index=False, name=None)
+
+    rows = iter(data)
+    first = next(rows, None)
+    if first is None:
+        return [], iter(())
+    columns = list(first.keys())
+    return columns, (tuple(row.get(c) for c in columns) for row in chain([first], rows))
+
+def stream_to_excel(sheets, output_file="aws_inventory.xlsx"):
+    """
+    Write each sheet row by row through openpyxl's write-only mode. Rows
+    are serialized as they are produced, so memory stays flat no matter
+    how many rows a sheet has. Sheets may be DataFrames or generators of
+    row dicts straight from the fetchers.
+    """
+    try:
+        logger.info(f"Streaming inventory to {output_file}")
+
+        wb = Workbook(write_only=True)
+        for sheet_name, data in sheets.items():
+            worksheet = wb.create_sheet(sheet_name)
+            columns, rows = iter_sheet_rows(data)
+            if not columns:
+                continue
+
+            add_missing_tags_rule(worksheet, columns)
+            worksheet.append(columns)
+            for row in rows:
+                worksheet.append([excel_value(v) for v in row])
+
+        wb.save(output_file)
+        logger.info("Excel report created successfully.")
+
+    except Exception as e:
+        logger.error(f"Excel writing error: {e}")
+
+def write_to_excel(dataframes_dict, output_file="aws_inventory.xlsx", streaming=False):
+    if streaming:
+        return stream_to_excel(dataframes_dict, output_file)
 
-def write_to_excel(dataframes_dict, output_file="aws_inventory.xlsx"):
     try:
         logger.info(f"Writing inventory to {output_file}")
 
         with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
             for sheet_name, df in dataframes_dict.items():
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                workbook = writer.book
+                excel_frame(df).to_excel(writer, sheet_name=sheet_name, index=False)
                 worksheet = writer.sheets[sheet_name]
 
                 # Highlight missing tags in red
-                if "Tags" in df.columns:
-                    red_fill = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
-                    for row_idx, cell_value in enumerate(df["Tags"], start=2):  # +2 because header=1
-                        if not cell_value:
-                            worksheet.cell(row=row_idx, column=df.columns.get_loc("Tags")+1).fill = red_fill
+                add_missing_tags_rule(worksheet, df.columns, last_row=len(df) + 1)
 
         logger.info("Excel report created successfully.")
 
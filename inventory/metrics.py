@@ -0,0 +1,203 @@
+# metrics.py
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import datetime, timezone
+
+logger = logging.getLogger("aws-inventory")
+
+# Every counter kept per (stage, service, region)
+FIELDS = ("seconds", "api_calls", "api_seconds", "pages", "retries", "throttles", "errors", "rows", "bytes")
+
+GLOBAL_REGION = "global"
+PROMETHEUS_PREFIX = "aws_inventory"
+
+_lock = threading.Lock()
+_stats = {}
+# Per thread and per asyncio task, so both backends attribute calls correctly
+_current = ContextVar("inventory_metrics_stage", default=None)
+_run = {"started": time.time(), "finished": None}
+
+
+def reset():
+    """Start a new run with empty counters."""
+    with _lock:
+        _stats.clear()
+        _run.update(started=time.time(), finished=None)
+
+def finish():
+    _run["finished"] = time.time()
+
+def _key(stage, service, region):
+    return (stage, service or "", region or GLOBAL_REGION)
+
+def _current_key(default_service=None, default_region=None):
+    key = _current.get()
+    return key or _key("api", default_service, default_region)
+
+def add(field, value=1, key=None):
+    """Add value to field for key, or for the stage running on this thread."""
+    key = key or _current_key()
+    with _lock:
+        stats = _stats.setdefault(key, dict.fromkeys(FIELDS, 0))
+        stats[field] += value
+
+def export():
+    """Raw counters, picklable, for handing back from a worker process."""
+    with _lock:
+        return [(key, dict(stats)) for key, stats in _stats.items()]
+
+def merge(rows):
+    """Fold counters exported by another process into this run."""
+    for key, stats in rows:
+        for field, value in stats.items():
+            add(field, value, tuple(key))
+
+@contextmanager
+def stage(name, service=None, region=None):
+    """
+    Attribute everything recorded on this thread (or asyncio task) to
+    (name, service, region) and time the block. Yields the key so callers
+    can add rows/bytes.
+    """
+    key = _key(name, service, region)
+    token = _current.set(key)
+    started = time.perf_counter()
+    try:
+        yield key
+    finally:
+        add("seconds", time.perf_counter() - started, key)
+        _current.reset(token)
+
+def in_stage(func):
+    """
+    func wrapped to record under the caller's stage on any thread. Pool
+    threads do not inherit context variables, so without this a fetcher's
+    own thread pool counts its calls under ("api", ...).
+    """
+    context = copy_context()
+
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+# -------------------------------
+# botocore hooks: every request, whichever code path made it
+# -------------------------------
+def _before_call(model, context, request_signer=None, **kwargs):
+    region = request_signer.region_name if request_signer is not None else None
+    key = _current_key(model.service_model.service_name, region)
+    context["metrics_key"] = key
+    context["metrics_started"] = time.perf_counter()
+    add("api_calls", 1, key)
+
+def _after_call(http_response, parsed, context, **kwargs):
+    key = context.get("metrics_key")
+    if key is None:
+        return
+    add("api_seconds", time.perf_counter() - context["metrics_started"], key)
+    # Throttles and retries are counted by ratelimit.call, which sees the retry decision
+    if http_response is not None and http_response.status_code >= 300:
+        add("errors", 1, key)
+
+def _after_call_error(context, exception, **kwargs):
+    # Connection-level failures never reach after-call
+    key = context.get("metrics_key")
+    if key is not None:
+        add("errors", 1, key)
+
+def instrument(session):
+    """
+    Register the counting hooks on a boto3 session, or a botocore /
+    aiobotocore session, before any clients are created from it.
+    """
+    register = session.events.register if hasattr(session, "events") else session.register
+    register("before-call.*.*", _before_call, unique_id="inventory-metrics-before")
+    register("after-call.*.*", _after_call, unique_id="inventory-metrics-after")
+    register("after-call-error.*.*", _after_call_error, unique_id="inventory-metrics-error")
+
+def path_size(path):
+    """Bytes on disk for a file or every file under a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+# -------------------------------
+# Reporting
+# -------------------------------
+def _rollup(rows, label):
+    totals = {}
+    for row in rows:
+        bucket = totals.setdefault(row[label], dict.fromkeys(FIELDS, 0))
+        for field in FIELDS:
+            bucket[field] += row[field]
+    return {name: {f: round(v, 3) for f, v in values.items()} for name, values in sorted(totals.items())}
+
+def summary():
+    """Run summary: one entry per stage plus totals by service and by region."""
+    with _lock:
+        rows = [
+            dict(stage=stage, service=service, region=region, **{f: round(v, 3) for f, v in stats.items()})
+            for (stage, service, region), stats in sorted(_stats.items())
+        ]
+    finished = _run["finished"] or time.time()
+    return {
+        "started": datetime.fromtimestamp(_run["started"], timezone.utc).isoformat(),
+        "duration_seconds": round(finished - _run["started"], 3),
+        "stages": rows,
+        "by_service": _rollup(rows, "service"),
+        "by_region": _rollup(rows, "region"),
+    }
+
+def write_json(path):
+    with open(path, "w") as f:
+        json.dump(summary(), f, indent=2)
+    logger.info(f"Run metrics written to {path}")
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text():
+    """Render the run in the Prometheus text exposition format."""
+    data = summary()
+    lines = []
+    for field in FIELDS:
+        name = f"{PROMETHEUS_PREFIX}_{field}"
+        lines.append(f"# TYPE {name} gauge")
+        for row in data["stages"]:
+            labels = ",".join(f'{label}="{_escape(row[label])}"' for label in ("stage", "service", "region"))
+            lines.append(f"{name}{{{labels}}} {row[field]}")
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge")
+    lines.append(f"{PROMETHEUS_PREFIX}_run_duration_seconds {data['duration_seconds']}")
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_last_run_timestamp_seconds gauge")
+    lines.append(f"{PROMETHEUS_PREFIX}_last_run_timestamp_seconds {int(_run['finished'] or time.time())}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path):
+    """
+    Write a node_exporter textfile. The file is renamed into place so the
+    exporter never reads a half-written run.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+    logger.info(f"Prometheus metrics written to {path}")
+
+def log_top(n=5):
+    """Log the slowest stages so the dominant region/service is obvious."""
+    rows = sorted(summary()["stages"], key=lambda r: r["seconds"], reverse=True)[:n]
+    logger.info("Slowest stages:")
+    for row in rows:
+        logger.info(
+            f"{row['stage']} {row['service']} {row['region']}: {row['seconds']}s, "
+            f"{row['api_calls']} calls, {row['throttles']} throttles, {row['rows']} rows"
+        )
@@ -0,0 +1,104 @@
+# normalize.py
+"""
+Build DataFrames column by column from raw API records.
+
+Each service declares its columns once as a list of Field specs; the
+builder pulls every field straight into a column list (no per-row dict)
+and converts whole columns at the end: timestamps in one
+pd.to_datetime(utc=True) call, low-cardinality text as categoricals.
+"""
+import numpy as np
+import pandas as pd
+
+KINDS = ("object", "str", "category", "datetime", "int", "float", "bool")
+
+
+class Field:
+    """
+    One output column. source is a key of the record, a tuple of nested
+    keys, a callable taking the record, or None for a value passed to the
+    builder (e.g. Region).
+    """
+
+    __slots__ = ("name", "source", "kind")
+
+    def __init__(self, name, source=None, kind="object"):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown field kind {kind!r} for {name}")
+        self.name = name
+        self.source = source
+        self.kind = kind
+
+    def getter(self):
+        source = self.source
+        if callable(source):
+            return source
+        if isinstance(source, tuple):
+            def nested(record):
+                for key in source:
+                    if not isinstance(record, dict):
+                        return None
+                    record = record.get(key)
+                return record
+            return nested
+
+        def get(record):
+            return record.get(source)
+        return get
+
+
+def convert(values, kind):
+    """Convert one column list to its final dtype in a single call."""
+    if kind == "datetime":
+        return pd.to_datetime(values, utc=True, format="ISO8601")
+    if kind == "category":
+        return pd.Categorical(values)
+    if kind == "int":
+        return pd.array(values, dtype="Int64")
+    if kind == "float":
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy()
+    if kind == "bool":
+        return pd.array(values, dtype="boolean")
+    return values
+
+
+class FrameBuilder:
+    """
+    Accumulate records page by page and return one DataFrame. Only the
+    selected fields are kept, so raw pages can be dropped as they arrive.
+    """
+
+    def __init__(self, fields, **constants):
+        self.fields = fields
+        self.constants = constants
+        self.getters = [f.getter() for f in fields if f.source is not None]
+        self.columns = [[] for _ in self.getters]
+        self.rows = 0
+
+    def extend(self, records):
+        records = records if isinstance(records, list) else list(records)
+        for column, get in zip(self.columns, self.getters):
+            column.extend(map(get, records))
+        self.rows += len(records)
+
+    def frame(self):
+        data = {}
+        columns = iter(self.columns)
+        for field in self.fields:
+            if field.source is None:
+                value = self.constants.get(field.name)
+                if field.kind == "category" and value is not None:
+                    # One category, all codes 0: no per-row Python objects
+                    data[field.name] = pd.Categorical.from_codes(np.zeros(self.rows, dtype=np.int8), [value])
+                else:
+                    data[field.name] = [value] * self.rows
+            else:
+                data[field.name] = convert(next(columns), field.kind)
+        return pd.DataFrame(data)
+
+
+def to_frame(records, fields, **constants):
+    """Shortcut for a single batch of records."""
+    builder = FrameBuilder(fields, **constants)
+    builder.extend(records)
+    return builder.frame()
@@ -0,0 +1,198 @@
+# organization.py
+"""
+Sweep every account in an AWS Organization.
+
+The management (or delegated admin) account lists the member accounts and
+assumes a role in each. Accounts then run on a process pool, each worker
+with its own thread pool / event loop, rate limiters and clients, so the
+sweep takes roughly as long as the slowest account.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import metrics
+from utils import logger, get_client, api_call, iter_items
+
+DEFAULT_ROLE = "OrganizationAccountAccessRole"
+SESSION_NAME = "aws-inventory"
+ROLE_DURATION_SECONDS = 3600
+# Credentials closer than this to expiry are assumed again
+EXPIRY_MARGIN = timedelta(minutes=10)
+# STS calls made up front, before the accounts are handed to workers
+MAX_ASSUME_WORKERS = 8
+# Assumed-role credentials kept between runs, outside any working tree
+CREDENTIALS_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "aws-inventory", "sts_credentials.json")
+
+_credentials_lock = threading.Lock()
+_credentials_cache = {}
+# Account ID per access key ID (None for the default chain)
+_caller_accounts = {}
+
+
+def list_accounts(account_ids=None):
+    """Active accounts in the organization, optionally limited to account_ids."""
+    org = get_client("organizations")
+    accounts = [
+        {"Id": a["Id"], "Name": a.get("Name")}
+        for a in iter_items(org, "list_accounts", "Accounts")
+        if a.get("Status") == "ACTIVE"
+    ]
+    if account_ids:
+        wanted = set(account_ids)
+        accounts = [a for a in accounts if a["Id"] in wanted]
+    return sorted(accounts, key=lambda a: a["Id"])
+
+def caller_account(credentials=None):
+    """
+    Account ID the credentials (the default chain when None) belong to,
+    the stable key for per-account caches. Asked once per access key.
+    """
+    key = (credentials or {}).get("aws_access_key_id")
+    with _credentials_lock:
+        account = _caller_accounts.get(key)
+    if account is None:
+        account = api_call(get_client("sts", credentials=credentials), "get_caller_identity")["Account"]
+        with _credentials_lock:
+            _caller_accounts[key] = account
+    return account
+
+# -------------------------------
+# STS credentials, cached until shortly before they expire
+# -------------------------------
+def _is_fresh(credentials):
+    expiration = datetime.fromisoformat(credentials["expiration"])
+    return expiration - EXPIRY_MARGIN > datetime.now(timezone.utc)
+
+def load_credentials_cache(path):
+    """Read credentials saved by a previous run; expired entries are dropped."""
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring credentials cache {path}: {e}")
+        return
+    with _credentials_lock:
+        for key, credentials in saved.items():
+            if _is_fresh(credentials):
+                _credentials_cache[key] = credentials
+
+def save_credentials_cache(path):
+    if not path:
+        return
+    with _credentials_lock:
+        fresh = {k: v for k, v in _credentials_cache.items() if _is_fresh(v)}
+    # Same idea as the AWS CLI's ~/.aws/cli/cache: owner-readable only
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(fresh, f)
+
+def assume_role(account_id, role_name=DEFAULT_ROLE):
+    """
+    Credentials for role_name in account_id, in the form utils.get_client
+    takes. Reused until EXPIRY_MARGIN before they expire.
+    """
+    key = f"{account_id}/{role_name}"
+    with _credentials_lock:
+        cached = _credentials_cache.get(key)
+    if cached and _is_fresh(cached):
+        return client_credentials(cached)
+
+    response = api_call(
+        get_client("sts"), "assume_role",
+        RoleArn=f"arn:aws:iam::{account_id}:role/{role_name}",
+        RoleSessionName=SESSION_NAME,
+        DurationSeconds=ROLE_DURATION_SECONDS
+    )
+    sts_credentials = response["Credentials"]
+    cached = {
+        "aws_access_key_id": sts_credentials["AccessKeyId"],
+        "aws_secret_access_key": sts_credentials["SecretAccessKey"],
+        "aws_session_token": sts_credentials["SessionToken"],
+        "expiration": sts_credentials["Expiration"].isoformat(),
+    }
+    with _credentials_lock:
+        _credentials_cache[key] = cached
+    return client_credentials(cached)
+
+def client_credentials(cached):
+    return {k: v for k, v in cached.items() if k != "expiration"}
+
+def credentials_for(accounts, role_name=DEFAULT_ROLE):
+    """
+    {account_id: credentials or None}. The account we are running in uses
+    the default credentials; accounts whose role cannot be assumed are
+    logged and left out.
+    """
+    own_account = caller_account()
+
+    def resolve(account):
+        if account["Id"] == own_account:
+            return account["Id"], None
+        try:
+            return account["Id"], assume_role(account["Id"], role_name)
+        except Exception as e:
+            logger.error(f"Cannot assume {role_name} in {account['Id']}: {e}")
+            return account["Id"], False
+
+    with ThreadPoolExecutor(max_workers=MAX_ASSUME_WORKERS) as pool:
+        resolved = dict(pool.map(resolve, accounts))
+    return {account_id: creds for account_id, creds in resolved.items() if creds is not False}
+
+# -------------------------------
+# Process pool
+# -------------------------------
+def sweep(accounts, collect_account, role_name=DEFAULT_ROLE, processes=None,
+          credentials_cache=None, lambda_known=None, **options):
+    """
+    Run collect_account(account_id, credentials, known, **options) for
+    every account on a process pool, where known is that account's slice
+    of lambda_known, and merge the results into one {service: [DataFrame, ...]}
+    with an Account column on every frame. Also returns
+    {service: {(account, region), ...}} of the listings that succeeded;
+    an account that failed as a whole has none.
+
+    collect_account must be a module-level function (it is pickled) and
+    return (results, {service: {region, ...}}, exported metrics).
+    """
+    load_credentials_cache(credentials_cache)
+    credentials = credentials_for(accounts, role_name)
+    save_credentials_cache(credentials_cache)
+
+    account_ids = [a["Id"] for a in accounts if a["Id"] in credentials]
+    if not account_ids:
+        return {}, {}
+    processes = processes or min(len(account_ids), os.cpu_count() or 1)
+    logger.info(f"Sweeping {len(account_ids)} accounts on {processes} processes")
+
+    lambda_known = lambda_known or {}
+    merged, fetched = {}, {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {
+            account_id: pool.submit(
+                collect_account, account_id, credentials[account_id], lambda_known.get(account_id), **options
+            )
+            for account_id in account_ids
+        }
+        for account_id, future in futures.items():
+            try:
+                results, account_fetched, worker_metrics = future.result()
+            except Exception as e:
+                logger.error(f"Account {account_id} failed: {e}")
+                continue
+            metrics.merge(worker_metrics)
+            for service, frames in results.items():
+                for df in frames:
+                    if df is not None and not df.empty:
+                        df.insert(0, "Account", account_id)
+                    merged.setdefault(service, []).append(df)
+            for service, regions in account_fetched.items():
+                fetched.setdefault(service, set()).update((account_id, region) for region in regions)
+    return merged, fetched
@@ -0,0 +1,193 @@
+# parquet_writer.py
+import json
+from datetime import datetime, timezone
+
+import pandas as pd
+from utils import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pyarrow is only needed for columnar output
+    pa = None
+    ds = None
+
+# Partition column used for resources that are not tied to a region
+GLOBAL_REGION = "global"
+
+def _string():
+    # Region/State/InstanceType etc. repeat heavily; dictionary-encode them
+    return pa.dictionary(pa.int32(), pa.string())
+
+def _timestamp():
+    return pa.timestamp("us", tz="UTC")
+
+def get_schemas():
+    """Stable Arrow schema per report sheet. Region is the partition key."""
+    return {
+        "EC2_Instances": pa.schema([
+            ("Region", pa.string()),
+            ("InstanceId", pa.string()),
+            ("InstanceType", _string()),
+            ("State", _string()),
+            ("PrivateIP", pa.string()),
+            ("PublicIP", pa.string()),
+            ("LaunchTime", _timestamp()),
+            ("Tags", pa.string()),
+        ]),
+        "S3_Buckets": pa.schema([
+            ("Region", pa.string()),
+            ("BucketName", pa.string()),
+            ("CreationDate", _timestamp()),
+            ("SizeBytes", pa.int64()),
+            ("ObjectCount", pa.int64()),
+            ("Encryption", _string()),
+            ("Versioning", _string()),
+            ("PublicAccessBlocked", pa.bool_()),
+            ("Tags", pa.string()),
+        ]),
+        "Unused_EBS": pa.schema([
+            ("Region", pa.string()),
+            ("VolumeId", pa.string()),
+            ("Size(GB)", pa.int64()),
+            ("VolumeType", _string()),
+            ("State", _string()),
+            ("CreateTime", _timestamp()),
+            ("Encrypted", pa.bool_()),
+            ("Tags", pa.string()),
+        ]),
+        "AWS_Costs": pa.schema([
+            ("Region", pa.string()),
+            ("Service", _string()),
+            ("LinkedAccount", _string()),
+            ("UsageType", _string()),
+            ("InstanceType", _string()),
+            ("Cost", pa.float64()),
+            ("Unit", _string()),
+            ("Start", pa.date32()),
+            ("End", pa.date32()),
+        ]),
+        "Lambda": pa.schema([
+            ("Region", pa.string()),
+            ("FunctionName", pa.string()),
+            ("Runtime", _string()),
+            ("LastModified", _timestamp()),
+            ("Tags", pa.string()),
+        ]),
+        "RDS_Instances": pa.schema([
+            ("Region", pa.string()),
+            ("DBInstanceIdentifier", pa.string()),
+            ("Engine", _string()),
+            ("EngineVersion", _string()),
+            ("Status", _string()),
+            ("InstanceClass", _string()),
+            ("MultiAZ", pa.bool_()),
+            ("Storage(GB)", pa.int64()),
+            ("Endpoint", pa.string()),
+            ("CreateTime", _timestamp()),
+            ("Tags", pa.string()),
+        ]),
+    }
+
+def _column(series, field):
+    """Coerce one pandas column to the Arrow type declared in the schema."""
+    if pa.types.is_timestamp(field.type):
+        values = pd.to_datetime(series, utc=True, errors="coerce")
+        return pa.array(values, type=field.type, from_pandas=True)
+    if pa.types.is_date32(field.type):
+        values = pd.to_datetime(series, errors="coerce").dt.date
+        return pa.array(values, type=field.type, from_pandas=True)
+    if pa.types.is_floating(field.type) or pa.types.is_integer(field.type):
+        values = pd.to_numeric(series, errors="coerce")
+        return pa.array(values, type=field.type, from_pandas=True)
+    if pa.types.is_boolean(field.type):
+        return pa.array(series.astype("boolean"), type=field.type, from_pandas=True)
+
+    if isinstance(series.dtype, pd.CategoricalDtype) and pa.types.is_dictionary(field.type):
+        # Already dictionary-encoded by the normalizer
+        return pa.array(series, from_pandas=True).cast(field.type)
+
+    def to_text(value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, sort_keys=True, default=str)
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        return str(value)
+
+    values = pa.array([to_text(v) for v in series], type=pa.string())
+    if pa.types.is_dictionary(field.type):
+        values = values.dictionary_encode()
+    return values
+
+def to_arrow_table(df, schema, snapshot_date):
+    """Build an Arrow table with exactly the columns of schema, plus snapshot_date."""
+    df = df if "Region" in df.columns else df.assign(Region=GLOBAL_REGION)
+    arrays = []
+    for field in schema:
+        if field.name in df.columns:
+            arrays.append(_column(df[field.name], field))
+        else:
+            arrays.append(pa.nulls(len(df), type=field.type))
+    arrays.append(pa.array([snapshot_date] * len(df), type=pa.string()))
+    return pa.Table.from_arrays(arrays, schema=schema.append(pa.field("snapshot_date", pa.string())))
+
+def write_to_parquet(dataframes_dict, output_dir="aws_inventory_parquet", snapshot_date=None,
+                     file_format="parquet"):
+    """
+    Write every resource DataFrame as a hive-partitioned dataset:
+    <output_dir>/<sheet>/Region=<region>/snapshot_date=<YYYY-MM-DD>/part-0.<ext>
+    (prefixed with Account=<id>/ for organization sweeps).
+
+    file_format is "parquet" or "arrow" (Arrow IPC). Re-running on the same
+    day replaces that day's partitions.
+    """
+    if pa is None:
+        logger.error("pyarrow is not installed; skipping columnar output.")
+        return
+
+    snapshot_date = snapshot_date or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    schemas = get_schemas()
+    extension = "parquet" if file_format == "parquet" else "arrow"
+
+    try:
+        logger.info(f"Writing {file_format} inventory to {output_dir}")
+
+        for name, df in dataframes_dict.items():
+            if df is None or df.empty:
+                continue
+
+            schema = schemas.get(name)
+            partitioning = ["Region", "snapshot_date"]
+            if schema is not None and "ChangeType" in df.columns:
+                # Delta reports from an incremental run
+                schema = schema.append(pa.field("ChangeType", _string()))
+            if schema is not None:
+                # Cost lines grouped by tag carry one Tag:<key> column per tag
+                for column in df.columns:
+                    if column.startswith("Tag:") and column not in schema.names:
+                        schema = schema.append(pa.field(column, _string()))
+            if "Account" in df.columns:
+                # Organization sweeps add a leading Account partition
+                partitioning.insert(0, "Account")
+                if schema is not None:
+                    schema = schema.insert(0, pa.field("Account", pa.string()))
+            if schema is None:
+                df = df if "Region" in df.columns else df.assign(Region=GLOBAL_REGION)
+                table = pa.Table.from_pandas(df.assign(snapshot_date=snapshot_date), preserve_index=False)
+            else:
+                table = to_arrow_table(df, schema, snapshot_date)
+
+            ds.write_dataset(
+                table,
+                f"{output_dir}/{name}",
+                format="parquet" if file_format == "parquet" else "ipc",
+                partitioning=partitioning,
+                partitioning_flavor="hive",
+                basename_template="part-{i}." + extension,
+                existing_data_behavior="delete_matching",
+            )
+
+        logger.info("Columnar inventory written successfully.")
+
+    except Exception as e:
+        logger.error(f"{file_format} writing error: {e}")
@@ -0,0 +1,201 @@
+# ratelimit.py
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+
+import metrics
+
+# Shares the handlers set up by utils.setup_logger (utils imports this module)
+logger = logging.getLogger("aws-inventory")
+
+THROTTLE_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "SlowDown",
+}
+
+TRANSIENT_CODES = {"InternalError", "InternalFailure", "ServiceUnavailable", "RequestTimeout"}
+
+# Starting/limit rates (requests per second) for each (service, region) bucket
+INITIAL_RATE = 20.0
+MIN_RATE = 1.0
+MAX_RATE = 100.0
+# AIMD: add per successful call, multiply on each throttle
+RATE_INCREASE = 0.1
+RATE_DECREASE = 0.5
+
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = 0.2
+MAX_BACKOFF = 20.0
+# Retries allowed across the whole run before failures are surfaced
+RETRY_BUDGET = 1000
+
+
+class RetriesExhausted(Exception):
+    """Raised when a throttled call runs out of attempts or run budget."""
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to throttling (AIMD)."""
+
+    def __init__(self, rate=None, min_rate=None, max_rate=None):
+        # Read the module settings at creation so callers can retune them
+        self.rate = rate or INITIAL_RATE
+        self.min_rate = min_rate or MIN_RATE
+        self.max_rate = max_rate or MAX_RATE
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self):
+        """Take a token and return 0, or return how long until one is due."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * RATE_DECREASE)
+            self.tokens = min(self.tokens, 0)
+
+
+class RetryBudget:
+    """Counts retries across every worker so a bad run cannot retry forever."""
+
+    def __init__(self, total=None):
+        self.total = RETRY_BUDGET if total is None else total
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.used >= self.total:
+                return False
+            self.used += 1
+            return True
+
+
+_buckets_lock = threading.Lock()
+_buckets = {}
+budget = RetryBudget()
+
+def get_bucket(service, region):
+    key = (service, region)
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket()
+        return _buckets[key]
+
+def reset(retry_budget=None):
+    """Start a new run: fresh buckets and a full retry budget."""
+    global budget
+    with _buckets_lock:
+        _buckets.clear()
+    budget = RetryBudget(retry_budget)
+
+def error_code(error):
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code")
+    return None
+
+def is_throttle(error):
+    return error_code(error) in THROTTLE_CODES
+
+def is_retryable(error):
+    return (
+        is_throttle(error)
+        or error_code(error) in TRANSIENT_CODES
+        or isinstance(error, (BotoConnectionError, HTTPClientError))
+    )
+
+def backoff(attempt):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+
+def _retry_delay(error, bucket, service, region, attempt):
+    """
+    Account for a failed attempt and return how long to wait before the
+    next one. Re-raises when the error is not worth retrying.
+    """
+    if not is_retryable(error):
+        raise error
+    if is_throttle(error):
+        bucket.on_throttle()
+        metrics.add("throttles")
+    if attempt >= MAX_ATTEMPTS or not budget.take():
+        raise RetriesExhausted(f"{service} in {region}: gave up after {attempt} attempts: {error}") from error
+    metrics.add("retries")
+    delay = backoff(attempt)
+    logger.warning(f"{service} in {region}: {error_code(error) or type(error).__name__}, retrying in {delay:.1f}s")
+    return delay
+
+def call(func, service, region, *args, **kwargs):
+    """
+    Call func through the (service, region) token bucket, retrying
+    throttles and transient errors with jittered backoff while the run's
+    retry budget lasts. Anything else is raised straight away.
+    """
+    bucket = get_bucket(service, region)
+    attempt = 0
+    while True:
+        bucket.acquire()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            time.sleep(_retry_delay(e, bucket, service, region, attempt))
+            continue
+        bucket.on_success()
+        return result
+
+async def call_async(func, service, region, *args, **kwargs):
+    """call() for coroutine functions; waits without blocking the event loop."""
+    bucket = get_bucket(service, region)
+    attempt = 0
+    while True:
+        await bucket.acquire_async()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            await asyncio.sleep(_retry_delay(e, bucket, service, region, attempt))
+            continue
+        bucket.on_success()
+        return result
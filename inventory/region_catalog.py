@@ -0,0 +1,97 @@
+# region_catalog.py
+"""
+Cached catalog of the account's regions.
+
+describe_regions(AllRegions=True) is asked once per TTL and saved to disk
+with each region's opt-in status and which of the collected services
+have an endpoint there (from botocore's bundled endpoint data, no API
+calls). Regions that are not enabled, or that lack a service, are never
+scheduled, so nothing is sent that can only fail with AuthFailure.
+"""
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from organization import caller_account
+from utils import logger, get_client, get_session, api_call
+
+CACHE_DIR = ".region_cache"
+# Opt-in changes are rare; a day keeps the cache useful without going stale
+TTL_SECONDS = 24 * 3600
+# Regional services the collectors schedule per region
+TRACKED_SERVICES = ("ec2", "lambda", "rds", "s3")
+ENABLED_STATUSES = {"opt-in-not-required", "opted-in"}
+
+
+def _cache_path(account, cache_dir):
+    return os.path.join(cache_dir, f"{account}.json")
+
+def build(credentials=None):
+    """Ask EC2 for every region and record opt-in status and service coverage."""
+    ec2 = get_client("ec2", credentials=credentials)
+    response = api_call(ec2, "describe_regions", AllRegions=True)
+    session = get_session(credentials)
+
+    available = {}
+    for partition in session.get_available_partitions():
+        for service in TRACKED_SERVICES:
+            for region in session.get_available_regions(service, partition):
+                available.setdefault(region, []).append(service)
+
+    regions = {}
+    for r in response["Regions"]:
+        name = r["RegionName"]
+        # Older responses have no OptInStatus; those regions are always on
+        status = r.get("OptInStatus", "opt-in-not-required")
+        regions[name] = {
+            "opt_in_status": status,
+            "enabled": status in ENABLED_STATUSES,
+            "services": available.get(name, []),
+        }
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "created": time.time(),
+        "regions": regions,
+    }
+
+def load(credentials=None, account=None, cache_dir=CACHE_DIR, ttl=TTL_SECONDS):
+    """
+    Return the catalog for account, from disk when younger than ttl, else
+    rebuilt and saved. ttl=0 forces a refresh. Each account has its own
+    file, so parallel organization workers never write the same one;
+    without account the file is named after the credentials' account ID.
+    """
+    account = account or caller_account(credentials)
+    path = _cache_path(account, cache_dir)
+
+    if ttl and os.path.exists(path):
+        try:
+            with open(path) as f:
+                catalog = json.load(f)
+            if time.time() - catalog["created"] < ttl:
+                return catalog
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring region cache {path}: {e}")
+
+    catalog = build(credentials)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp, path)
+
+    skipped = sorted(name for name, r in catalog["regions"].items() if not r["enabled"])
+    logger.info(f"Region catalog refreshed for {account}; not enabled: {skipped}")
+    return catalog
+
+def enabled_regions(catalog, service=None):
+    """
+    Enabled regions, sorted. With service, only those where it has an
+    endpoint; services the catalog does not track are assumed everywhere.
+    """
+    return sorted(
+        name for name, region in catalog["regions"].items()
+        if region["enabled"]
+        and (service is None or service not in TRACKED_SERVICES or service in region["services"])
+    )
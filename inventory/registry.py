@@ -0,0 +1,164 @@
+# registry.py
+"""
+Registry of the resource types the collector fetches.
+
+Each services/ module declares a SERVICE spec: its scope (one task per
+account or one per region), the list operation and result key it pages
+through, its columns, the snapshot key and a cost weight. The collector
+builds its tasks, report sheets and snapshot keys from the registry, so
+a new resource type is a new module listed in SERVICE_MODULES; a plain
+paged list API needs no fetch function at all.
+"""
+import importlib
+import json
+import os
+
+import region_catalog
+from normalize import FrameBuilder
+from scheduler import Task
+from utils import logger, get_client, iter_pages
+
+GLOBAL = "global"
+REGIONAL = "regional"
+
+# services/ modules with a SERVICE spec, in report sheet order
+SERVICE_MODULES = ("ec2", "s3", "ebs", "costs", "lambda_service", "rds")
+
+_services = {}
+
+
+class RunOptions:
+    """Per-account settings handed to every fetcher."""
+
+    __slots__ = ("credentials", "account", "lambda_known", "cost_query", "s3_details_ttl", "weights", "regions")
+
+    def __init__(self, credentials=None, account=None, lambda_known=None, cost_query=None,
+                 s3_details_ttl=None, weights=None):
+        self.credentials = credentials
+        self.account = account
+        self.lambda_known = lambda_known or {}
+        self.cost_query = cost_query
+        self.s3_details_ttl = s3_details_ttl
+        self.weights = weights or {}
+        # Filled in once the region catalog is loaded
+        self.regions = []
+
+    def for_account(self, account, credentials, lambda_known=None):
+        """Copy for one account of an organization sweep."""
+        return RunOptions(
+            credentials, account, lambda_known, self.cost_query, self.s3_details_ttl, self.weights
+        )
+
+
+class ServiceSpec:
+    """
+    One resource type.
+
+    fetch(run, region) returns a DataFrame, or None when the listing
+    failed (never an empty frame); without it the registry pages
+    through client.operation (client defaults to name) and builds fields
+    from result_key.
+    key_columns is a list, or a callable taking the RunOptions.
+    weight is the rough cost of one task in seconds, used to start the
+    longest tasks first until a previous run has measured them.
+    catalog_service limits regional tasks to regions with that endpoint.
+    """
+
+    __slots__ = ("name", "sheet", "scope", "fields", "key_columns", "weight", "fetch",
+                 "client", "operation", "result_key", "request_kwargs", "catalog_service")
+
+    def __init__(self, name, sheet, scope, fields, key_columns, weight=1.0, fetch=None,
+                 client=None, operation=None, result_key=None, request_kwargs=None, catalog_service=None):
+        if scope not in (GLOBAL, REGIONAL):
+            raise ValueError(f"Unknown scope {scope!r} for {name}")
+        if fetch is None and not (operation and result_key):
+            raise ValueError(f"{name} needs a fetch function or an operation and result_key")
+        self.name = name
+        self.sheet = sheet
+        self.scope = scope
+        self.fields = fields
+        self.key_columns = key_columns
+        self.weight = weight
+        self.fetch = fetch
+        self.client = client or name
+        self.operation = operation
+        self.result_key = result_key
+        self.request_kwargs = request_kwargs or {}
+        self.catalog_service = catalog_service or self.client
+
+    def run(self, run, region=None):
+        if self.fetch is not None:
+            return self.fetch(run, region)
+        return fetch_pages(self, region, run.credentials)
+
+    def keys(self, run):
+        return self.key_columns(run) if callable(self.key_columns) else list(self.key_columns)
+
+    def __repr__(self):
+        return f"ServiceSpec({self.name}, {self.scope})"
+
+
+def fetch_pages(spec, region=None, credentials=None):
+    """Generic fetch: every item under result_key, with Region as a constant column."""
+    try:
+        logger.info(f"Fetching {spec.sheet} in {region or GLOBAL}")
+        client = get_client(spec.client, region, credentials)
+        builder = FrameBuilder(spec.fields, Region=region)
+        for page in iter_pages(client, spec.operation, **spec.request_kwargs):
+            builder.extend(page.get(spec.result_key, []))
+        df = builder.frame()
+        logger.info(f"Found {len(df)} {spec.sheet} in {region or GLOBAL}")
+        return df
+    except Exception as e:
+        logger.error(f"Error fetching {spec.sheet} in {region or GLOBAL}: {e}")
+        return None
+
+def register(spec):
+    _services[spec.name] = spec
+    return spec
+
+def load():
+    """Import every service module so its SERVICE is registered."""
+    for module in SERVICE_MODULES:
+        register(importlib.import_module(f"services.{module}").SERVICE)
+    return services()
+
+def services():
+    """Registered services, in sheet order."""
+    return list(_services.values())
+
+def get(name):
+    return _services[name]
+
+def task_regions(spec, catalog):
+    if spec.scope == GLOBAL:
+        return [None]
+    return region_catalog.enabled_regions(catalog, spec.catalog_service)
+
+def plan_tasks(run, catalog):
+    """One Task per service (and region, for regional ones), weighted for the scheduler."""
+    tasks = []
+    for spec in load():
+        for region in task_regions(spec, catalog):
+            weight = run.weights.get((spec.name, region), spec.weight)
+            tasks.append(Task(spec.name, region, spec.run, run, region, weight=weight))
+    return tasks
+
+def measured_weights(path):
+    """
+    {(service, region): seconds} from a previous run's metrics JSON, so
+    tasks that were slow last time are started first.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            stages = json.load(f)["stages"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring previous metrics {path}: {e}")
+        return {}
+    return {
+        (row["service"], row["region"] if row["region"] != GLOBAL else None): row["seconds"]
+        for row in stages
+        if row["stage"] == "fetch"
+    }
@@ -0,0 +1,138 @@
+# scheduler.py
+import threading
+from collections import Counter
+
+import pandas as pd
+import metrics
+from utils import logger
+
+# Global cap on AWS calls in flight at once
+MAX_IN_FLIGHT = 16
+
+# Per-service caps so one busy API cannot take every worker
+SERVICE_LIMITS = {
+    "ec2": 8,
+    "ebs": 8,
+    "lambda": 4,
+    "s3": 1,
+    "costs": 1,
+    "rds": 4,
+}
+
+
+class Task:
+    """
+    One (service, region) fetch to run on the pool. weight is its expected
+    cost (roughly seconds); heavier tasks are started first.
+    """
+
+    def __init__(self, service, region, func, *args, weight=1.0, **kwargs):
+        self.service = service
+        self.region = region
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.weight = weight
+
+    def __repr__(self):
+        return f"Task({self.service}, {self.region})"
+
+
+def run_tasks(tasks, max_workers=MAX_IN_FLIGHT, service_limits=None):
+    """
+    Run every task on a bounded set of worker threads and return
+    {service: [result, ...]} with each list sorted by region, so the
+    output does not depend on which call happened to finish first.
+
+    Longest processing time first: each free worker takes the heaviest
+    pending task whose service is under its cap, so a slow region starts
+    early instead of becoming the tail of the run, and a worker never
+    sits blocked on one service's cap while another service has work.
+    """
+    limits = dict(SERVICE_LIMITS)
+    if service_limits:
+        limits.update(service_limits)
+
+    pending = sorted(tasks, key=lambda t: -t.weight)
+    running = Counter()
+    results = {}
+    ready = threading.Condition()
+
+    def execute(task):
+        with metrics.stage("fetch", task.service, task.region):
+            try:
+                result = task.func(*task.args, **task.kwargs)
+            except Exception as e:
+                logger.error(f"{task.service} task failed in {task.region}: {e}")
+                metrics.add("errors")
+                return None
+            # Fetchers log their own errors and return None
+            if result is None:
+                metrics.add("errors")
+            elif hasattr(result, "__len__"):
+                metrics.add("rows", len(result))
+            return result
+
+    def next_task():
+        # Called with ready held; None once nothing is left to start
+        while pending:
+            for i, task in enumerate(pending):
+                if running[task.service] < limits.get(task.service, max_workers):
+                    running[task.service] += 1
+                    return pending.pop(i)
+            ready.wait()
+        return None
+
+    def worker():
+        while True:
+            with ready:
+                task = next_task()
+            if task is None:
+                return
+            result = execute(task)
+            with ready:
+                results[id(task)] = result
+                running[task.service] -= 1
+                ready.notify_all()
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(min(max_workers, len(tasks)))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    by_service = {}
+    for task in sorted(tasks, key=task_order):
+        by_service.setdefault(task.service, []).append(results.get(id(task)))
+    return by_service
+
+
+def task_order(task):
+    return task.service, task.region or ""
+
+
+def completed(tasks, by_service):
+    """
+    {service: {region, ...}} of the tasks run_tasks returned a result for.
+    A failed task (None) listed nothing, which is not the same as its
+    region having no resources.
+    """
+    done = {}
+    results = [result for service in sorted(by_service) for result in by_service[service]]
+    for task, result in zip(sorted(tasks, key=task_order), results):
+        if result is not None:
+            done.setdefault(task.service, set()).add(task.region)
+    return done
+
+
+def concat_frames(frames):
+    """Concatenate the DataFrames returned for one service, skipping failures."""
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    # Categoricals with different categories per region concat to plain strings
+    for column, dtype in frames[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    return df
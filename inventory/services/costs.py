@@ -1,37 +1,265 @@
 # services/costs.py
-import boto3
-import pandas as pd
-from datetime import datetime, timedelta
-from utils import logger
+"""
+Cost Explorer costs, DAILY or MONTHLY, grouped by up to two dimensions or
+tag keys, following NextPageToken until the result set is complete.
 
-def fetch_costs():
+Cost Explorer bills every request and a period's costs stop changing once
+it has settled, so settled periods are kept in a per-account JSON cache
+and each run only asks for the periods that are still open.
+"""
+import json
+import os
+from datetime import date, datetime, timedelta, timezone
+from operator import itemgetter
+
+import metrics
+from normalize import Field, to_frame
+from organization import caller_account
+from registry import GLOBAL, ServiceSpec
+from utils import logger, get_client, api_call
+
+GRANULARITIES = ("DAILY", "MONTHLY")
+# get_cost_and_usage accepts at most two GroupBy entries
+MAX_GROUP_BY = 2
+# Short names for the GroupBy dimensions, and the column each one fills
+DIMENSIONS = {
+    "service": ("SERVICE", "Service"),
+    "region": ("REGION", "Region"),
+    "account": ("LINKED_ACCOUNT", "LinkedAccount"),
+    "usage-type": ("USAGE_TYPE", "UsageType"),
+    "instance-type": ("INSTANCE_TYPE", "InstanceType"),
+}
+TAG_PREFIX = "tag:"
+DEFAULT_DAYS = 30
+
+CACHE_DIR = ".cost_cache"
+# Late charges keep landing on a day for a while after it ends
+SETTLE_DAYS = 2
+
+
+def _group(name):
+    """(GroupBy entry, column name) for a short name or tag:<key>."""
+    if name.lower().startswith(TAG_PREFIX):
+        key = name[len(TAG_PREFIX):]
+        return {"Type": "TAG", "Key": key}, f"Tag:{key}"
+    try:
+        dimension, column = DIMENSIONS[name.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown cost grouping {name!r}; use one of {sorted(DIMENSIONS)} or {TAG_PREFIX}<key>"
+        ) from None
+    return {"Type": "DIMENSION", "Key": dimension}, column
+
+
+class CostQuery:
+    """
+    What to ask Cost Explorer for: granularity, up to MAX_GROUP_BY
+    groupings, the metric and how many days back from today.
+    """
+
+    __slots__ = ("granularity", "group_by", "metric", "days")
+
+    def __init__(self, granularity="DAILY", group_by=("service",), metric="UnblendedCost", days=DEFAULT_DAYS):
+        granularity = granularity.upper()
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularity must be one of {GRANULARITIES}, not {granularity!r}")
+        if len(group_by) > MAX_GROUP_BY:
+            raise ValueError(f"Cost Explorer groups by at most {MAX_GROUP_BY} keys, got {list(group_by)}")
+        if days < 1:
+            raise ValueError("Cost window must be at least one day")
+        for name in group_by:
+            _group(name)
+        self.granularity = granularity
+        self.group_by = tuple(group_by)
+        self.metric = metric
+        self.days = days
+
+    def groups(self):
+        return [_group(name)[0] for name in self.group_by]
+
+    def columns(self):
+        return [_group(name)[1] for name in self.group_by]
+
+    def key(self):
+        """Cache entry name; a different query never reuses another's rows."""
+        return "|".join([self.granularity, self.metric] + [name.lower() for name in self.group_by])
+
+    def fields(self):
+        """Frame columns for rows shaped (start, end, *group values, cost, unit)."""
+        width = len(self.group_by)
+        fields = [Field(column, itemgetter(2 + i), "category") for i, column in enumerate(self.columns())]
+        return fields + [
+            Field("Cost", itemgetter(2 + width), "float"),
+            Field("Unit", itemgetter(3 + width), "category"),
+            Field("Start", itemgetter(0), "category"),
+            Field("End", itemgetter(1), "category"),
+        ]
+
+    def __repr__(self):
+        return f"CostQuery({self.granularity}, group_by={list(self.group_by)}, days={self.days})"
+
+
+def key_columns(query):
+    """Columns identifying one cost line, for the snapshot store."""
+    return query.columns() + ["Start"]
+
+def periods(query, today=None):
+    """[(start, end), ...] covering the window; end is exclusive, as in the API."""
+    today = today or datetime.now(timezone.utc).date()
+    start = today - timedelta(days=query.days)
+    if query.granularity == "MONTHLY":
+        # Whole calendar months, so period starts stay put from run to run
+        start = start.replace(day=1)
+    bounds = []
+    while start < today:
+        if query.granularity == "DAILY":
+            end = start + timedelta(days=1)
+        else:
+            end = min(date(start.year + start.month // 12, start.month % 12 + 1, 1), today)
+        bounds.append((start.isoformat(), end.isoformat()))
+        start = end
+    return bounds
+
+def request_kwargs(query, start, end):
+    kwargs = {
+        "TimePeriod": {"Start": start, "End": end},
+        "Granularity": query.granularity,
+        "Metrics": [query.metric],
+    }
+    if query.group_by:
+        kwargs["GroupBy"] = query.groups()
+    return kwargs
+
+def next_token(response, kwargs):
+    """NextPageToken for the following request, or None when done."""
+    token = response.get("NextPageToken")
+    if not token or token == kwargs.get("NextPageToken"):
+        return None
+    return token
+
+def _group_value(key):
+    # Tag groups come back as "<tag key>$<value>"; "$" alone means untagged
+    if "$" in key:
+        key = key.split("$", 1)[1]
+    return key or None
+
+def cost_rows(response, query):
+    """(start, end, *group values, cost, unit) for one response page."""
+    rows = []
+    for result in response["ResultsByTime"]:
+        start, end = result["TimePeriod"]["Start"], result["TimePeriod"]["End"]
+        if not query.group_by:
+            amount = result["Total"][query.metric]
+            rows.append((start, end, float(amount["Amount"]), amount.get("Unit")))
+            continue
+        for group in result["Groups"]:
+            amount = group["Metrics"][query.metric]
+            values = [_group_value(k) for k in group["Keys"]]
+            rows.append((start, end, *values, float(amount["Amount"]), amount.get("Unit")))
+    return rows
+
+
+class CostCache:
+    """
+    Settled periods per query, in <cache_dir>/<account ID>.json:
+    {query key: {period start: [row, ...]}}. A settled period with no
+    costs is stored as [] so it is not asked for again. Without account
+    the ID is asked of STS for credentials.
+    """
+
+    def __init__(self, account=None, cache_dir=CACHE_DIR, credentials=None):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, f"{account or caller_account(credentials)}.json")
+        self.entries = self._read()
+
+    def _read(self):
+        if not self.cache_dir or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring cost cache {self.path}: {e}")
+            return {}
+
+    def plan(self, query, today=None):
+        """
+        (bounds, cached rows per period start, first start to fetch or None).
+        Everything from the first uncached period to today is fetched in
+        one range, so a normal run asks only for the last few open days.
+        """
+        bounds = periods(query, today)
+        cached = self.entries.get(query.key(), {})
+        missing = [start for start, _ in bounds if start not in cached]
+        return bounds, cached, (missing[0] if missing else None)
+
+    def save(self, query, bounds, fetched, today=None):
+        """Keep the settled periods of fetched and drop those outside the window."""
+        if not self.cache_dir:
+            return
+        today = today or datetime.now(timezone.utc).date()
+        settled = (today - timedelta(days=SETTLE_DAYS)).isoformat()
+        window = {start for start, _ in bounds}
+        entry = {k: v for k, v in self.entries.get(query.key(), {}).items() if k in window}
+        for start, end in bounds:
+            if start in fetched and end <= settled:
+                entry[start] = [list(row) for row in fetched[start]]
+        self.entries[query.key()] = entry
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+
+def split_periods(rows, bounds, fetch_start):
+    """{period start: rows} for every fetched period, empty ones included."""
+    fetched = {start: [] for start, _ in bounds if start >= fetch_start}
+    for row in rows:
+        fetched.setdefault(row[0], []).append(row)
+    return fetched
+
+def build_frame(query, bounds, cached, fetched):
+    rows = []
+    for start, _ in bounds:
+        rows.extend(fetched[start] if start in fetched else cached.get(start, []))
+    return to_frame(rows, query.fields())
+
+def fetch_costs(credentials=None, query=None, account=None, cache_dir=CACHE_DIR):
     try:
-        logger.info("Fetching AWS costs...")
-        ce = boto3.client("ce")
-        end = datetime.utcnow().date()
-        start = end - timedelta(days=30)
-
-        response = ce.get_cost_and_usage(
-            TimePeriod={"Start": str(start), "End": str(end)},
-            Granularity="MONTHLY",
-            Metrics=["UnblendedCost"],
-            GroupBy=[{"Type": "DIMENSION", "Key": "SERVICE"}]
-        )
-
-        costs = []
-        for result in response["ResultsByTime"]:
-            for group in result["Groups"]:
-                costs.append({
-                    "Service": group["Keys"][0],
-                    "Cost": group["Metrics"]["UnblendedCost"]["Amount"],
-                    "Start": result["TimePeriod"]["Start"],
-                    "End": result["TimePeriod"]["End"]
-                })
-
-        df = pd.DataFrame(costs)
-        logger.info("AWS costs fetched successfully.")
-        return df
+        query = query or CostQuery()
+        logger.info(f"Fetching AWS costs: {query}")
+        cache = CostCache(account, cache_dir, credentials)
+        bounds, cached, fetch_start = cache.plan(query)
+
+        fetched = {}
+        if fetch_start is not None:
+            ce = get_client("ce", credentials=credentials)
+            kwargs = request_kwargs(query, fetch_start, bounds[-1][1])
+            rows = []
+            while True:
+                response = api_call(ce, "get_cost_and_usage", **kwargs)
+                metrics.add("pages")
+                rows.extend(cost_rows(response, query))
+                token = next_token(response, kwargs)
+                if token is None:
+                    break
+                kwargs["NextPageToken"] = token
+            fetched = split_periods(rows, bounds, fetch_start)
+            cache.save(query, bounds, fetched)
+
+        logger.info(f"AWS costs fetched successfully ({len(bounds) - len(fetched)} periods from cache).")
+        return build_frame(query, bounds, cached, fetched)
 
     except Exception as e:
         logger.error(f"Error fetching costs: {e}")
-        return pd.DataFrame()
+        return None
+
+# Cost lines are identified by whatever they are grouped by
+SERVICE = ServiceSpec(
+    "costs", "AWS_Costs", GLOBAL, CostQuery().fields(),
+    lambda run: key_columns(run.cost_query or CostQuery()),
+    fetch=lambda run, region: fetch_costs(run.credentials, run.cost_query, run.account),
+    client="ce",
+)
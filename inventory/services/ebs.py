@@ -1,35 +1,48 @@
 # services/ebs.py
-import boto3
-import pandas as pd
-from utils import logger
+from utils import logger, get_client, iter_pages
+from normalize import Field, FrameBuilder
+from services.tags import tag_dict
+from registry import REGIONAL, ServiceSpec
 
-def fetch_unused_volumes(region):
+# describe_volumes accepts at most 500 results per page
+PAGE_SIZE = 500
+
+REQUEST_KWARGS = {
+    "Filters": [{"Name": "status", "Values": ["available"]}],
+    "PaginationConfig": {"PageSize": PAGE_SIZE},
+}
+
+FIELDS = [
+    Field("VolumeId", "VolumeId", "str"),
+    Field("Size(GB)", "Size", "int"),
+    Field("VolumeType", "VolumeType", "category"),
+    Field("Region", kind="category"),
+    Field("State", "State", "category"),
+    Field("CreateTime", "CreateTime", "datetime"),
+    Field("Encrypted", lambda vol: vol.get("Encrypted", False), "bool"),
+    # describe_* returns tags inline; no extra calls
+    Field("Tags", lambda r: tag_dict(r.get("Tags"))),
+]
+
+def fetch_unused_volumes(region, credentials=None):
     try:
         logger.info(f"Fetching unused EBS volumes in {region}")
-        ec2 = boto3.client("ec2", region_name=region)
-
-        paginator = ec2.get_paginator("describe_volumes")
-        page_iterator = paginator.paginate(
-            Filters=[{"Name": "status", "Values": ["available"]}]
-        )
-
-        volumes = []
-
-        for page in page_iterator:
-            for vol in page["Volumes"]:
-                volumes.append({
-                    "VolumeId": vol["VolumeId"],
-                    "Size(GB)": vol["Size"],
-                    "VolumeType": vol["VolumeType"],
-                    "Region": region,
-                    "State": vol["State"],
-                    "CreateTime": vol["CreateTime"].strftime("%Y-%m-%d"),
-                    "Encrypted": vol.get("Encrypted", False)
-                })
-
-        logger.info(f"Found {len(volumes)} unused volumes in {region}")
-        return pd.DataFrame(volumes)
+        ec2 = get_client("ec2", region, credentials)
+
+        builder = FrameBuilder(FIELDS, Region=region)
+        for page in iter_pages(ec2, "describe_volumes", **REQUEST_KWARGS):
+            builder.extend(page.get("Volumes", []))
+        df = builder.frame()
+
+        logger.info(f"Found {len(df)} unused volumes in {region}")
+        return df
 
     except Exception as e:
         logger.error(f"Error fetching EBS volumes in {region}: {e}")
-        return pd.DataFrame()
+        return None
+
+SERVICE = ServiceSpec(
+    "ebs", "Unused_EBS", REGIONAL, FIELDS, ["VolumeId"],
+    fetch=lambda run, region: fetch_unused_volumes(region, credentials=run.credentials),
+    client="ec2",
+)
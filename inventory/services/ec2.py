@@ -1,39 +1,59 @@
 # services/ec2.py
-import pandas as pd
-from utils import logger, get_session #remove_tz
+from utils import logger, get_client, iter_pages
+from normalize import Field, FrameBuilder
+from services.tags import tag_dict
+from registry import REGIONAL, ServiceSpec
 from botocore.exceptions import ClientError
 
-def fetch_ec2_instances(region):
+# describe_instances accepts at most 1000 results per page
+PAGE_SIZE = 1000
+
+FIELDS = [
+    Field("Region", kind="category"),
+    Field("InstanceId", "InstanceId", "str"),
+    Field("InstanceType", "InstanceType", "category"),
+    Field("State", ("State", "Name"), "category"),
+    Field("PrivateIP", "PrivateIpAddress", "str"),
+    Field("PublicIP", "PublicIpAddress", "str"),
+    Field("LaunchTime", "LaunchTime", "datetime"),
+    # describe_* returns tags inline; no extra calls
+    Field("Tags", lambda r: tag_dict(r.get("Tags"))),
+]
+
+def request_kwargs(filters=None):
+    kwargs = {"PaginationConfig": {"PageSize": PAGE_SIZE}}
+    if filters:
+        kwargs["Filters"] = filters
+    return kwargs
+
+def page_instances(page):
+    return [
+        instance
+        for reservation in page.get("Reservations", [])
+        for instance in reservation.get("Instances", [])
+    ]
+
+def fetch_ec2_instances(region, filters=None, credentials=None):
     try:
-        session = get_session()
-        ec2 = session.client("ec2", region_name=region)
+        ec2 = get_client("ec2", region, credentials)
 
         logger.info(f"Collecting EC2 instances from region: {region}")
 
-        response = ec2.describe_instances()
-        data = []
-
-        for reservation in response.get("Reservations", []):
-            for instance in reservation.get("Instances", []):
-                launch_time = instance.get("LaunchTime")
-                if launch_time:
-                    launch_time = launch_time.strftime("%Y-%m-%d %H:%M:%S")
-                data.append({
-                    "Region": region,
-                    "InstanceId": instance.get("InstanceId"),
-                    "InstanceType": instance.get("InstanceType"),
-                    "State": instance.get("State", {}).get("Name"),
-                    "PrivateIP": instance.get("PrivateIpAddress"),
-                    "PublicIP": instance.get("PublicIpAddress"),
-                    #"LaunchTime": remove_tz(instance.get("LaunchTime"))
-                    "LaunchTime": launch_time
-                })
-
-        return pd.DataFrame(data)
+        # One page of raw instances in memory at a time
+        builder = FrameBuilder(FIELDS, Region=region)
+        for page in iter_pages(ec2, "describe_instances", **request_kwargs(filters)):
+            builder.extend(page_instances(page))
+        return builder.frame()
 
     except ClientError as e:
         logger.error(f"EC2 ClientError in {region}: {e}")
-        return pd.DataFrame()
+        return None
     except Exception as e:
         logger.error(f"EC2 Error in {region}: {e}")
-        return pd.DataFrame()
+        return None
+
+SERVICE = ServiceSpec(
+    "ec2", "EC2_Instances", REGIONAL, FIELDS, ["InstanceId"], weight=2.0,
+    # Instances are nested in Reservations, so the fetch flattens them itself
+    fetch=lambda run, region: fetch_ec2_instances(region, credentials=run.credentials),
+)
@@ -1,27 +1,71 @@
 import pandas as pd
-from utils import logger, remove_tz
+from utils import logger, get_client, iter_pages, api_call
+from normalize import Field, FrameBuilder
+from services.tags import LAMBDA_FUNCTION, tags_by_arn, per_resource
+from registry import REGIONAL, ServiceSpec
 
-def fetch_lambdas(session, region):
+# list_functions returns at most 50 functions per page
+PAGE_SIZE = 50
+
+FIELDS = [
+    Field('Region', kind='category'),
+    Field('FunctionName', 'FunctionName', 'str'),
+    Field('Runtime', 'Runtime', 'category'),
+    # LastModified comes back as an ISO-8601 string
+    Field('LastModified', 'LastModified', 'datetime'),
+    Field('Tags', 'Tags'),
+]
+
+def known_tags(fn, known):
+    """
+    Tags from the previous snapshot when the function has not changed
+    since, else None. Snapshots store LastModified as a UTC timestamp.
+    """
+    previous = known.get(fn.get('FunctionName'))
+    if previous and previous[0] == str(pd.to_datetime(fn.get('LastModified'), utc=True)):
+        return previous[1]
+    return None
+
+def fetch_lambdas(region, known=None, credentials=None):
+    """
+    Tags come from one bulk Tagging API listing for the region. If that
+    fails, each function falls back to list_tags on a thread pool, except
+    those whose LastModified has not moved since the previous snapshot
+    (known maps FunctionName -> (LastModified, Tags)), which reuse the
+    stored tags.
+    """
     logger.info(f"Fetching Lambda functions in {region}")
-    lambda_client = session.client('lambda', region_name=region)
-    data = []
+    lambda_client = get_client('lambda', region, credentials)
+    known = known or {}
+
+    def list_tags(fn):
+        return api_call(lambda_client, 'list_tags', Resource=fn['FunctionArn']).get('Tags', {})
+
     try:
-        response = lambda_client.list_functions()
-        for fn in response['Functions']:
-            tags = {}
-            try:
-                tags = lambda_client.list_tags(Resource=fn['FunctionArn']).get('Tags', {})
-            except:
-                pass
-            data.append({
-                'FunctionName': fn.get('FunctionName'),
-                'Runtime': fn.get('Runtime'),
-                'LastModified': remove_tz(fn.get('LastModified')),
-                'Tags': tags
-            })
-        df = pd.DataFrame(data)
+        bulk = tags_by_arn(region, LAMBDA_FUNCTION, credentials)
+        builder = FrameBuilder(FIELDS, Region=region)
+        pages = iter_pages(lambda_client, 'list_functions', PaginationConfig={'PageSize': PAGE_SIZE})
+        for page in pages:
+            functions = page.get('Functions', [])
+            if bulk is not None:
+                for fn in functions:
+                    fn['Tags'] = bulk.get(fn['FunctionArn'], {})
+            else:
+                for fn in functions:
+                    fn['Tags'] = known_tags(fn, known)
+                missing = [fn for fn in functions if fn['Tags'] is None]
+                fetched = per_resource(missing, list_tags, describe=lambda fn: fn['FunctionName'])
+                for fn, tags in zip(missing, fetched):
+                    fn['Tags'] = tags
+            builder.extend(functions)
+        df = builder.frame()
         logger.info(f"Found {len(df)} Lambda functions in {region}")
         return df
     except Exception as e:
         logger.error(f"Error fetching Lambda functions: {e}")
-        return pd.DataFrame()
+        return None
+
+SERVICE = ServiceSpec(
+    'lambda', 'Lambda', REGIONAL, FIELDS, ['Region', 'FunctionName'], weight=1.5,
+    fetch=lambda run, region: fetch_lambdas(region, run.lambda_known.get(region), run.credentials),
+)
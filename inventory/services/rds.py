@@ -0,0 +1,33 @@
+# services/rds.py
+"""
+RDS DB instances. Nothing but a declaration: the registry pages through
+describe_db_instances in every region with an RDS endpoint and builds
+the frame from FIELDS.
+"""
+from normalize import Field
+from registry import REGIONAL, ServiceSpec
+from services.tags import tag_dict
+
+# describe_db_instances accepts at most 100 results per page
+PAGE_SIZE = 100
+
+FIELDS = [
+    Field("Region", kind="category"),
+    Field("DBInstanceIdentifier", "DBInstanceIdentifier", "str"),
+    Field("Engine", "Engine", "category"),
+    Field("EngineVersion", "EngineVersion", "category"),
+    Field("Status", "DBInstanceStatus", "category"),
+    Field("InstanceClass", "DBInstanceClass", "category"),
+    Field("MultiAZ", lambda db: db.get("MultiAZ", False), "bool"),
+    Field("Storage(GB)", "AllocatedStorage", "int"),
+    Field("Endpoint", ("Endpoint", "Address"), "str"),
+    Field("CreateTime", "InstanceCreateTime", "datetime"),
+    # describe_db_instances returns tags inline as TagList
+    Field("Tags", lambda db: tag_dict(db.get("TagList"))),
+]
+
+SERVICE = ServiceSpec(
+    "rds", "RDS_Instances", REGIONAL, FIELDS, ["Region", "DBInstanceIdentifier"],
+    operation="describe_db_instances", result_key="DBInstances",
+    request_kwargs={"PaginationConfig": {"PageSize": PAGE_SIZE}},
+)
@@ -1,32 +1,362 @@
 # services/s3.py
-import pandas as pd
-from utils import logger, get_session, remove_tz
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import metrics
+from utils import logger, get_client, iter_pages, api_call
+from normalize import Field, to_frame
+from services.tags import S3_BUCKET, bucket_name, per_resource, tag_dict, tags_by_arn
+from organization import caller_account
+from registry import GLOBAL, ServiceSpec
 from botocore.exceptions import ClientError
 
-def fetch_s3_buckets():
+FIELDS = [
+    Field("BucketName", "Name", "str"),
+    Field("CreationDate", "CreationDate", "datetime"),
+]
+
+# Columns added by the enrichment stage
+DETAIL_FIELDS = [
+    Field("Region", "Region", "category"),
+    Field("SizeBytes", "SizeBytes", "int"),
+    Field("ObjectCount", "ObjectCount", "int"),
+    Field("Encryption", "Encryption", "category"),
+    Field("Versioning", "Versioning", "category"),
+    Field("PublicAccessBlocked", "PublicAccessBlocked", "bool"),
+]
+TAGS_FIELD = Field("Tags", "Tags")
+
+# Per-bucket configuration calls run on this many threads
+DETAIL_WORKERS = 16
+# Bucket details are reused for this long (seconds) before being fetched again
+DETAILS_TTL = 24 * 3600
+DETAILS_CACHE_DIR = ".s3_cache"
+
+# S3 storage metrics are published once a day; look back far enough to find one
+METRIC_LOOKBACK = timedelta(days=3)
+# GetMetricData accepts at most 500 queries per request
+MAX_METRIC_QUERIES = 500
+# BucketSizeBytes is reported per storage type (class, plus the per-object
+# overhead some classes bill); each type costs one query per bucket and
+# the sizes are summed into SizeBytes
+SIZE_STORAGE_TYPES = (
+    "StandardStorage",
+    "ReducedRedundancyStorage",
+    "StandardIAStorage", "StandardIASizeOverhead", "StandardIAObjectOverhead",
+    "OneZoneIAStorage", "OneZoneIASizeOverhead",
+    "IntelligentTieringFAStorage", "IntelligentTieringIAStorage", "IntelligentTieringAIAStorage",
+    "IntelligentTieringAAStorage", "IntelligentTieringDAAStorage",
+    "GlacierInstantRetrievalStorage", "GlacierInstantRetrievalSizeOverhead",
+    "GlacierStorage", "GlacierStagingStorage", "GlacierObjectOverhead", "GlacierS3ObjectOverhead",
+    "DeepArchiveStorage", "DeepArchiveStagingStorage", "DeepArchiveObjectOverhead",
+    "DeepArchiveS3ObjectOverhead",
+    "ExpressOneZone",
+)
+# Detail columns that are None when their configuration could not be read
+CONFIG_COLUMNS = ("Encryption", "Versioning", "PublicAccessBlocked")
+
+# The bucket simply has no such configuration
+MISSING_CONFIG_CODES = {
+    "ServerSideEncryptionConfigurationNotFoundError",
+    "NoSuchPublicAccessBlockConfiguration",
+}
+
+def list_buckets(s3):
+    """Every bucket, paging through list_buckets when supported."""
+    if not s3.can_paginate("list_buckets"):
+        return api_call(s3, "list_buckets").get("Buckets", [])
+    buckets = []
+    for page in iter_pages(s3, "list_buckets"):
+        buckets.extend(page.get("Buckets", []))
+    return buckets
+
+# -------------------------------
+# Bucket details: region, configuration and storage metrics
+# -------------------------------
+def location_region(response):
+    # us-east-1 has no location constraint; "EU" is the legacy name of eu-west-1
+    constraint = response.get("LocationConstraint")
+    if not constraint:
+        return "us-east-1"
+    return "eu-west-1" if constraint == "EU" else constraint
+
+def config_details(encryption, versioning, public_access):
+    """
+    Detail columns from the three configuration responses. {} means the
+    bucket has no such configuration, None that it could not be read.
+    """
+    details = {"Encryption": None, "Versioning": None, "PublicAccessBlocked": None}
+    if encryption is not None:
+        rules = encryption.get("ServerSideEncryptionConfiguration", {}).get("Rules", [])
+        default = rules[0].get("ApplyServerSideEncryptionByDefault", {}) if rules else {}
+        details["Encryption"] = default.get("SSEAlgorithm", "Disabled")
+    if versioning is not None:
+        details["Versioning"] = versioning.get("Status", "Disabled")
+    if public_access is not None:
+        block = public_access.get("PublicAccessBlockConfiguration", {})
+        details["PublicAccessBlocked"] = bool(block) and all(block.values())
+    return details
+
+def config_error(error, operation, bucket):
+    """{} when the bucket has no such configuration, None when it is unknown."""
+    if isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in MISSING_CONFIG_CODES:
+        return {}
+    logger.warning(f"S3 {operation} failed for {bucket}: {error}")
+    return None
+
+def _config(s3, operation, bucket):
     try:
-        session = get_session()
-        s3 = session.client("s3")
+        return api_call(s3, operation, Bucket=bucket)
+    except Exception as e:
+        return config_error(e, operation, bucket)
+
+def bucket_config(bucket, credentials=None):
+    """Region and configuration of one bucket: up to four small calls."""
+    name = bucket["Name"]
+    region = bucket.get("BucketRegion")
+    if not region:
+        s3 = get_client("s3", credentials=credentials)
+        region = location_region(api_call(s3, "get_bucket_location", Bucket=name))
+    # Ask the bucket's own region so S3 does not answer with a redirect
+    s3 = get_client("s3", region, credentials)
+    details = config_details(
+        _config(s3, "get_bucket_encryption", name),
+        _config(s3, "get_bucket_versioning", name),
+        _config(s3, "get_public_access_block", name),
+    )
+    details["Region"] = region
+    return details
+
+def metric_queries(details):
+    """
+    {region: ([query, ...], {query id: (bucket, column)})} asking for the
+    latest BucketSizeBytes and NumberOfObjects of every bucket in details.
+    """
+    by_region = {}
+    for name, bucket in details.items():
+        if not bucket.get("Region"):
+            continue
+        queries, targets = by_region.setdefault(bucket["Region"], ([], {}))
+        wanted = [("BucketSizeBytes", storage, "SizeBytes") for storage in SIZE_STORAGE_TYPES]
+        wanted.append(("NumberOfObjects", "AllStorageTypes", "ObjectCount"))
+        for metric, storage, column in wanted:
+            query_id = f"q{len(queries)}"
+            queries.append({
+                "Id": query_id,
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": "AWS/S3",
+                        "MetricName": metric,
+                        "Dimensions": [
+                            {"Name": "BucketName", "Value": name},
+                            {"Name": "StorageType", "Value": storage},
+                        ],
+                    },
+                    "Period": 86400,
+                    "Stat": "Average",
+                },
+            })
+            targets[query_id] = (name, column)
+    return by_region
+
+def metric_request(queries):
+    end = datetime.now(timezone.utc)
+    return {"MetricDataQueries": queries, "StartTime": end - METRIC_LOOKBACK, "EndTime": end}
+
+def apply_metric_results(details, targets, results):
+    """
+    Add the newest datapoint of each query to its bucket's column. A query
+    whose values run over several pages is counted once: its target is
+    taken out of targets with the first datapoint.
+    """
+    for result in results:
+        if not result.get("Values") or result["Id"] not in targets:
+            continue
+        # Results come newest first; buckets without a datapoint yet stay empty
+        name, column = targets.pop(result["Id"])
+        bucket = details[name]
+        bucket[column] = (bucket.get(column) or 0) + int(result["Values"][0])
+
+def metrics_failed(details, targets):
+    """Mark the buckets of a region whose metrics could not be read, so they are not cached."""
+    for name, _ in targets.values():
+        details[name]["metrics_failed"] = True
+
+def cacheable(details):
+    """Whether every configuration call and the storage metrics answered."""
+    return not details.get("metrics_failed") and all(details.get(c) is not None for c in CONFIG_COLUMNS)
+
+def storage_metrics(details, credentials=None):
+    """Fill SizeBytes/ObjectCount in details with batched GetMetricData calls."""
+    for region, (queries, targets) in metric_queries(details).items():
+        try:
+            cloudwatch = get_client("cloudwatch", region, credentials)
+            for i in range(0, len(queries), MAX_METRIC_QUERIES):
+                request = metric_request(queries[i:i + MAX_METRIC_QUERIES])
+                for page in iter_pages(cloudwatch, "get_metric_data", **request):
+                    apply_metric_results(details, targets, page.get("MetricDataResults", []))
+        except Exception as e:
+            logger.error(f"S3 storage metrics failed in {region}: {e}")
+            metrics_failed(details, targets)
 
-        logger.info("Collecting S3 buckets...")
 
-        response = s3.list_buckets()
-        data = []
-        for bucket in response.get("Buckets", []):
-            created = bucket["CreationDate"]
+class DetailsCache:
+    """
+    Bucket details per account in <cache_dir>/<account ID>.json, each
+    entry stamped with when it was fetched and reused until ttl has
+    passed. Without account the ID is asked of STS for credentials.
+    """
 
-            # Fix: convert datetime to string
-            created_str = created.strftime("%Y-%m-%d %H:%M:%S")
+    def __init__(self, account=None, ttl=DETAILS_TTL, cache_dir=DETAILS_CACHE_DIR, credentials=None):
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, f"{account or caller_account(credentials)}.json")
+        self.entries = self._read()
 
-            data.append({
-                "BucketName": bucket["Name"],
-                "CreationDate": created_str
-        })
-        return pd.DataFrame(data)
+    def _read(self):
+        if not self.cache_dir or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring S3 details cache {self.path}: {e}")
+            return {}
+
+    def stale(self, buckets):
+        now = time.time()
+        return [b for b in buckets if now - self.entries.get(b["Name"], {}).get("fetched", 0) >= self.ttl]
+
+    def update(self, fresh, buckets):
+        """
+        Store fresh details and forget buckets that no longer exist.
+        Details with a lookup that failed serve this run only, so the
+        next run asks again instead of reusing the gap for ttl.
+        """
+        now = time.time()
+        for details in fresh.values():
+            details["fetched"] = now
+        self.entries.update(fresh)
+        names = {b["Name"] for b in buckets}
+        self.entries = {name: d for name, d in self.entries.items() if name in names}
+        if not self.cache_dir:
+            return
+        saved = {name: d for name, d in self.entries.items() if cacheable(d)}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp, self.path)
+
+    def apply(self, buckets):
+        """Copy the cached details onto the bucket records."""
+        for bucket in buckets:
+            bucket.update(self.entries.get(bucket["Name"], {}))
+
+
+def bucket_details(buckets, credentials=None, account=None, ttl=DETAILS_TTL):
+    """
+    Enrich buckets with region, size, object count, encryption, versioning
+    and public access block. Only buckets missing from the cache (or older
+    than ttl) are fetched; configuration calls run on a thread pool and
+    storage metrics are read in bulk from CloudWatch, never by listing.
+    """
+    cache = DetailsCache(account, ttl, credentials=credentials)
+    stale = cache.stale(buckets)
+    logger.info(f"S3 details: {len(buckets) - len(stale)} buckets cached, {len(stale)} to fetch")
+    if stale:
+        def fetch(bucket):
+            try:
+                return bucket_config(bucket, credentials)
+            except Exception as e:
+                logger.warning(f"S3 details failed for {bucket['Name']}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=DETAIL_WORKERS) as pool:
+            configs = pool.map(metrics.in_stage(fetch), stale)
+            fresh = {b["Name"]: d for b, d in zip(stale, configs) if d is not None}
+        storage_metrics(fresh, credentials)
+        cache.update(fresh, buckets)
+    cache.apply(buckets)
+
+# -------------------------------
+# Tags: one Tagging API listing per region
+# -------------------------------
+def bulk_tags(buckets, listings):
+    """
+    Set Tags from per-region {ARN: tags} listings. False (fall back to
+    per-bucket calls) when there are none, e.g. no regions were known,
+    or when any of them failed.
+    """
+    if not listings or any(listing is None for listing in listings):
+        return False
+    found = {bucket_name(arn): tags for listing in listings for arn, tags in listing.items()}
+    for bucket in buckets:
+        bucket["Tags"] = found.get(bucket["Name"], {})
+    return True
+
+def bucket_tagging(response):
+    return tag_dict(response.get("TagSet"))
+
+def no_tags(error):
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") == "NoSuchTagSet"
+
+def bucket_tags(buckets, regions, credentials=None):
+    """
+    Tags for every bucket from the Tagging API in each region, or from
+    get_bucket_tagging per bucket (on a thread pool) when that fails.
+    """
+    listing = metrics.in_stage(lambda region: tags_by_arn(region, S3_BUCKET, credentials))
+    with ThreadPoolExecutor(max_workers=DETAIL_WORKERS) as pool:
+        listings = list(pool.map(listing, regions))
+    if bulk_tags(buckets, listings):
+        return
+
+    s3 = get_client("s3", credentials=credentials)
+
+    def get_tags(bucket):
+        try:
+            return bucket_tagging(api_call(s3, "get_bucket_tagging", Bucket=bucket["Name"]))
+        except ClientError as e:
+            if no_tags(e):
+                return {}
+            raise
+
+    for bucket, tags in zip(buckets, per_resource(buckets, get_tags, describe=lambda b: b["Name"])):
+        bucket["Tags"] = tags
+
+def bucket_fields(details, tags):
+    return FIELDS + (DETAIL_FIELDS if details else []) + ([TAGS_FIELD] if tags else [])
+
+def fetch_s3_buckets(credentials=None, details_ttl=None, account=None, tag_regions=None):
+    """
+    Every bucket with its creation date. details_ttl (seconds) adds the
+    enrichment columns, reusing cached details younger than that;
+    tag_regions adds Tags, read from the Tagging API in those regions.
+    """
+    try:
+        s3 = get_client("s3", credentials=credentials)
+
+        logger.info("Collecting S3 buckets...")
+        buckets = list_buckets(s3)
+        if details_ttl is not None:
+            bucket_details(buckets, credentials, account, details_ttl)
+        if tag_regions is not None:
+            bucket_tags(buckets, tag_regions, credentials)
+        return to_frame(buckets, bucket_fields(details_ttl is not None, tag_regions is not None))
 
     except ClientError as e:
         logger.error(f"S3 ClientError: {e}")
-        return pd.DataFrame()
+        return None
     except Exception as e:
         logger.error(f"S3 Error: {e}")
-        return pd.DataFrame()
+        return None
+
+# Global: one task lists every bucket, then enriches and tags them
+SERVICE = ServiceSpec(
+    "s3", "S3_Buckets", GLOBAL, FIELDS + DETAIL_FIELDS + [TAGS_FIELD], ["BucketName"], weight=4.0,
+    fetch=lambda run, region: fetch_s3_buckets(run.credentials, run.s3_details_ttl, run.account, run.regions),
+)
@@ -0,0 +1,65 @@
+# services/tags.py
+"""
+Bulk tags from the Resource Groups Tagging API.
+
+One paginated get_resources call returns the tags of up to 100 resources
+per page, so a region's Lambda functions or S3 buckets cost a handful of
+calls instead of one per resource. Resources that were never tagged are
+not listed and get {}. When the API cannot be used (e.g. no
+tag:GetResources permission) callers fall back to per-resource calls on
+a thread pool.
+
+EC2 instances and EBS volumes need neither: describe_* already returns
+their tags.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from utils import logger, get_client, iter_items
+
+# get_resources returns at most 100 resources per page
+PAGE_SIZE = 100
+# Threads for the per-resource fallback
+FALLBACK_WORKERS = 8
+
+LAMBDA_FUNCTION = "lambda:function"
+S3_BUCKET = "s3"
+
+
+def tag_dict(tags):
+    """[{"Key": k, "Value": v}, ...] as {k: v}."""
+    return {t["Key"]: t.get("Value") for t in tags or ()}
+
+def bucket_name(arn):
+    # arn:<partition>:s3:::<bucket>
+    return arn.rsplit(":", 1)[-1]
+
+def request_kwargs(resource_type):
+    return {"ResourceTypeFilters": [resource_type], "PaginationConfig": {"PageSize": PAGE_SIZE}}
+
+def tags_by_arn(region, resource_type, credentials=None):
+    """{ARN: {key: value}} for region, or None when the Tagging API fails."""
+    try:
+        client = get_client("resourcegroupstaggingapi", region, credentials)
+        return {
+            r["ResourceARN"]: tag_dict(r.get("Tags"))
+            for r in iter_items(client, "get_resources", "ResourceTagMappingList", **request_kwargs(resource_type))
+        }
+    except Exception as e:
+        logger.warning(f"Tagging API failed for {resource_type} in {region}, using per-resource calls: {e}")
+        return None
+
+def fallback_warning(resource, error):
+    logger.warning(f"Could not read tags of {resource}: {error}")
+
+def per_resource(items, fetch, describe=str):
+    """[fetch(item), ...] on a thread pool; {} for any that fail."""
+    def safe(item):
+        try:
+            return fetch(item)
+        except Exception as e:
+            fallback_warning(describe(item), e)
+            return {}
+
+    with ThreadPoolExecutor(max_workers=FALLBACK_WORKERS) as pool:
+        return list(pool.map(metrics.in_stage(safe), items))
@@ -0,0 +1,135 @@
+# snapshot_store.py
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+from utils import logger
+
+# Columns that identify one resource in each report sheet
+RESOURCE_KEYS = {
+    "EC2_Instances": ["InstanceId"],
+    "S3_Buckets": ["BucketName"],
+    "Unused_EBS": ["VolumeId"],
+    "AWS_Costs": ["Service", "Start"],
+    "Lambda": ["Region", "FunctionName"],
+    "RDS_Instances": ["Region", "DBInstanceIdentifier"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    kind TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (kind, resource_id)
+)
+"""
+
+def resource_id(row, key_columns):
+    return "/".join(str(row.get(c)) for c in key_columns)
+
+class SnapshotStore:
+    """
+    Local SQLite copy of the last collected inventory, keyed by resource ID.
+    apply() diffs a fresh DataFrame against it and stores only what changed.
+    """
+
+    def __init__(self, path="inventory_snapshot.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def load(self, kind):
+        """Return {resource_id: row dict} from the previous snapshot."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT resource_id, payload FROM resources WHERE kind = ?", (kind,)
+            ).fetchall()
+        return {rid: json.loads(payload) for rid, payload in rows}
+
+    def apply(self, kind, df, key_columns=None, partition_columns=None, partitions=None):
+        """
+        Compare df with the stored snapshot for kind, persist the difference
+        and return it as a DataFrame with a ChangeType column
+        (inserted / updated / deleted).
+
+        partitions, when given, is the set of partition_columns values
+        (e.g. (Account, Region)) that df lists completely. A stored
+        resource missing from df is only deleted inside one of them; one
+        in a region whose fetch failed is kept as it was.
+        """
+        key_columns = key_columns or RESOURCE_KEYS[kind]
+        if "Account" in df.columns and "Account" not in key_columns:
+            # Organization sweeps: IDs are only unique within an account
+            key_columns = ["Account"] + list(key_columns)
+        now = datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            previous = dict(self._conn.execute(
+                "SELECT resource_id, fingerprint FROM resources WHERE kind = ?", (kind,)
+            ).fetchall())
+
+            changes = []
+            upserts = []
+            seen = set()
+            counts = {"inserted": 0, "updated": 0}
+            for row in df.to_dict("records"):
+                rid = resource_id(row, key_columns)
+                seen.add(rid)
+                payload = json.dumps(row, sort_keys=True, default=str)
+                fingerprint = hashlib.sha1(payload.encode()).hexdigest()
+                if previous.get(rid) == fingerprint:
+                    continue
+                change = "inserted" if rid not in previous else "updated"
+                counts[change] += 1
+                changes.append(dict(row, ChangeType=change))
+                upserts.append((kind, rid, fingerprint, payload, now))
+
+            deleted_ids = []
+            for rid in previous:
+                if rid in seen:
+                    continue
+                row = json.loads(self._conn.execute(
+                    "SELECT payload FROM resources WHERE kind = ? AND resource_id = ?", (kind, rid)
+                ).fetchone()[0])
+                if partitions is not None and tuple(row.get(c) for c in partition_columns) not in partitions:
+                    continue
+                deleted_ids.append(rid)
+                changes.append(dict(row, ChangeType="deleted"))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?)", upserts
+            )
+            self._conn.executemany(
+                "DELETE FROM resources WHERE kind = ? AND resource_id = ?",
+                [(kind, rid) for rid in deleted_ids]
+            )
+            self._conn.commit()
+
+        logger.info(
+            f"{kind}: {counts['inserted']} inserted, {counts['updated']} updated, "
+            f"{len(deleted_ids)} deleted"
+        )
+        return pd.DataFrame(changes)
+
+def change_summary(deltas):
+    """One row per sheet with insert/update/delete counts."""
+    rows = []
+    for kind, delta in deltas.items():
+        counts = delta["ChangeType"].value_counts() if not delta.empty else {}
+        rows.append({
+            "Resource": kind,
+            "Inserted": int(counts.get("inserted", 0)),
+            "Updated": int(counts.get("updated", 0)),
+            "Deleted": int(counts.get("deleted", 0)),
+        })
+    return pd.DataFrame(rows)
@@ -1,6 +1,15 @@
 import logging
+import threading
 from datetime import datetime
 
+import boto3
+import botocore.session
+import jmespath
+from botocore.config import Config
+
+import metrics
+import ratelimit
+
 def setup_logger():
     logger = logging.getLogger("aws-inventory")
     logger.setLevel(logging.INFO)
@@ -24,9 +33,57 @@ def setup_logger():
 
 logger = setup_logger()
 
-def get_session():
-    import boto3
-    return boto3.session.Session()
+# Keep-alive connections per client; matches the scheduler's in-flight limit
+MAX_POOL_CONNECTIONS = 16
+# Retries are handled by ratelimit.call so throttles feed the shared limiter
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={"mode": "standard", "max_attempts": 1}
+)
+
+_registry_lock = threading.RLock()
+_sessions = {}
+_clients = {}
+
+def _credentials_key(credentials):
+    if not credentials:
+        return None
+    return (credentials.get("aws_access_key_id"), credentials.get("aws_session_token"))
+
+def get_session(credentials=None):
+    """
+    Return the shared boto3 session for a set of credentials.
+    credentials=None uses the default credential chain.
+    """
+    key = _credentials_key(credentials)
+    with _registry_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = boto3.session.Session(**(credentials or {}))
+            metrics.instrument(session)
+            _sessions[key] = session
+        return session
+
+def get_client(service, region=None, credentials=None):
+    """
+    Return the process-wide client for (service, region, credentials),
+    creating it on first use. boto3 clients are thread-safe once built;
+    creation itself is serialized because sessions are not.
+    """
+    key = (service, region, _credentials_key(credentials))
+    with _registry_lock:
+        client = _clients.get(key)
+        if client is None:
+            session = get_session(credentials)
+            client = session.client(service, region_name=region, config=CLIENT_CONFIG)
+            _clients[key] = client
+        return client
+
+def reset_clients():
+    """Drop every cached session and client."""
+    with _registry_lock:
+        _clients.clear()
+        _sessions.clear()
 
 def remove_tz(dt):
     """Convert timezone-aware datetime to naive datetime for Excel."""
@@ -35,3 +92,74 @@ def remove_tz(dt):
     if dt.tzinfo is not None:
         return dt.replace(tzinfo=None)
     return dt
+
+_paginator_models = {}
+
+def _page_config(client, operation):
+    """Token names for an operation, from botocore's paginator model."""
+    service = client.meta.service_model.service_name
+    if service not in _paginator_models:
+        _paginator_models[service] = botocore.session.get_session().get_paginator_model(service)
+    api_name = client.meta.method_to_api_mapping[operation]
+    return _paginator_models[service].get_paginator(api_name)
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+def api_call(client, operation, **kwargs):
+    """Make one API call through the shared rate limiter and retry policy."""
+    service = client.meta.service_model.service_name
+    return ratelimit.call(getattr(client, operation), service, client.meta.region_name, **kwargs)
+
+def page_request(client, operation, kwargs):
+    """
+    Return (config, kwargs) for a manual pagination loop: the paginator
+    model plus the first request's arguments with PageSize mapped to the
+    operation's own limit parameter.
+    """
+    config = _page_config(client, operation)
+    kwargs = dict(kwargs)
+    page_size = kwargs.pop("PaginationConfig", {}).get("PageSize")
+    if page_size and config.get("limit_key"):
+        kwargs[config["limit_key"]] = page_size
+    return config, kwargs
+
+def next_page_tokens(config, page, previous):
+    """
+    {input token: value} for the next request, or None when the listing is
+    complete (or the service handed back the token it was just sent).
+    """
+    if "more_results" in config and not jmespath.search(config["more_results"], page):
+        return None
+    values = [jmespath.search(t, page) for t in _as_list(config["output_token"])]
+    tokens = dict(zip(_as_list(config["input_token"]), values))
+    if not any(values) or tokens == previous:
+        return None
+    return tokens
+
+def iter_pages(client, operation, **kwargs):
+    """
+    Yield response pages one at a time, so callers only ever hold a single
+    page of raw results in memory. Each page request goes through
+    api_call, so a throttled page is retried on its own instead of
+    restarting (or silently truncating) the listing.
+    """
+    config, kwargs = page_request(client, operation, kwargs)
+
+    previous = None
+    while True:
+        page = api_call(client, operation, **kwargs)
+        metrics.add("pages")
+        yield page
+
+        tokens = next_page_tokens(config, page, previous)
+        if tokens is None:
+            return
+        previous = tokens
+        kwargs.update(tokens)
+
+def iter_items(client, operation, result_key, **kwargs):
+    """Yield the items under result_key from every page of an operation."""
+    for page in iter_pages(client, operation, **kwargs):
+        for item in page.get(result_key, []):
+            yield item
@@ -0,0 +1,242 @@
+# benchmark_spacelift_bot.py
+"""
+Offline load benchmark for the Spacelift bot scripts.
+
+Every request goes to fake_spacelift_server on a local port, with
+configurable per-request latency and per-connection handshake cost, so
+the real client code runs but nothing leaves the machine.
+
+Stages, each on a fresh fake account:
+  auth        apiKeyUser per script start vs the JWT disk cache
+  legacy      one old-style script run per item: a new connection for
+              apiKeyUser, another for the mutation
+  single      pooled SpaceliftClient and cached JWT, one mutation per request
+  bulk        SpaceliftClient.bulk: aliased mutations, chunked, concurrent
+  list        unpaginated stacks vs paged searchStacks
+
+    python3 benchmark_spacelift_bot.py --items 400 --stacks 2000 --latency 20 --handshake 30
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+from fake_spacelift_server import FAKE_KEY_ID, FAKE_KEY_SECRET, FakeServer, FakeSpacelift
+from spacelift_client import AUTH_MUTATION, BULK_CHUNK, BULK_WORKERS, RUN_MUTATIONS, SpaceliftClient
+from stack_catalog import DEFAULT_FIELDS, iter_stacks
+
+ORIGINAL_CWD = os.getcwd()
+WORKDIR = tempfile.mkdtemp(prefix="spacelift-bench-")
+
+LEGACY_STACKS_QUERY = "{ stacks { id name state administrative } }"
+
+
+def single_document(action):
+    """The one-mutation document the original bots send for action."""
+    field, arguments = RUN_MUTATIONS[action]
+    definitions = ", ".join(f"${name}: ID!" for name in arguments)
+    call_arguments = ", ".join(f"{name}: ${name}" for name in arguments)
+    return f"mutation Op({definitions}) {{ {field}({call_arguments}) {{ id state }} }}"
+
+def prepare_items(account, action, count):
+    """count items ready for action: stacks for trigger, runs in the right state otherwise."""
+    stack_ids = sorted(account.stacks)[:count]
+    if action == "trigger":
+        return [{"stack": stack_id, "run": None} for stack_id in stack_ids]
+    items = []
+    for stack_id in stack_ids:
+        run = account.runTrigger(stack_id)
+        if action == "confirm":
+            account._set_state(account.runs[run["id"]], "UNCONFIRMED")
+        items.append({"stack": stack_id, "run": run["id"]})
+    return items
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Stage:
+    """Times one stage and records the fake server's counters and request latencies."""
+
+    def __init__(self, server, results, name, items):
+        self.server = server
+        self.results = results
+        self.name = name
+        self.items = items
+        self.latencies = []
+        self.failed = 0
+
+    def record(self, response, *args, **kwargs):
+        """requests response hook: time from sending to the response headers."""
+        self.latencies.append(response.elapsed.total_seconds())
+
+    def client(self, token_cache=None, pool_size=BULK_WORKERS):
+        client = SpaceliftClient(FAKE_KEY_ID, FAKE_KEY_SECRET, self.server.url, token_cache, pool_size)
+        client.session.hooks["response"].append(self.record)
+        return client
+
+    def __enter__(self):
+        self.before = dict(self.server.account.stats)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        stats = {k: v - self.before[k] for k, v in self.server.account.stats.items()}
+        self.results.append({
+            "stage": self.name,
+            "items": self.items,
+            "seconds": round(elapsed, 3),
+            "requests": stats["requests"],
+            "requests_per_sec": round(stats["requests"] / elapsed, 1) if elapsed else 0,
+            "items_per_sec": round(self.items / elapsed, 1) if elapsed else 0,
+            "p50_ms": round(percentile(self.latencies, 0.50) * 1000, 1),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 1),
+            "kb_received": round(stats["bytes"] / 1024, 1),
+            "connections": stats["connections"],
+            "auth_calls": stats["auth"],
+            "failed": self.failed + stats["rate_limited"],
+        })
+        return False
+
+# -------------------------------
+# Stages
+# -------------------------------
+def bench_auth(server, results, repeats):
+    cache = os.path.join(WORKDIR, "auth_jwt_cache.json")
+    with Stage(server, results, "auth:apiKeyUser", repeats) as stage:
+        for _ in range(repeats):
+            client = stage.client()
+            client.token()
+            client.close()
+    # Every later script start finds the JWT on disk
+    SpaceliftClient(FAKE_KEY_ID, FAKE_KEY_SECRET, server.url, cache).token()
+    with Stage(server, results, "auth:jwt-cache", repeats) as stage:
+        for _ in range(repeats):
+            client = stage.client(cache)
+            client.token()
+            client.close()
+
+def bench_legacy(server, results, action, items):
+    """What running the original bot once per item costs."""
+    document = single_document(action)
+    field, arguments = RUN_MUTATIONS[action]
+    with Stage(server, results, f"legacy:{action}", len(items)) as stage:
+        hooks = {"response": stage.record}
+        for item in items:
+            auth = requests.post(
+                server.url, json={"query": AUTH_MUTATION, "variables": {"keyId": FAKE_KEY_ID, "keySecret": FAKE_KEY_SECRET}},
+                hooks=hooks
+            )
+            jwt = auth.json()["data"]["apiKeyUser"]["jwt"]
+            response = requests.post(
+                server.url, json={"query": document, "variables": {name: item[name] for name in arguments}},
+                headers={"Authorization": f"Bearer {jwt}"}, hooks=hooks
+            )
+            if response.status_code != 200 or response.json().get("errors"):
+                stage.failed += 1
+
+def bench_single(server, results, action, items):
+    document = single_document(action)
+    field, arguments = RUN_MUTATIONS[action]
+    with Stage(server, results, f"single:{action}", len(items)) as stage:
+        with stage.client() as client:
+            for item in items:
+                try:
+                    data = client.post_authorized(document, {name: item[name] for name in arguments})
+                except Exception:
+                    stage.failed += 1
+                    continue
+                if data.get("errors"):
+                    stage.failed += 1
+
+def bench_bulk(server, results, action, items, chunk_size, workers, rate):
+    with Stage(server, results, f"bulk:{action}", len(items)) as stage:
+        with stage.client(pool_size=workers) as client:
+            outcome = client.bulk(action, items, chunk_size, workers, rate)
+        stage.failed = sum(1 for r in outcome if r["error"])
+
+def bench_list(server, results, stacks):
+    with Stage(server, results, "list:stacks", stacks) as stage:
+        with stage.client() as client:
+            client.query(LEGACY_STACKS_QUERY)
+    with Stage(server, results, "list:searchStacks", stacks) as stage:
+        with stage.client() as client:
+            for _ in iter_stacks(client, DEFAULT_FIELDS):
+                pass
+
+
+def run_stages(args, results):
+    def fresh_server():
+        account = FakeSpacelift(args.stacks, error_rate=args.error_rate, run_step=3600)
+        return FakeServer(
+            ("127.0.0.1", 0), account, args.latency / 1000, args.jitter / 1000, args.handshake / 1000,
+            args.rate_limit
+        ).start()
+
+    for stage in args.stages:
+        server = fresh_server()
+        try:
+            if stage == "auth":
+                bench_auth(server, results, args.auth_repeats)
+            elif stage == "list":
+                bench_list(server, results, args.stacks)
+            else:
+                items = prepare_items(server.account, args.action, args.items)
+                if stage == "legacy":
+                    bench_legacy(server, results, args.action, items)
+                elif stage == "single":
+                    bench_single(server, results, args.action, items)
+                else:
+                    bench_bulk(server, results, args.action, items, args.chunk_size, args.workers, args.rate)
+        finally:
+            server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Spacelift bot benchmark against a fake GraphQL server.")
+    parser.add_argument("--stages", nargs="+", default=["auth", "legacy", "single", "bulk", "list"],
+                        choices=["auth", "legacy", "single", "bulk", "list"])
+    parser.add_argument("--action", choices=sorted(RUN_MUTATIONS), default="confirm",
+                        help="mutation for the legacy/single/bulk stages (default: confirm)")
+    parser.add_argument("--items", type=int, default=400, help="stacks/runs per mutation stage (default: 400)")
+    parser.add_argument("--stacks", type=int, default=2000, help="stacks in the fake account (default: 2000)")
+    parser.add_argument("--auth-repeats", type=int, default=50, help="script starts in the auth stage (default: 50)")
+    parser.add_argument("--latency", type=float, default=20.0, help="ms per request (default: 20)")
+    parser.add_argument("--jitter", type=float, default=5.0, help="up to this many ms more per request (default: 5)")
+    parser.add_argument("--handshake", type=float, default=30.0,
+                        help="ms per new connection, standing in for TCP+TLS setup (default: 30)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fields failing (default: 0)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="server requests per second; 0 = none")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK)
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS)
+    parser.add_argument("--rate", type=float, default=0, help="client bulk rate limit, requests/s; 0 = none")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    run_stages(args, results)
+
+    header = (f"{'stage':<22} {'items':>6} {'seconds':>8} {'requests':>8} {'req/s':>8} {'items/s':>9} "
+              f"{'p50_ms':>7} {'p99_ms':>7} {'kb':>8} {'conns':>6} {'auth':>5} {'failed':>6}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['stage']:<22} {r['items']:>6} {r['seconds']:>8} {r['requests']:>8} {r['requests_per_sec']:>8} "
+              f"{r['items_per_sec']:>9} {r['p50_ms']:>7} {r['p99_ms']:>7} {r['kb_received']:>8} {r['connections']:>6} "
+              f"{r['auth_calls']:>5} {r['failed']:>6}")
+    print(f"\nCaches in {WORKDIR}")
+
+    if args.json:
+        with open(os.path.join(ORIGINAL_CWD, args.json), "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""
+Local stand-in for the Spacelift GraphQL API, for offline tests and
+benchmarks of the bot scripts.
+
+It understands the GraphQL the bots send (operations with variables,
+aliases, arguments and nested selections; no fragments) and implements
+apiKeyUser, stacks, searchStacks, stack { run runs }, runTrigger,
+runConfirm and runStop over an in-memory account. Latency, a per-
+connection handshake cost, random errors and a request rate limit are
+configurable, so pooling, batching and caching show up in measurements.
+
+    python3 fake_spacelift_server.py --port 8765 --stacks 500 --latency 20
+    # then point GRAPHQL_URL at http://127.0.0.1:8765/graphql
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The only API key the fake accepts
+FAKE_KEY_ID = "fake-key-id"
+FAKE_KEY_SECRET = "fake-key-secret"
+JWT_TTL = 3600
+
+# Seconds a run spends in each automatic state before moving on
+RUN_STEP = 1.0
+# state -> next state once RUN_STEP has passed; UNCONFIRMED waits for runConfirm
+RUN_PROGRESS = {
+    "QUEUED": "PREPARING",
+    "PREPARING": "PLANNING",
+    "PLANNING": "UNCONFIRMED",
+    "CONFIRMED": "APPLYING",
+    "APPLYING": "FINISHED",
+}
+
+# -------------------------------
+# GraphQL subset: tokenizer and parser
+# -------------------------------
+TOKEN = re.compile(r'''
+    (?P<skip>[\s,]+|\#[^\n]*)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+  | (?P<punct>[!$():=@\[\]{}|])
+''', re.VERBOSE)
+
+
+class GraphQLError(Exception):
+    """Reported in the response's errors list."""
+
+
+def tokenize(source):
+    tokens, pos = [], 0
+    while pos < len(source):
+        match = TOKEN.match(source, pos)
+        if not match:
+            raise GraphQLError(f"Syntax error at {pos}: {source[pos:pos + 20]!r}")
+        pos = match.end()
+        if match.lastgroup != "skip":
+            tokens.append((match.lastgroup, match.group()))
+    return tokens
+
+
+class Parser:
+    """
+    Recursive descent over the token list. A selection is a list of
+    (alias, name, arguments, selection or None); variable references
+    stay as ("$", name) until execution.
+    """
+
+    def __init__(self, source):
+        self.tokens = tokenize(source)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def take(self, expected=None):
+        if self.pos >= len(self.tokens):
+            raise GraphQLError("Unexpected end of document")
+        kind, value = self.tokens[self.pos]
+        if expected and value != expected:
+            raise GraphQLError(f"Expected {expected!r}, got {value!r}")
+        self.pos += 1
+        return kind, value
+
+    def document(self):
+        """(operation, selection) of the single operation."""
+        operation = "query"
+        if self.peek() in ("query", "mutation"):
+            operation = self.take()[1]
+            if self.peek() not in ("(", "{"):
+                self.take()  # operation name
+            if self.peek() == "(":
+                self.skip_variable_definitions()
+        return operation, self.selection_set()
+
+    def skip_variable_definitions(self):
+        # Types and defaults are not checked; variables are used as sent
+        depth = 0
+        while True:
+            value = self.take()[1]
+            depth += value == "("
+            depth -= value == ")"
+            if depth == 0:
+                return
+
+    def selection_set(self):
+        self.take("{")
+        fields = []
+        while self.peek() != "}":
+            name = self.take()[1]
+            alias = name
+            if self.peek() == ":":
+                self.take()
+                name = self.take()[1]
+            arguments = self.arguments() if self.peek() == "(" else {}
+            selection = self.selection_set() if self.peek() == "{" else None
+            fields.append((alias, name, arguments, selection))
+        self.take("}")
+        return fields
+
+    def arguments(self):
+        self.take("(")
+        arguments = {}
+        while self.peek() != ")":
+            name = self.take()[1]
+            self.take(":")
+            arguments[name] = self.value()
+        self.take(")")
+        return arguments
+
+    def value(self):
+        kind, token = self.take()
+        if token == "$":
+            return ("$", self.take()[1])
+        if kind == "string":
+            return json.loads(token)
+        if kind == "number":
+            return float(token) if any(c in token for c in ".eE") else int(token)
+        if token == "[":
+            items = []
+            while self.peek() != "]":
+                items.append(self.value())
+            self.take("]")
+            return items
+        if token == "{":
+            fields = {}
+            while self.peek() != "}":
+                key = self.take()[1]
+                self.take(":")
+                fields[key] = self.value()
+            self.take("}")
+            return fields
+        return {"true": True, "false": False, "null": None}.get(token, token)
+
+
+def resolve_variables(value, variables):
+    if isinstance(value, tuple) and value[0] == "$":
+        return variables.get(value[1])
+    if isinstance(value, list):
+        return [resolve_variables(v, variables) for v in value]
+    if isinstance(value, dict):
+        return {k: resolve_variables(v, variables) for k, v in value.items()}
+    return value
+
+def project(value, selection, variables):
+    """
+    value cut down to selection. Fields holding a callable are resolved
+    by calling it with the field's arguments (e.g. stack.run(id:)).
+    """
+    if selection is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, selection, variables) for item in value]
+    result = {}
+    for alias, name, arguments, subselection in selection:
+        if name not in value:
+            raise GraphQLError(f"Cannot query field {name!r}")
+        field = value[name]
+        if callable(field):
+            field = field(**resolve_variables(arguments, variables))
+        result[alias] = project(field, subselection, variables)
+    return result
+
+# -------------------------------
+# Fake account
+# -------------------------------
+def make_jwt(subject, expires):
+    def part(claims):
+        return base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"{part({'alg': 'none', 'typ': 'JWT'})}.{part({'sub': subject, 'exp': int(expires)})}.fake"
+
+
+class FakeSpacelift:
+    """In-memory stacks and runs, plus the request counters the benchmark reads."""
+
+    def __init__(self, stacks=100, jwt_ttl=JWT_TTL, error_rate=0.0, run_step=RUN_STEP, seed=0):
+        self.jwt_ttl = jwt_ttl
+        self.error_rate = error_rate
+        self.run_step = run_step
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.runs = {}
+        self.next_run = 0
+        self.stats = {
+            "requests": 0, "auth": 0, "fields": 0, "errors": 0, "rate_limited": 0, "connections": 0, "bytes": 0,
+        }
+        now = int(time.time())
+        self.stacks = {
+            f"stack-{i:05d}": {
+                "id": f"stack-{i:05d}",
+                "name": f"Stack {i}",
+                "description": None,
+                "state": "FINISHED",
+                "administrative": i % 10 == 0,
+                "branch": "main",
+                "repository": "infra",
+                "labels": ["bench"],
+                "stateSetAt": now - i,
+            }
+            for i in range(stacks)
+        }
+
+    def count(self, stat, n=1):
+        with self.lock:
+            self.stats[stat] += n
+
+    # --- run lifecycle ----------------------------------------------------
+    def _advance(self, run):
+        """Move run along RUN_PROGRESS for every RUN_STEP since its last change."""
+        now = time.time()
+        while run["state"] in RUN_PROGRESS and now - run["changed"] >= self.run_step:
+            run["changed"] += self.run_step
+            run["state"] = RUN_PROGRESS[run["state"]]
+            run["updatedAt"] = int(run["changed"])
+        return run
+
+    def _set_state(self, run, state):
+        run["state"] = state
+        run["changed"] = time.time()
+        run["updatedAt"] = int(run["changed"])
+        self.stacks[run["stack"]]["stateSetAt"] = run["updatedAt"]
+
+    def run_view(self, run):
+        self._advance(run)
+        return {k: run[k] for k in ("id", "state", "type", "createdAt", "updatedAt")}
+
+    def stack_view(self, stack):
+        def run(id):
+            found = self.runs.get(id)
+            return self.run_view(found) if found and found["stack"] == stack["id"] else None
+
+        def runs():
+            return [self.run_view(r) for r in self.runs.values() if r["stack"] == stack["id"]]
+
+        return {**stack, "run": run, "runs": runs}
+
+    def _stack(self, stack_id):
+        if stack_id not in self.stacks:
+            raise GraphQLError(f"stack {stack_id!r} not found")
+        return self.stacks[stack_id]
+
+    def _run(self, stack_id, run_id):
+        run = self.runs.get(run_id)
+        if not run or run["stack"] != self._stack(stack_id)["id"]:
+            raise GraphQLError(f"run {run_id!r} not found in stack {stack_id!r}")
+        return self._advance(run)
+
+    # --- root fields --------------------------------------------------------
+    def apiKeyUser(self, id, secret):
+        if (id, secret) != (FAKE_KEY_ID, FAKE_KEY_SECRET):
+            raise GraphQLError("unauthorized")
+        self.stats["auth"] += 1
+        expires = time.time() + self.jwt_ttl
+        jwt = make_jwt(id, expires)
+        self.tokens[jwt] = expires
+        return {"jwt": jwt}
+
+    def stacks_field(self):
+        return [self.stack_view(s) for s in self.stacks.values()]
+
+    def searchStacks(self, input=None):
+        input = input or {}
+        ids = sorted(self.stacks)
+        start = int(input.get("after") or 0)
+        first = min(int(input.get("first") or 50), 50)
+        page = ids[start:start + first]
+        end = start + len(page)
+        return {
+            "edges": [{"cursor": str(start + i + 1), "node": self.stack_view(self.stacks[s])} for i, s in enumerate(page)],
+            "pageInfo": {"endCursor": str(end), "hasNextPage": end < len(ids), "hasPreviousPage": start > 0},
+        }
+
+    def stack(self, id):
+        return self.stack_view(self.stacks[id]) if id in self.stacks else None
+
+    def runTrigger(self, stack):
+        self._stack(stack)
+        self.next_run += 1
+        now = time.time()
+        run = {
+            "id": f"run-{self.next_run:06d}", "stack": stack, "state": "QUEUED", "type": "TRACKED",
+            "createdAt": int(now), "updatedAt": int(now), "changed": now,
+        }
+        self.runs[run["id"]] = run
+        self.stacks[stack]["stateSetAt"] = int(now)
+        return self.run_view(run)
+
+    def runConfirm(self, stack, run):
+        found = self._run(stack, run)
+        if found["state"] != "UNCONFIRMED":
+            raise GraphQLError(f"run {run!r} is {found['state']}, not awaiting confirmation")
+        self._set_state(found, "CONFIRMED")
+        return self.run_view(found)
+
+    def runStop(self, stack, run):
+        found = self._run(stack, run)
+        if found["state"] in ("FINISHED", "FAILED", "STOPPED", "DISCARDED"):
+            raise GraphQLError(f"run {run!r} is already {found['state']}")
+        self._set_state(found, "STOPPED")
+        return self.run_view(found)
+
+    # --- execution --------------------------------------------------------
+    def authorized(self, header):
+        token = header[len("Bearer "):] if header and header.startswith("Bearer ") else None
+        return token is not None and self.tokens.get(token, 0) > time.time()
+
+    def execute(self, body, auth_header):
+        """(HTTP status, response body) for one GraphQL request."""
+        try:
+            operation, selection = Parser(body.get("query") or "").document()
+        except GraphQLError as e:
+            return 200, {"errors": [{"message": str(e)}]}
+        variables = body.get("variables") or {}
+        roots = {
+            "query": {"stacks": self.stacks_field, "searchStacks": self.searchStacks, "stack": self.stack},
+            "mutation": {
+                "apiKeyUser": self.apiKeyUser, "runTrigger": self.runTrigger,
+                "runConfirm": self.runConfirm, "runStop": self.runStop,
+            },
+        }[operation]
+        if not (len(selection) == 1 and selection[0][1] == "apiKeyUser") and not self.authorized(auth_header):
+            return 401, {"errors": [{"message": "unauthorized"}]}
+
+        data, errors = {}, []
+        with self.lock:
+            for alias, name, arguments, subselection in selection:
+                self.stats["fields"] += 1
+                try:
+                    if name not in roots:
+                        raise GraphQLError(f"Cannot query field {name!r} on {operation}")
+                    if name != "apiKeyUser" and self.error_rate and self.random.random() < self.error_rate:
+                        raise GraphQLError("internal error (injected)")
+                    value = roots[name](**resolve_variables(arguments, variables))
+                    data[alias] = project(value, subselection, variables)
+                except (GraphQLError, TypeError) as e:
+                    self.stats["errors"] += 1
+                    data[alias] = None
+                    errors.append({"message": str(e), "path": [alias]})
+        response = {"data": data}
+        if errors:
+            response["errors"] = errors
+        return 200, response
+
+
+class RateLimit:
+    """At most rate requests in any one-second window; 0 is unlimited."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.window = []
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if not self.rate:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            self.window = [t for t in self.window if now - t < 1.0]
+            if len(self.window) >= self.rate:
+                return False
+            self.window.append(now)
+            return True
+
+# -------------------------------
+# HTTP server
+# -------------------------------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; without this, Nagle
+        # and delayed ACKs add ~40ms to every keep-alive response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Stand-in for the TCP + TLS handshake a new connection costs
+        self.server.account.count("connections")
+        if self.server.handshake:
+            time.sleep(self.server.handshake)
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server.account.count("requests")
+        if server.latency or server.jitter:
+            time.sleep(server.latency + server.jitter * server.account.random.random())
+        if not server.rate_limit.allow():
+            server.account.count("rate_limited")
+            return self.reply(429, {"errors": [{"message": "rate limit exceeded"}]})
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return self.reply(400, {"errors": [{"message": "request body is not JSON"}]})
+        self.reply(*server.account.execute(request, self.headers.get("Authorization")))
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.server.account.count("bytes", len(data))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, account, latency=0.0, jitter=0.0, handshake=0.0, rate_limit=0):
+        super().__init__(address, Handler)
+        self.account = account
+        self.latency = latency
+        self.jitter = jitter
+        self.handshake = handshake
+        self.rate_limit = RateLimit(rate_limit)
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/graphql"
+
+    def start(self):
+        """Serve on a daemon thread; returns self for chaining."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a local fake Spacelift GraphQL API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stacks", type=int, default=100, help="stacks in the fake account (default: 100)")
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many ms more, at random")
+    parser.add_argument("--handshake", type=float, default=0.0, help="ms added to every new connection")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of fields that fail with a GraphQL error (default: 0)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second before 429s; 0 = none")
+    parser.add_argument("--jwt-ttl", type=int, default=JWT_TTL, help=f"JWT lifetime in seconds (default: {JWT_TTL})")
+    parser.add_argument("--run-step", type=float, default=RUN_STEP,
+                        help=f"seconds per automatic run state (default: {RUN_STEP:g})")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    account = FakeSpacelift(args.stacks, args.jwt_ttl, args.error_rate, args.run_step)
+    server = FakeServer(
+        ("127.0.0.1", args.port), account, args.latency / 1000, args.jitter / 1000, args.handshake / 1000,
+        args.rate_limit
+    )
+    print(f"🧪 Fake Spacelift on {server.url} ({args.stacks} stacks); key ID {FAKE_KEY_ID!r}, secret {FAKE_KEY_SECRET!r}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped.")
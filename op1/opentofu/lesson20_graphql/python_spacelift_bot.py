@@ -1,7 +1,9 @@
-import requests
-import json
 import sys
 
+from spacelift_client import AuthError, SpaceliftClient
+from run_watcher import watch_runs
+from stack_catalog import DEFAULT_FIELDS, CatalogError, iter_pages
+
 # --- CONFIGURATION ---
 # Use the exact same credentials that worked in your debug script
 SPACELIFT_ORG = "ilglabs"
@@ -11,72 +13,43 @@ API_KEY_SECRET = "d1a70bc723c2ea6aa84a626daf44429200be97fe530f2a2111d8431329da43
 # Endpoint
 GRAPHQL_URL = f"https://{SPACELIFT_ORG}.app.spacelift.io/graphql"
 
-def run_query(query, variables=None, token=None):
-    headers = {"Content-Type": "application/json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+# One pooled session and a JWT cached on disk for every call below
+client = SpaceliftClient(API_KEY_ID, API_KEY_SECRET, GRAPHQL_URL)
 
-    response = requests.post(
-        GRAPHQL_URL,
-        json={'query': query, 'variables': variables},
-        headers=headers
-    )
-    
-    if response.status_code != 200:
-        raise Exception(f"Query failed: {response.status_code} - {response.text}")
-    
-    result = response.json()
-    if 'errors' in result:
-        print(f"⚠️ GraphQL Errors: {json.dumps(result['errors'], indent=2)}")
-        return None
-        
-    return result.get('data')
+def run_query(query, variables=None):
+    # The client attaches its own JWT and refreshes it when Spacelift rejects it
+    return client.query(query, variables)
 
 def get_token():
     print(f"🔑 Authenticating with {SPACELIFT_ORG}...")
-    query = """
-    mutation GetToken($keyId: ID!, $keySecret: String!) {
-      apiKeyUser(id: $keyId, secret: $keySecret) { jwt }
-    }
-    """
-    data = run_query(query, variables={"keyId": API_KEY_ID, "keySecret": API_KEY_SECRET})
-    
-    if data is None or data.get('apiKeyUser') is None:
+    # Served from the JWT cache until shortly before it expires
+    try:
+        return client.token()
+    except AuthError:
         print("❌ CRITICAL ERROR: Authentication failed (Token is None).")
         print("   Please check your API_KEY_ID and API_KEY_SECRET.")
         sys.exit(1)
-        
-    return data['apiKeyUser']['jwt']
 
-def list_stacks(token):
+def list_stacks(fields=DEFAULT_FIELDS):
     print("\n📋 Fetching Stacks...")
-    query = """
-    {
-      stacks {
-        id
-        name
-        state
-        administrative
-      }
-    }
-    """
-    data = run_query(query, token=token)
-    if not data:
-        return []
-        
-    stacks = data['stacks']
-    
     print(f"{'ID':<30} {'NAME':<30} {'STATE':<15}")
     print("-" * 75)
-    for stack in stacks:
-        # Handle cases where name might be None
-        s_id = stack['id']
-        s_name = stack['name'] or "N/A"
-        s_state = stack['state']
-        print(f"{s_id:<30} {s_name:<30} {s_state:<15}")
+    stacks = []
+    # searchStacks pages: rows are printed as each page arrives
+    try:
+        for page in iter_pages(client, fields):
+            for stack in page:
+                # Handle cases where name might be None
+                s_id = stack['id']
+                s_name = stack.get('name') or "N/A"
+                s_state = stack.get('state') or "N/A"
+                print(f"{s_id:<30} {s_name:<30} {s_state:<15}")
+            stacks.extend(page)
+    except CatalogError:
+        print("❌ Stack listing stopped: searchStacks returned no data")
     return stacks
 
-def trigger_run(token, stack_id):
+def trigger_run(stack_id):
     print(f"\n🚀 Triggering run for stack: {stack_id}...")
     mutation = """
     mutation TriggerRun($stackId: ID!) {
@@ -87,25 +60,27 @@ def trigger_run(token, stack_id):
       }
     }
     """
-    data = run_query(mutation, variables={"stackId": stack_id}, token=token)
+    data = run_query(mutation, variables={"stackId": stack_id})
     
     if data and data.get('runTrigger'):
         run_info = data['runTrigger']
         print(f"✅ Run Triggered Successfully!")
         print(f"   Run ID: {run_info['id']}")
         print(f"   State:  {run_info['state']}")
+        return run_info
     else:
         print("❌ Failed to trigger run.")
+        return None
 
 # --- MAIN EXECUTION ---
 if __name__ == "__main__":
     try:
         # 1. Get Token
-        jwt = get_token()
+        get_token()
         print("✅ Auth Successful.")
         
         # 2. List Stacks
-        my_stacks = list_stacks(jwt)
+        my_stacks = list_stacks()
         
         if not my_stacks:
             print("\nNo stacks found (or permission denied).")
@@ -113,7 +88,10 @@ if __name__ == "__main__":
             # 3. Interactive Trigger
             target_stack = input("\nEnter a Stack ID to trigger a run (or press Enter to skip): ").strip()
             if target_stack:
-                trigger_run(jwt, target_stack)
+                run_info = trigger_run(target_stack)
+                if run_info and input("Follow the run until it finishes? (y/N): ").strip().lower() == "y":
+                    results = watch_runs(client, [{"stack": target_stack, "run": run_info['id']}])
+                    print(f"🏁 Final state: {results[0]['state'] or results[0]['error']}")
             else:
                 print("Skipping trigger.")
 
@@ -1,7 +1,7 @@
-import requests
-import json
 import sys
 
+from spacelift_client import AuthError, SpaceliftClient
+
 # --- CONFIGURATION ---
 SPACELIFT_ORG = "ilglabs"
 # Replace these with your actual credentials
@@ -10,41 +10,23 @@ API_KEY_SECRET = "d1a70bc723c2ea6aa84a626daf44429200be97fe530f2a2111d8431329da43
 
 GRAPHQL_URL = f"https://{SPACELIFT_ORG}.app.spacelift.io/graphql"
 
-def run_query(query, variables=None, token=None):
-    headers = {"Content-Type": "application/json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
+# One pooled session and a JWT cached on disk for every call below
+client = SpaceliftClient(API_KEY_ID, API_KEY_SECRET, GRAPHQL_URL)
 
-    response = requests.post(
-        GRAPHQL_URL,
-        json={'query': query, 'variables': variables},
-        headers=headers
-    )
-    
-    if response.status_code != 200:
-        raise Exception(f"Query failed: {response.status_code} - {response.text}")
-    
-    result = response.json()
-    if 'errors' in result:
-        print(f"⚠️ GraphQL Errors: {json.dumps(result['errors'], indent=2)}")
-        return None
-        
-    return result.get('data')
+def run_query(query, variables=None):
+    # The client attaches its own JWT and refreshes it when Spacelift rejects it
+    return client.query(query, variables)
 
 def get_token():
     print(f"🔑 Authenticating with {SPACELIFT_ORG}...")
-    query = """
-    mutation GetToken($keyId: ID!, $keySecret: String!) {
-      apiKeyUser(id: $keyId, secret: $keySecret) { jwt }
-    }
-    """
-    data = run_query(query, variables={"keyId": API_KEY_ID, "keySecret": API_KEY_SECRET})
-    if not data or not data.get('apiKeyUser'):
+    # Served from the JWT cache until shortly before it expires
+    try:
+        return client.token()
+    except AuthError:
         print("❌ Auth Failed. Check credentials.")
         sys.exit(1)
-    return data['apiKeyUser']['jwt']
 
-def approve_run(token, stack_id, run_id):
+def approve_run(stack_id, run_id):
     print(f"\n👍 Approving Run {run_id} on Stack {stack_id}...")
     mutation = """
     mutation ConfirmRun($stackId: ID!, $runId: ID!) {
@@ -55,14 +37,14 @@ def approve_run(token, stack_id, run_id):
     }
     """
     variables = {"stackId": stack_id, "runId": run_id}
-    data = run_query(mutation, variables=variables, token=token)
+    data = run_query(mutation, variables=variables)
     
     if data and data.get('runConfirm'):
         print(f"✅ Success! Run State: {data['runConfirm']['state']}")
     else:
         print("❌ Failed to approve run.")
 
-def stop_run(token, stack_id, run_id):
+def stop_run(stack_id, run_id):
     print(f"\nCc Stopping Run {run_id} on Stack {stack_id}...")
     mutation = """
     mutation StopRun($stackId: ID!, $runId: ID!) {
@@ -73,7 +55,7 @@ def stop_run(token, stack_id, run_id):
     }
     """
     variables = {"stackId": stack_id, "runId": run_id}
-    data = run_query(mutation, variables=variables, token=token)
+    data = run_query(mutation, variables=variables)
     
     if data and data.get('runStop'):
         print(f"✅ Success! Run State: {data['runStop']['state']}")
@@ -82,7 +64,7 @@ def stop_run(token, stack_id, run_id):
 
 # --- MAIN INTERACTIVE LOOP ---
 if __name__ == "__main__":
-    jwt = get_token()
+    get_token()
     
     print("\n--- Spacelift Action Bot ---")
     s_id = input("Enter Stack ID: ").strip()
@@ -98,8 +80,8 @@ if __name__ == "__main__":
     choice = input("Select (1/2): ").strip()
 
     if choice == "1":
-        approve_run(jwt, s_id, r_id)
+        approve_run(s_id, r_id)
     elif choice == "2":
-        stop_run(jwt, s_id, r_id)
+        stop_run(s_id, r_id)
     else:
         print("Invalid choice.")
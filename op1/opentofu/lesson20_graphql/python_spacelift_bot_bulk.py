@@ -0,0 +1,57 @@
+import argparse
+import sys
+
+from spacelift_client import BULK_CHUNK, BULK_RATE, BULK_WORKERS, RUN_MUTATIONS, print_results
+# Same account and credentials as the interactive bot
+from python_spacelift_bot import SPACELIFT_ORG, client
+
+def read_items(path, action):
+    """
+    One item per line: "<stack id>" for trigger, "<stack id> <run id>"
+    for confirm/stop (a comma works too). Blank lines and # comments are skipped.
+    """
+    needs_run = "run" in RUN_MUTATIONS[action][1]
+    items = []
+    with (sys.stdin if path == "-" else open(path)) as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split("#", 1)[0].replace(",", " ").split()
+            if not fields:
+                continue
+            if needs_run and len(fields) < 2:
+                print(f"❌ Line {number}: {action} needs a stack ID and a run ID.")
+                sys.exit(1)
+            items.append({"stack": fields[0], "run": fields[1] if needs_run else None})
+    return items
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Trigger, confirm or stop Spacelift runs in bulk.")
+    parser.add_argument("action", choices=sorted(RUN_MUTATIONS))
+    parser.add_argument("file", help="stack IDs (and run IDs for confirm/stop), one per line; - reads stdin")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK,
+                        help=f"mutations per GraphQL request (default: {BULK_CHUNK})")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS,
+                        help=f"requests in flight at once (default: {BULK_WORKERS})")
+    parser.add_argument("--rate", type=float, default=BULK_RATE,
+                        help=f"requests per second at most; 0 for no limit (default: {BULK_RATE:g})")
+    args = parser.parse_args()
+    if args.chunk_size < 1 or args.workers < 1:
+        parser.error("--chunk-size and --workers must be at least 1")
+    return args
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    args = parse_args()
+    items = read_items(args.file, args.action)
+    if not items:
+        print("Nothing to do.")
+        sys.exit(0)
+
+    print(f"🔑 Authenticating with {SPACELIFT_ORG}...")
+    print(f"🚀 Sending {len(items)} {args.action} mutations, {args.chunk_size} per request...")
+    try:
+        results = client.bulk(args.action, items, args.chunk_size, args.workers, args.rate)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    print_results(results)
+    sys.exit(1 if any(r["error"] for r in results) else 0)
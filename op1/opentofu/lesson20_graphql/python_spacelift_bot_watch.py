@@ -0,0 +1,53 @@
+import argparse
+import re
+import sys
+
+from spacelift_client import print_results
+from run_watcher import watch_runs
+# Same account and credentials as the interactive bot
+from python_spacelift_bot import SPACELIFT_ORG, client
+from python_spacelift_bot_bulk import read_items
+
+def approval_policy(args):
+    """Predicate on {"stack", "id", "state", "type", ...}, or None for no auto-approval."""
+    if not args.auto_approve:
+        return None
+    stack_pattern = re.compile(args.approve_stack) if args.approve_stack else None
+    run_types = set(args.approve_type or [])
+
+    def approve(run):
+        if stack_pattern and not stack_pattern.search(run["stack"]):
+            return False
+        return not run_types or run.get("type") in run_types
+
+    return approve
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Follow Spacelift runs until they finish.")
+    parser.add_argument("file", help="'<stack id> <run id>' per line; - reads stdin")
+    parser.add_argument("--timeout", type=float, help="give up after this many seconds")
+    parser.add_argument("--auto-approve", action="store_true",
+                        help="confirm unconfirmed runs that pass the policy below")
+    parser.add_argument("--approve-stack", metavar="REGEX",
+                        help="only auto-approve runs of stacks whose ID matches")
+    parser.add_argument("--approve-type", action="append", metavar="TYPE",
+                        help="only auto-approve runs of this type, e.g. TRACKED; repeat for several")
+    return parser.parse_args()
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    args = parse_args()
+    items = read_items(args.file, "confirm")
+    if not items:
+        print("Nothing to watch.")
+        sys.exit(0)
+
+    print(f"🔑 Authenticating with {SPACELIFT_ORG}...")
+    print(f"👀 Watching {len(items)} runs...")
+    try:
+        results = watch_runs(client, items, approve=approval_policy(args), timeout=args.timeout)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+        sys.exit(130)
+    print_results(results)
+    sys.exit(1 if any(r["error"] or r["state"] != "FINISHED" for r in results) else 0)
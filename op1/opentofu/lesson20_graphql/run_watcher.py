@@ -0,0 +1,214 @@
+"""
+Follow many Spacelift runs to a final state at once.
+
+Every run has its own next-poll time. The asyncio loop gathers the runs
+that are due into aliased stack(id:) { run(id:) } queries, BATCH_SIZE per
+request, so hundreds of runs cost a few requests per round instead of
+one each. A run whose state has not moved is polled less and less
+often (up to a per-state ceiling); one waiting for confirmation is
+polled quickly. An approve(run) predicate turns on auto-approval:
+unconfirmed runs it accepts are confirmed in bulk through runConfirm.
+"""
+import asyncio
+
+from spacelift_client import alias_errors
+
+# Runs per state query
+BATCH_SIZE = 50
+# State queries in flight at once
+MAX_IN_FLIGHT = 4
+# Runs due within this many seconds of each other share a request
+COALESCE = 0.5
+
+# First interval, and after every state change
+MIN_INTERVAL = 2.0
+# Growth of the interval while the state stays the same
+BACKOFF = 1.5
+# Longest wait between polls per state: runs sitting in a queue can wait,
+# planning ends at a confirm point, and an unconfirmed run is polled often
+MAX_INTERVALS = {
+    "QUEUED": 60.0,
+    "READY": 60.0,
+    "PREPARING": 30.0,
+    "INITIALIZING": 30.0,
+    "PLANNING": 10.0,
+    "UNCONFIRMED": 3.0,
+    "CONFIRMED": 5.0,
+    "APPLYING": 20.0,
+}
+DEFAULT_MAX_INTERVAL = 30.0
+
+CONFIRM_STATE = "UNCONFIRMED"
+FINAL_STATES = frozenset({"FINISHED", "FAILED", "STOPPED", "CANCELED", "DISCARDED", "SKIPPED"})
+RUN_SELECTION = "id state type updatedAt"
+
+
+class Watch:
+    """Polling state of one run."""
+
+    __slots__ = ("stack", "run", "state", "details", "interval", "due", "approved", "error")
+
+    def __init__(self, stack, run):
+        self.stack = stack
+        self.run = run
+        self.state = None
+        self.details = {}
+        self.interval = MIN_INTERVAL
+        self.due = 0.0
+        self.approved = False
+        self.error = None
+
+    @property
+    def done(self):
+        return self.error is not None or self.state in FINAL_STATES
+
+    def update(self, details, now):
+        """Record a poll; True when the state changed."""
+        changed = details.get("state") != self.state
+        if changed:
+            self.interval = MIN_INTERVAL
+        else:
+            ceiling = MAX_INTERVALS.get(self.state, DEFAULT_MAX_INTERVAL)
+            self.interval = min(self.interval * BACKOFF, ceiling)
+        self.state = details.get("state")
+        self.details = details
+        self.due = now + self.interval
+        return changed
+
+    def back_off(self, now):
+        """The poll failed; try again later without losing the state."""
+        self.interval = min(self.interval * BACKOFF, DEFAULT_MAX_INTERVAL)
+        self.due = now + self.interval
+
+    def result(self):
+        return {"stack": self.stack, "run": self.run, "state": self.state, "error": self.error}
+
+
+def run_missing(alias, data, errors):
+    """
+    True only when the response says the run (or its stack) does not
+    exist: a not-found error on alias, or a clean null with no error that
+    could explain it. Anything else may be transient.
+    """
+    if alias in errors:
+        return "not found" in errors[alias].lower()
+    return None not in errors and alias in data
+
+def runs_document(watches, selection=RUN_SELECTION):
+    """(document, variables) asking for the state of every watched run."""
+    definitions, calls, variables = [], [], {}
+    for i, watch in enumerate(watches):
+        variables[f"stack{i}"] = watch.stack
+        variables[f"run{i}"] = watch.run
+        definitions.append(f"$stack{i}: ID!, $run{i}: ID!")
+        calls.append(f"  m{i}: stack(id: $stack{i}) {{ run(id: $run{i}) {{ {selection} }} }}")
+    document = f"query Runs({', '.join(definitions)}) {{\n" + "\n".join(calls) + "\n}"
+    return document, variables
+
+
+class RunWatcher:
+    """
+    Watches runs of one SpaceliftClient. The client is synchronous, so
+    its calls run on worker threads; its session and JWT are shared.
+    """
+
+    def __init__(self, client, approve=None, selection=RUN_SELECTION, batch_size=BATCH_SIZE,
+                 max_in_flight=MAX_IN_FLIGHT, timeout=None):
+        self.client = client
+        self.approve = approve
+        self.selection = selection
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        # Requests sent, for reporting
+        self.requests = 0
+
+    async def poll(self, batch, in_flight):
+        document, variables = runs_document(batch, self.selection)
+        loop = asyncio.get_running_loop()
+        async with in_flight:
+            self.requests += 1
+            try:
+                response = await asyncio.to_thread(self.client.post_authorized, document, variables)
+            except Exception as e:
+                print(f"⚠️ State query for {len(batch)} runs failed, retrying: {e}")
+                for watch in batch:
+                    watch.back_off(loop.time())
+                return
+
+        data = response.get("data") or {}
+        errors = alias_errors(response)
+        now = loop.time()
+        for i, watch in enumerate(batch):
+            alias = f"m{i}"
+            run = (data.get(alias) or {}).get("run")
+            if run is None:
+                if run_missing(alias, data, errors):
+                    watch.error = "run not found"
+                    print(f"❌ {watch.stack}/{watch.run}: run not found")
+                else:
+                    print(f"⚠️ {watch.stack}/{watch.run}: no state ({errors.get(alias, errors.get(None))}), retrying")
+                    watch.back_off(now)
+                continue
+            previous = watch.state
+            if watch.update(run, now):
+                print(f"🔄 {watch.stack}/{watch.run}: {previous or '?'} → {watch.state}")
+
+    async def approve_ready(self, watches):
+        """Confirm, in one bulk call, every unconfirmed run approve() accepts."""
+        ready = [
+            watch for watch in watches
+            if watch.state == CONFIRM_STATE and not watch.approved
+            and self.approve({"stack": watch.stack, **watch.details})
+        ]
+        if not ready:
+            return
+        items = [{"stack": watch.stack, "run": watch.run} for watch in ready]
+        self.requests += 1
+        results = await asyncio.to_thread(self.client.bulk, "confirm", items)
+        now = asyncio.get_running_loop().time()
+        for watch, result in zip(ready, results):
+            if result["error"]:
+                # Left unapproved, so the next round tries again while it is still unconfirmed
+                print(f"❌ {watch.stack}/{watch.run}: approval failed: {result['error']}")
+            else:
+                watch.approved = True
+                print(f"👍 {watch.stack}/{watch.run}: approved")
+                # Confirmed runs move on at once; look again soon
+                watch.interval = MIN_INTERVAL
+                watch.due = now + MIN_INTERVAL
+
+    async def watch(self, items):
+        """
+        Poll every {"stack": ..., "run": ...} until it reaches a final
+        state (or timeout seconds pass). One result per item, in order.
+        """
+        watches = [Watch(item["stack"], item["run"]) for item in items]
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if self.timeout else None
+
+        while True:
+            pending = [watch for watch in watches if not watch.done]
+            now = loop.time()
+            if not pending or (deadline and now >= deadline):
+                break
+            due = [watch for watch in pending if watch.due <= now + COALESCE]
+            if not due:
+                wake = min(watch.due for watch in pending)
+                await asyncio.sleep(min(wake, deadline) - now if deadline else wake - now)
+                continue
+            batches = [due[i:i + self.batch_size] for i in range(0, len(due), self.batch_size)]
+            await asyncio.gather(*(self.poll(batch, in_flight) for batch in batches))
+            if self.approve:
+                await self.approve_ready(pending)
+
+        for watch in watches:
+            if not watch.done:
+                watch.error = f"still {watch.state or 'unknown'} after {self.timeout:g}s"
+        return [watch.result() for watch in watches]
+
+
+def watch_runs(client, items, **options):
+    """RunWatcher(client, **options).watch(items) on a new event loop."""
+    return asyncio.run(RunWatcher(client, **options).watch(items))
@@ -0,0 +1,344 @@
+"""
+Shared Spacelift GraphQL client for the bot scripts.
+
+Every call goes through one keep-alive requests.Session, so only the
+first request pays for the TCP and TLS handshake, and the apiKeyUser JWT
+is cached on disk and reused until shortly before it expires, so a
+script running thousands of stack operations authenticates once.
+
+Mass trigger/confirm/stop goes through bulk(): many aliased mutations
+per GraphQL document, a few documents in flight under a rate limit.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Keep-alive connections kept open to the endpoint
+POOL_SIZE = 32
+# Seconds to wait for a response
+TIMEOUT = 30
+# Retries for connections that fail before the request is sent; a
+# mutation that reached Spacelift is never sent twice
+CONNECT_RETRIES = 3
+# JWTs shared by every bot run, kept out of the repo; None disables the cache
+TOKEN_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "spacelift", "jwt_cache.json")
+# Ask for a new JWT this many seconds before the cached one expires
+EXPIRY_MARGIN = 60
+
+# Bulk mode: aliased mutations per request, requests in flight, requests per second
+BULK_CHUNK = 50
+BULK_WORKERS = 4
+BULK_RATE = 10.0
+# action -> (mutation field, its ID arguments)
+RUN_MUTATIONS = {
+    "trigger": ("runTrigger", ("stack",)),
+    "confirm": ("runConfirm", ("stack", "run")),
+    "stop": ("runStop", ("stack", "run")),
+}
+RUN_SELECTION = "id state"
+
+AUTH_MUTATION = """
+mutation GetToken($keyId: ID!, $keySecret: String!) {
+  apiKeyUser(id: $keyId, secret: $keySecret) { jwt }
+}
+"""
+
+
+class QueryError(Exception):
+    """Spacelift answered with a non-200 status."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"Query failed: {status_code} - {text}")
+        self.status_code = status_code
+
+
+class AuthError(Exception):
+    """apiKeyUser returned no JWT."""
+
+
+def graphql_url(org):
+    return f"https://{org}.app.spacelift.io/graphql"
+
+def jwt_expiry(jwt):
+    """The exp claim (epoch seconds) of a JWT, or None if it has none."""
+    try:
+        payload = jwt.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def response_data(result):
+    """data of a GraphQL response, or None after printing its errors."""
+    if "errors" in result:
+        print(f"⚠️ GraphQL Errors: {json.dumps(result['errors'], indent=2)}")
+        return None
+    return result.get("data")
+
+def unauthorized(result):
+    """
+    Whether a 200 response was refused for its JWT: Spacelift answers an
+    expired or revoked token with an "unauthorized" error and no data.
+    """
+    if any((result.get("data") or {}).values()):
+        return False
+    messages = [(error.get("message") or "").lower() for error in result.get("errors") or []]
+    return any("unauthorized" in message or "unauthenticated" in message for message in messages)
+
+def aliased_document(operation, field, arguments, items, selection=RUN_SELECTION):
+    """
+    (document, variables) calling field once per item, aliased m0, m1, ...
+    so a single request carries the whole chunk. operation is "query" or
+    "mutation"; every argument is an ID taken from the item.
+    """
+    definitions, calls, variables = [], [], {}
+    for i, item in enumerate(items):
+        call_arguments = []
+        for name in arguments:
+            variables[f"{name}{i}"] = item[name]
+            definitions.append(f"${name}{i}: ID!")
+            call_arguments.append(f"{name}: ${name}{i}")
+        calls.append(f"  m{i}: {field}({', '.join(call_arguments)}) {{ {selection} }}")
+    document = f"{operation} Bulk({', '.join(definitions)}) {{\n" + "\n".join(calls) + "\n}"
+    return document, variables
+
+def bulk_result(item, run, error):
+    return {
+        "stack": item.get("stack"),
+        "run": (run or {}).get("id") or item.get("run"),
+        "state": (run or {}).get("state"),
+        "error": error,
+    }
+
+def alias_errors(response):
+    """
+    {alias: message} of an aliased response's errors, which name their
+    alias first in path; key None holds the first error without a path.
+    """
+    errors = {}
+    for error in response.get("errors") or []:
+        path = error.get("path") or [None]
+        errors.setdefault(path[0], error.get("message", "unknown error"))
+    return errors
+
+def chunk_results(items, response):
+    """
+    Per-item results of an aliased response. An error without a path
+    applies to every item left without data.
+    """
+    data = response.get("data") or {}
+    errors = alias_errors(response)
+    results = []
+    for i, item in enumerate(items):
+        run = data.get(f"m{i}")
+        error = None if run else errors.get(f"m{i}", errors.get(None, "no result"))
+        results.append(bulk_result(item, run, error))
+    return results
+
+def print_results(results):
+    print(f"{'STACK':<30} {'RUN':<30} {'RESULT':<30}")
+    print("-" * 90)
+    for r in results:
+        print(f"{r['stack'] or 'N/A':<30} {r['run'] or '-':<30} {r['state'] or '❌ ' + r['error']:<30}")
+    failed = sum(1 for r in results if r["error"])
+    print(f"\n✅ {len(results) - failed} succeeded, {'❌ ' if failed else ''}{failed} failed.")
+
+def new_session(pool_size=POOL_SIZE):
+    """
+    Pooled keep-alive session. requests already asks for gzip/deflate
+    responses; HTTP/2 would need another client library, and one warm
+    HTTP/1.1 connection per worker is what saves the handshakes.
+    """
+    session = requests.Session()
+    retry = Retry(total=CONNECT_RETRIES, connect=CONNECT_RETRIES, read=0, status=0, backoff_factor=0.5)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Content-Type": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads; rate 0 is unlimited."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self.next)
+            self.next = start + self.interval
+        time.sleep(start - now)
+
+
+class TokenCache:
+    """
+    JWTs in a JSON file, {key: {"jwt": ..., "expires": epoch}}, keyed by
+    a hash of the endpoint and API key ID. Owner-readable only.
+    """
+
+    def __init__(self, path=TOKEN_CACHE):
+        self.path = path
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring JWT cache {self.path}: {e}")
+            return {}
+
+    def get(self, key):
+        entry = self._read().get(key)
+        if entry and entry["expires"] - EXPIRY_MARGIN > time.time():
+            return entry["jwt"]
+        return None
+
+    def put(self, key, jwt, expires):
+        if not self.path:
+            return
+        now = time.time()
+        entries = {k: v for k, v in self._read().items() if v["expires"] > now}
+        entries[key] = {"jwt": jwt, "expires": expires}
+        self._write(entries)
+
+    def drop(self, key):
+        entries = self._read()
+        if entries.pop(key, None) is not None:
+            self._write(entries)
+
+    def _write(self, entries):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+
+class SpaceliftClient:
+    """
+    GraphQL calls against one Spacelift account. Safe to share between
+    threads: the session pools connections and the JWT is fetched once.
+    """
+
+    def __init__(self, key_id, key_secret, url, token_cache=TOKEN_CACHE, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.url = url
+        self.timeout = timeout
+        self.session = new_session(pool_size)
+        self.cache = TokenCache(token_cache)
+        self.cache_key = hashlib.sha256(f"{url}|{key_id}".encode()).hexdigest()[:16]
+        self._jwt = None
+        self._lock = threading.Lock()
+
+    def post(self, query, variables=None, token=None):
+        """
+        The raw response body. Raises QueryError on a non-200 status,
+        as run_query always has.
+        """
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        response = self.session.post(
+            self.url, json={"query": query, "variables": variables}, headers=headers, timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise QueryError(response.status_code, response.text)
+        return response.json()
+
+    def run_query(self, query, variables=None, token=None):
+        """data of the response, or None after printing its GraphQL errors."""
+        return response_data(self.post(query, variables, token))
+
+    def token(self, refresh=False):
+        """A JWT for the API key, from memory, the disk cache or apiKeyUser."""
+        with self._lock:
+            if refresh:
+                self._jwt = None
+                self.cache.drop(self.cache_key)
+            if self._jwt and self._jwt[1] - EXPIRY_MARGIN > time.time():
+                return self._jwt[0]
+            jwt = self.cache.get(self.cache_key)
+            if jwt:
+                self._jwt = (jwt, jwt_expiry(jwt) or 0)
+                return jwt
+
+            data = self.run_query(AUTH_MUTATION, {"keyId": self.key_id, "keySecret": self.key_secret})
+            if not data or not data.get("apiKeyUser"):
+                raise AuthError("Authentication failed (Token is None). Check API_KEY_ID and API_KEY_SECRET.")
+            jwt = data["apiKeyUser"]["jwt"]
+            expires = jwt_expiry(jwt)
+            # A JWT without exp is kept for this run only
+            self._jwt = (jwt, expires or float("inf"))
+            if expires:
+                self.cache.put(self.cache_key, jwt, expires)
+            return jwt
+
+    def post_authorized(self, query, variables=None):
+        """
+        post with the cached JWT. A token refused (revoked or expired
+        early), as a 401 or as an unauthorized GraphQL error, gets one
+        fresh JWT and one retry.
+        """
+        try:
+            result = self.post(query, variables, self.token())
+        except QueryError as e:
+            if e.status_code != 401:
+                raise
+        else:
+            if not unauthorized(result):
+                return result
+        return self.post(query, variables, self.token(refresh=True))
+
+    def query(self, query, variables=None):
+        """run_query with the cached JWT."""
+        return response_data(self.post_authorized(query, variables))
+
+    def bulk(self, action, items, chunk_size=BULK_CHUNK, workers=BULK_WORKERS, rate=BULK_RATE):
+        """
+        Run one RUN_MUTATIONS action for every item ({"stack": ..., "run":
+        ...}), chunk_size aliased mutations per request, with up to
+        workers requests in flight and at most rate requests a second.
+        Returns one {"stack", "run", "state", "error"} per item, in
+        input order; a failed item never fails the others.
+        """
+        field, arguments = RUN_MUTATIONS[action]
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        limiter = RateLimiter(rate)
+
+        def send(chunk):
+            document, variables = aliased_document("mutation", field, arguments, chunk)
+            limiter.wait()
+            try:
+                response = self.post_authorized(document, variables)
+            except Exception as e:
+                return [bulk_result(item, None, str(e)) for item in chunk]
+            return chunk_results(chunk, response)
+
+        self.token()  # authenticate once, before the workers start
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+            return [result for results in pool.map(send, chunks) for result in results]
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,58 @@
+"""
+Stack listing through searchStacks, one cursor page at a time.
+
+iter_pages() and iter_stacks() stream stacks to the caller page by page,
+with only the fields asked for. Nothing is cached: a stack has no field
+that moves on every change (stateSetAt ignores renames, label and
+administrative edits), so a local copy could not be revalidated for less
+than the listing itself costs.
+"""
+import re
+
+# searchStacks returns at most 50 edges per page
+PAGE_SIZE = 50
+DEFAULT_FIELDS = ("id", "name", "state", "administrative")
+
+SEARCH_QUERY = """
+query SearchStacks($input: SearchInput!) {{
+  searchStacks(input: $input) {{
+    edges {{ node {{ {selection} }} }}
+    pageInfo {{ endCursor hasNextPage }}
+  }}
+}}
+"""
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class CatalogError(Exception):
+    """A stack query returned no data."""
+
+
+def selection(fields):
+    """GraphQL selection for fields, id first and no duplicates."""
+    for field in fields:
+        if not FIELD_NAME.match(field):
+            raise ValueError(f"Not a stack field name: {field!r}")
+    return " ".join(dict.fromkeys(("id",) + tuple(fields)))
+
+def iter_pages(client, fields=DEFAULT_FIELDS, page_size=PAGE_SIZE):
+    """Each page of stacks as a list of dicts, following endCursor."""
+    query = SEARCH_QUERY.format(selection=selection(fields))
+    after = None
+    while True:
+        data = client.query(query, {"input": {"first": page_size, "after": after}})
+        if not data or not data.get("searchStacks"):
+            raise CatalogError("searchStacks returned no data")
+        page = data["searchStacks"]
+        yield [edge["node"] for edge in page["edges"]]
+        info = page["pageInfo"]
+        # A cursor that does not move would loop forever
+        if not info["hasNextPage"] or not info["endCursor"] or info["endCursor"] == after:
+            return
+        after = info["endCursor"]
+
+def iter_stacks(client, fields=DEFAULT_FIELDS, page_size=PAGE_SIZE):
+    for page in iter_pages(client, fields, page_size):
+        yield from page
+